@@ -0,0 +1,11 @@
+"""
+UsaTex - Benchmarks do pipeline de imagens
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks generate /tmp/acervo --count 500   # Gerar acervo sintético
+    python -m benchmarks micro                              # Micro-benchmarks
+    python -m benchmarks e2e --sizes 100,1000               # Pipeline completo
+    python -m benchmarks run --out baseline.json            # Micro + pipeline
+    python -m benchmarks compare baseline.json atual.json   # Falha se houver regressão
+    python -m benchmarks load --url http://127.0.0.1:8080   # Carga no update.py --serve
+"""
@@ -0,0 +1,129 @@
+"""
+CLI dos benchmarks: python -m benchmarks <comando>
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from benchmarks.results import compare, load_budget, load_results, save_results
+
+DEFAULT_OUT = Path('.usatex/bench/latest.json')
+
+
+def _size(text: str):
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height or width)
+
+
+def _list(text: str):
+    return [item.strip() for item in text.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="UsaTex - Benchmarks do pipeline de imagens")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help='Gerar um acervo sintético determinístico')
+    gen.add_argument('root', type=Path, help='Pasta de destino (recebe base-images/ e base-mocks/)')
+    gen.add_argument('--count', type=int, default=100, help='Quantidade de estampas')
+    gen.add_argument('--size', type=_size, default=(1600, 1600), metavar='LxA',
+                     help='Resolução média das estampas (padrão: 1600x1600)')
+    gen.add_argument('--mode', type=_list, default=['RGB'], help='Modos: RGB,RGBA,P,CMYK')
+    gen.add_argument('--format', type=_list, default=['jpg'], help='Formatos: jpg,png,webp')
+    gen.add_argument('--mockups', type=int, default=0, help='Quantidade de mockups')
+    gen.add_argument('--seed', type=int, default=0, help='Semente (mesma semente, mesmo acervo)')
+    gen.add_argument('--jobs', type=int, default=1, help='Processos para gerar')
+
+    for name, help_text in (('micro', 'Micro-benchmarks'),
+                            ('e2e', 'Benchmarks ponta a ponta do pipeline'),
+                            ('run', 'Micro-benchmarks + ponta a ponta')):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument('--out', type=Path, default=DEFAULT_OUT,
+                         help=f'Arquivo de resultados JSON (padrão: {DEFAULT_OUT})')
+        if name in ('micro', 'run'):
+            cmd.add_argument('--min-time', type=float, default=0.5,
+                             help='Tempo mínimo por medição em segundos')
+        if name in ('e2e', 'run'):
+            cmd.add_argument('--sizes', type=lambda t: [int(n) for n in _list(t)],
+                             default=[100, 1000, 10000], help='Tamanhos de acervo (padrão: 100,1000,10000)')
+            cmd.add_argument('--resolution', type=_size, default=(1600, 1600), metavar='LxA',
+                             help='Resolução média das estampas geradas')
+            cmd.add_argument('--jobs', type=int, help='Processos do update.py (padrão: número de CPUs)')
+            cmd.add_argument('--legacy', action='store_true',
+                             help='Medir também o utils/processAllImages.py')
+
+    load = sub.add_parser('load', help='Teste de carga do update.py --serve contra a linha de base estática')
+    load.add_argument('--url', default='http://127.0.0.1:8080', help='Servidor (padrão: http://127.0.0.1:8080)')
+    load.add_argument('--catalog', type=Path, default=Path('listaImages.json'),
+                      help='JSON com as imagens pedidas (padrão: listaImages.json)')
+    load.add_argument('--widths', type=lambda t: [int(n) for n in _list(t)], default=[1182, 400],
+                      help='Larguras pedidas ao /img/ (padrão: 1182,400)')
+    load.add_argument('--format', default='jpeg', help='Formato pedido ao /img/ (padrão: jpeg)')
+    load.add_argument('--concurrency', type=int, default=16, help='Conexões simultâneas (padrão: 16)')
+    load.add_argument('--duration', type=float, default=10.0, help='Segundos por fase (padrão: 10)')
+    load.add_argument('--sample', type=int, default=0, help='Só as N primeiras imagens (0 = todas)')
+    load.add_argument('--out', type=Path, default=DEFAULT_OUT,
+                      help=f'Arquivo de resultados JSON (padrão: {DEFAULT_OUT})')
+
+    cmp_parser = sub.add_parser('compare', help='Comparar com a linha de base (falha se regredir)')
+    cmp_parser.add_argument('baseline', type=Path)
+    cmp_parser.add_argument('current', type=Path, nargs='?', default=DEFAULT_OUT)
+    cmp_parser.add_argument('--budget', type=Path, help='Orçamento em JSON (global e por benchmark)')
+    cmp_parser.add_argument('--max-slowdown', type=float, help='Queda máxima de vazão (ex.: 0.1)')
+    cmp_parser.add_argument('--max-growth', type=float, help='Crescimento máximo de bytes (ex.: 0.02)')
+
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        from benchmarks.corpus import generate_corpus
+        try:
+            generate_corpus(args.root, args.count, args.size, args.mode, args.format,
+                            mockups=args.mockups, seed=args.seed, jobs=args.jobs)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"✅ Acervo gerado em {args.root}")
+        return 0
+
+    if args.command == 'compare':
+        budget = load_budget(args.budget, throughput=args.max_slowdown, bytes=args.max_growth)
+        lines, regressions = compare(load_results(args.baseline), load_results(args.current), budget)
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressão(ões) acima do orçamento:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print("\n✅ Nenhuma regressão acima do orçamento")
+        return 0
+
+    if args.command == 'load':
+        from benchmarks.load import run_load
+        print(f"🌐 Teste de carga em {args.url} ({args.concurrency} conexões, {args.duration:.0f}s por fase)")
+        results = run_load(args.url, args.catalog, args.widths, args.format,
+                           args.concurrency, args.duration, args.sample)
+        save_results(args.out, results)
+        print(f"\n📄 Resultados gravados em {args.out}")
+        return 0
+
+    results = {}
+    if args.command in ('micro', 'run'):
+        from benchmarks.micro import run_micro
+        print("🔬 Micro-benchmarks")
+        results.update(run_micro(args.min_time))
+    if args.command in ('e2e', 'run'):
+        from benchmarks.pipeline import run_e2e
+        print("🏁 Benchmarks ponta a ponta")
+        results.update(run_e2e(args.sizes, args.resolution, args.jobs, args.legacy))
+
+    for name, result in sorted(results.items()):
+        size = f"  {result['bytes']:,} B" if result.get('bytes') else ""
+        print(f"  {name:<32} {result['throughput']:>12.1f} {result['unit']}{size}")
+    save_results(args.out, results)
+    print(f"\n📄 Resultados gravados em {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
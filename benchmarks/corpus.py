@@ -0,0 +1,161 @@
+"""
+Gerador determinístico de acervos sintéticos
+Estampas (base-images) e mockups (base-mocks) com contagem, resolução, modo e formato configuráveis
+"""
+
+import hashlib
+import json
+import random
+import shutil
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+from usatex.parallel import run_tasks
+
+MODES = ('RGB', 'RGBA', 'P', 'CMYK')
+FORMATS = {'jpg': 'JPEG', 'png': 'PNG', 'webp': 'WEBP'}
+
+# Modos que cada formato consegue gravar
+FORMAT_MODES = {
+    'jpg': {'RGB', 'CMYK'},
+    'png': {'RGB', 'RGBA', 'P'},
+    'webp': {'RGB', 'RGBA'},
+}
+
+# Padrões de nome reais do acervo (exercitam a padronização de nomes)
+NAME_PATTERNS = ('UT{n}.{ext}', 'UC_2025{n} v1.{ext}', 'UT{n} (2).{ext}', 'UT{n}V2.{ext}')
+
+
+def _color(rng: random.Random) -> Tuple[int, int, int]:
+    return tuple(rng.randrange(256) for _ in range(3))
+
+
+def draw_print(seed: int, size: Tuple[int, int]) -> Image.Image:
+    """Estampa sintética: fundo liso com formas coloridas sobrepostas"""
+    rng = random.Random(seed)
+    width, height = size
+    img = Image.new('RGB', size, _color(rng))
+    draw = ImageDraw.Draw(img)
+    for _ in range(30):
+        x, y = rng.randrange(width), rng.randrange(height)
+        w = rng.randrange(max(2, width // 20), max(3, width // 3))
+        h = rng.randrange(max(2, height // 20), max(3, height // 3))
+        shape = rng.choice((draw.ellipse, draw.rectangle))
+        shape((x, y, x + w, y + h), fill=_color(rng))
+    # Listras finas dão detalhe de alta frequência, como em tecidos reais
+    for x in range(0, width, max(4, width // 64)):
+        draw.line((x, 0, x, height), fill=_color(rng), width=1)
+    return img
+
+
+def draw_mockup(seed: int, size: Tuple[int, int]) -> Image.Image:
+    """Mockup sintético: produto opaco no centro com margem transparente"""
+    rng = random.Random(seed)
+    width, height = size
+    img = Image.new('RGBA', size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    margin_x, margin_y = width // 5, height // 4
+    draw.rounded_rectangle((margin_x, margin_y, width - margin_x, height - margin_y),
+                           radius=min(width, height) // 10, fill=_color(rng) + (255,))
+    draw.ellipse((width // 3, height // 3, width // 2, height // 2), fill=_color(rng) + (255,))
+    return img
+
+
+def convert_mode(img: Image.Image, mode: str) -> Image.Image:
+    """Converte a imagem gerada para o modo pedido"""
+    if mode == 'P':
+        return img.convert('RGB').quantize(colors=64)
+    if mode == 'RGBA' and img.mode == 'RGB':
+        alpha = Image.new('L', img.size, 255)
+        ImageDraw.Draw(alpha).rectangle((0, 0, img.width // 8, img.height), fill=0)
+        img = img.copy()
+        img.putalpha(alpha)
+        return img
+    return img.convert(mode)
+
+
+def _write_item(task: dict) -> dict:
+    """Gera e grava um arquivo do acervo (roda em processo de trabalho)"""
+    draw = draw_mockup if task['kind'] == 'mockup' else draw_print
+    img = convert_mode(draw(task['seed'], tuple(task['size'])), task['mode'])
+    options = {'quality': 95} if task['format'] in ('jpg', 'webp') else {}
+    img.save(task['path'], FORMATS[task['format']], **options)
+    return {}
+
+
+def plan_corpus(root: Path, count: int, size: Tuple[int, int], modes: List[str],
+                formats: List[str], mockups: int = 0, seed: int = 0) -> List[dict]:
+    """Lista de arquivos a gerar; mesma entrada, mesmo acervo"""
+    for mode in modes:
+        if mode not in MODES:
+            raise ValueError(f"modo desconhecido: {mode} (use {', '.join(MODES)})")
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError(f"formato desconhecido: {fmt} (use {', '.join(FORMATS)})")
+
+    combos = [(m, f) for f in formats for m in modes if m in FORMAT_MODES[f]]
+    if not combos:
+        raise ValueError(f"nenhum formato em {formats} grava os modos {modes}")
+
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(count):
+        mode, fmt = combos[i % len(combos)]
+        # Variação de ±25% na resolução, como scans reais
+        w = max(16, int(size[0] * rng.uniform(0.75, 1.25)))
+        h = max(16, int(size[1] * rng.uniform(0.75, 1.25)))
+        name = NAME_PATTERNS[i % len(NAME_PATTERNS)].format(n=4000 + i, ext=fmt)
+        tasks.append({'kind': 'print', 'seed': seed * 1_000_003 + i, 'size': (w, h),
+                      'mode': mode, 'format': fmt, 'path': str(root / 'base-images' / name)})
+
+    for i in range(mockups):
+        name = f"{i + 1:02d}-Mockup-Sintetico.png"
+        tasks.append({'kind': 'mockup', 'seed': seed * 1_000_003 + 500_000 + i,
+                      'size': (1200, 900), 'mode': 'RGBA', 'format': 'png',
+                      'path': str(root / 'base-mocks' / name)})
+    return tasks
+
+
+def corpus_key(**params) -> str:
+    """Identificador curto dos parâmetros do acervo (para reaproveitar acervos gerados)"""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def generate_corpus(root: Path, count: int, size: Tuple[int, int] = (1600, 1600),
+                    modes: Optional[List[str]] = None, formats: Optional[List[str]] = None,
+                    mockups: int = 0, seed: int = 0, jobs: int = 1) -> Path:
+    """
+    Gera o acervo em `root` (base-images/ e base-mocks/). Se `root` já tiver um
+    acervo com os mesmos parâmetros, ele é reaproveitado; com outros, só as
+    pastas do acervo são refeitas. Uma pasta não vazia sem corpus.json (ex.: o
+    próprio repositório) é recusada, para não apagar fontes reais.
+    """
+    root = Path(root)
+    modes = modes or ['RGB']
+    formats = formats or ['jpg']
+    params = {'count': count, 'size': list(size), 'modes': modes, 'formats': formats,
+              'mockups': mockups, 'seed': seed}
+    marker = root / 'corpus.json'
+    if marker.exists():
+        if json.loads(marker.read_text(encoding='utf-8')) == params:
+            return root
+    elif root.is_dir() and any(root.iterdir()):
+        raise ValueError(f"{root} não está vazia e não tem um acervo gerado (corpus.json): "
+                         f"use uma pasta nova")
+
+    # O marcador vem antes das imagens: um acervo interrompido ainda é reconhecido como nosso
+    root.mkdir(parents=True, exist_ok=True)
+    marker.write_text(json.dumps({**params, 'incompleto': True}), encoding='utf-8')
+    for folder in ('base-images', 'base-mocks'):
+        shutil.rmtree(root / folder, ignore_errors=True)
+        (root / folder).mkdir()
+
+    tasks = plan_corpus(root, count, size, modes, formats, mockups, seed)
+    for task, _, error in run_tasks(_write_item, tasks, jobs):
+        if error:
+            raise RuntimeError(f"falha ao gerar {task['path']}: {error}")
+
+    marker.write_text(json.dumps(params), encoding='utf-8')
+    return root
@@ -0,0 +1,99 @@
+"""
+Teste de carga do servidor sob demanda (update.py --serve)
+Mesmas imagens pedidas como variante (/img/) e como arquivo pré-gerado
+(/assets/modelos/, a linha de base estática), com conexões keep-alive
+"""
+
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import quote, urlsplit
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+async def _client(host: str, port: int, paths: List[str], deadline: float, rng: random.Random,
+                  latencies: List[float], counters: Dict[str, int]):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                key, _, value = line.decode('latin-1').partition(':')
+                if key.lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            counters['bytes'] += length
+            counters['ok' if status in (200, 304) else 'errors'] += 1
+    finally:
+        writer.close()
+
+
+async def _load(host: str, port: int, paths: List[str], concurrency: int, duration: float,
+                seed: int) -> dict:
+    latencies: List[float] = []
+    counters = {'ok': 0, 'errors': 0, 'bytes': 0}
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, paths, deadline, random.Random(seed + i),
+                                   latencies, counters) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'errors': counters['errors'],
+        'throughput': len(latencies) / elapsed,
+        'unit': 'req/s',
+        'bytes': counters['bytes'],
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def run_load(url: str, catalog: Path, widths: List[int], fmt: str, concurrency: int,
+             duration: float, sample: int = 0, seed: int = 0) -> Dict[str, dict]:
+    """
+    Roda a linha de base estática e depois cada largura pedida ao servidor,
+    com as imagens de listaImages.json (as `sample` primeiras, 0 = todas).
+    Retorna resultados no formato de benchmarks.results.
+    """
+    target = urlsplit(url)
+    with open(catalog, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    names = data['imagens'][:sample] if sample > 0 else data['imagens']
+    files = data.get('arquivos', {})
+
+    def static_path(name: str) -> str:
+        # Com --hashed-names o arquivo publicado tem o hash no nome
+        published = files.get(name, {}).get('modelos', {}).get('jpeg', f"modelos/{name}")
+        return f"/assets/{quote(published)}"
+
+    phases = {'load_static_modelo': [static_path(name) for name in names]}
+    for width in widths:
+        phases[f'load_img_w{width}_{fmt}'] = [f"/img/{quote(name)}?w={width}&fmt={fmt}"
+                                               for name in names]
+
+    results = {}
+    for phase, paths in phases.items():
+        result = asyncio.run(_load(target.hostname, target.port or 80, paths,
+                                   concurrency, duration, seed))
+        results[phase] = result
+        print(f"  {phase:<28} {result['throughput']:>9.1f} req/s  p50 {result['p50_ms']:>7.2f} ms  "
+              f"p95 {result['p95_ms']:>7.2f} ms  p99 {result['p99_ms']:>7.2f} ms  "
+              f"erros {result['errors']}")
+    return results
@@ -0,0 +1,91 @@
+"""
+Micro-benchmarks: padronização de nomes, caminhos de redimensionamento e codificadores
+"""
+
+import io
+import time
+from typing import Callable, Dict, Optional
+
+from PIL import Image
+
+from benchmarks.corpus import NAME_PATTERNS, draw_mockup, draw_print
+from usatex.render import render_outputs, save_output
+from update import UsaTexUpdater
+
+
+def measure(func: Callable[[], Optional[int]], min_time: float = 0.5, repeat: int = 3) -> dict:
+    """
+    Executa `func` repetidamente por pelo menos `min_time` segundos, `repeat`
+    vezes, e devolve a melhor vazão. Se `func` retornar bytes, guarda o último.
+    """
+    best = 0.0
+    produced = None
+    for _ in range(repeat):
+        calls = 0
+        started = time.perf_counter()
+        while True:
+            produced = func()
+            calls += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        best = max(best, calls / elapsed)
+    return {'throughput': best, 'bytes': produced}
+
+
+def _jpeg_source(size=(4000, 3000)) -> bytes:
+    buffer = io.BytesIO()
+    draw_print(7, size).save(buffer, 'JPEG', quality=95)
+    return buffer.getvalue()
+
+
+def _encode(img: Image.Image, cfg: dict) -> int:
+    buffer = io.BytesIO()
+    save_output(img, buffer, cfg)
+    return buffer.tell()
+
+
+def run_micro(min_time: float = 0.5) -> Dict[str, dict]:
+    """Executa todos os micro-benchmarks"""
+    updater = UsaTexUpdater()
+    settings = updater.image_settings()
+    results = {}
+
+    names = [pattern.format(n=4000 + i, ext='jpg') for i, pattern in enumerate(NAME_PATTERNS)] * 25
+
+    def standardize():
+        for name in names:
+            updater.standardize_filename(name)
+
+    result = measure(standardize, min_time)
+    results['micro.standardize_filename'] = {
+        'throughput': result['throughput'] * len(names), 'unit': 'nomes/s', 'bytes': None}
+
+    source = _jpeg_source()
+    for path in ('cascade', 'classic'):
+        path_settings = dict(settings, render=path)
+
+        def resize():
+            with Image.open(io.BytesIO(source)) as img:
+                render_outputs(img, path_settings)
+
+        result = measure(resize, min_time)
+        results[f'micro.resize.{path}'] = {
+            'throughput': result['throughput'], 'unit': 'img/s', 'bytes': None}
+
+    with Image.open(io.BytesIO(source)) as img:
+        thumb_img, modelo_img, _ = render_outputs(img, settings)
+    mockup_img = draw_mockup(3, (1200, 900))
+    mockup_img.thumbnail(updater.mockup_size, Image.Resampling.LANCZOS)
+    mockup_cfg = {'format': 'PNG', 'quality': None, 'optimize': True}
+
+    encoders = {
+        'micro.encode.thumb_jpeg': (thumb_img, settings['thumb']),
+        'micro.encode.modelo_jpeg': (modelo_img, settings['modelo']),
+        'micro.encode.mockup_png': (mockup_img, mockup_cfg),
+    }
+    for name, (img, cfg) in encoders.items():
+        result = measure(lambda: _encode(img, cfg), min_time)
+        results[name] = {'throughput': result['throughput'], 'unit': 'img/s',
+                         'bytes': result['bytes']}
+    return results
@@ -0,0 +1,96 @@
+"""
+Benchmarks ponta a ponta do pipeline (update.py e, opcionalmente, o processAllImages.py antigo)
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.corpus import corpus_key, generate_corpus
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCH_DIR = ROOT / '.usatex' / 'bench'
+
+
+def _clone_sources(corpus: Path, work: Path):
+    """Copia o acervo para a pasta de trabalho (hardlinks quando possível)"""
+    shutil.rmtree(work, ignore_errors=True)
+    work.mkdir(parents=True)
+
+    def link_or_copy(src, dst):
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    for folder in ('base-images', 'base-mocks'):
+        shutil.copytree(corpus / folder, work / folder, copy_function=link_or_copy)
+    (work / 'static' / 'assets').mkdir(parents=True)
+
+
+def _output_bytes(work: Path) -> int:
+    total = 0
+    for folder in ('thumb', 'modelos', 'mockups'):
+        path = work / 'static' / 'assets' / folder
+        if path.exists():
+            total += sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+    return total
+
+
+def _run(cmd: List[str], cwd: Path) -> float:
+    started = time.perf_counter()
+    subprocess.run(cmd, cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def run_e2e(sizes: List[int], resolution: Tuple[int, int] = (1600, 1600),
+            jobs: Optional[int] = None, legacy: bool = False,
+            modes: Optional[List[str]] = None, formats: Optional[List[str]] = None) -> Dict[str, dict]:
+    """
+    Para cada tamanho de acervo: build completo, build incremental sem mudanças
+    e, com `legacy`, o utils/processAllImages.py. A vazão é em imagens/s.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    results = {}
+    for count in sizes:
+        params = {'count': count, 'size': list(resolution), 'modes': modes or ['RGB', 'P'],
+                  'formats': formats or ['jpg', 'png'], 'mockups': 10, 'seed': 0}
+        corpus = BENCH_DIR / f"corpus-{corpus_key(**params)}"
+        print(f"  📦 Acervo de {count} imagens em {corpus}")
+        generate_corpus(corpus, count, tuple(resolution), params['modes'], params['formats'],
+                        mockups=params['mockups'], jobs=jobs)
+
+        work = BENCH_DIR / 'work'
+        _clone_sources(corpus, work)
+
+        metrics_path = work / 'metrics.json'
+        update = [sys.executable, str(ROOT / 'update.py'), '--jobs', str(jobs)]
+        elapsed = _run(update + ['--metrics-out', str(metrics_path)], work)
+        with open(metrics_path, 'r', encoding='utf-8') as f:
+            stages = {name: entry['wall_seconds']
+                      for name, entry in json.load(f)['stages'].items()}
+        results[f'e2e.{count}.full'] = {
+            'throughput': count / elapsed, 'unit': 'img/s', 'bytes': _output_bytes(work),
+            'seconds': elapsed, 'stages': stages}
+        print(f"    ✓ completo: {elapsed:.2f}s")
+
+        elapsed = _run(update + ['--incremental'], work)
+        results[f'e2e.{count}.noop'] = {
+            'throughput': count / elapsed, 'unit': 'img/s', 'bytes': None, 'seconds': elapsed}
+        print(f"    ✓ incremental sem mudanças: {elapsed:.2f}s")
+
+        if legacy:
+            _clone_sources(corpus, work)
+            elapsed = _run([sys.executable, str(ROOT / 'utils' / 'processAllImages.py')], work)
+            results[f'e2e.{count}.legacy'] = {
+                'throughput': count / elapsed, 'unit': 'img/s', 'bytes': _output_bytes(work),
+                'seconds': elapsed}
+            print(f"    ✓ processAllImages.py: {elapsed:.2f}s")
+
+        shutil.rmtree(work, ignore_errors=True)
+    return results
@@ -0,0 +1,89 @@
+"""
+Resultados de benchmark: gravação em JSON e comparação com a linha de base
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_BUDGET = {
+    'throughput': 0.10,  # Queda máxima de vazão (10%)
+    'bytes': 0.02,       # Crescimento máximo dos bytes de saída (2%)
+}
+
+
+def environment() -> dict:
+    """Descrição da máquina, para não comparar laranjas com maçãs"""
+    try:
+        from PIL import __version__ as pillow_version
+    except ImportError:
+        pillow_version = None
+    return {
+        'python': sys.version.split()[0],
+        'pillow': pillow_version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.time(),
+    }
+
+
+def save_results(path: Path, results: Dict[str, dict]):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+
+
+def load_results(path: Path) -> Dict[str, dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def load_budget(path: Optional[Path] = None, **overrides) -> dict:
+    """Orçamento de regressão: padrão, arquivo JSON e por fim opções do CLI"""
+    budget = dict(DEFAULT_BUDGET, benchmarks={})
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            budget.update(json.load(f))
+    budget.update({k: v for k, v in overrides.items() if v is not None})
+    return budget
+
+
+def compare(baseline: Dict[str, dict], current: Dict[str, dict],
+            budget: dict) -> Tuple[List[str], List[str]]:
+    """
+    Compara os resultados com a linha de base.
+    Retorna (linhas do relatório, regressões acima do orçamento).
+    """
+    lines, regressions = [], []
+    for name in sorted(set(baseline) & set(current)):
+        limits = dict(budget, **budget.get('benchmarks', {}).get(name, {}))
+        base, cur = baseline[name], current[name]
+
+        change = (cur['throughput'] - base['throughput']) / base['throughput']
+        status = "✅"
+        if -change > limits['throughput']:
+            status = "❌"
+            regressions.append(f"{name}: vazão caiu {-change:.1%} "
+                               f"(orçamento {limits['throughput']:.0%})")
+        line = (f"  {status} {name:<32} {base['throughput']:>12.1f} → {cur['throughput']:>12.1f} "
+                f"{cur.get('unit', 'op/s'):<8} {change:+7.1%}")
+
+        if base.get('bytes') and cur.get('bytes') is not None:
+            growth = (cur['bytes'] - base['bytes']) / base['bytes']
+            line += f"   bytes {growth:+6.1%}"
+            if growth > limits['bytes']:
+                line = line.replace("✅", "❌", 1)
+                regressions.append(f"{name}: saída cresceu {growth:.1%} "
+                                   f"(orçamento {limits['bytes']:.0%})")
+        lines.append(line)
+
+    for name in sorted(set(baseline) - set(current)):
+        lines.append(f"  ⚠️  {name}: ausente na execução atual")
+    for name in sorted(set(current) - set(baseline)):
+        lines.append(f"  ℹ️  {name}: novo (sem linha de base)")
+    return lines, regressions
@@ -0,0 +1,6 @@
+"""Testes do pipeline de imagens: o pacote usatex é importado da raiz do repositório"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
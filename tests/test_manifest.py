@@ -0,0 +1,113 @@
+"""Manifesto incremental: frescor das saídas e retomada pelo diário"""
+
+import json
+import os
+
+from usatex.manifest import BuildManifest
+
+SETTINGS = {'thumb': {'size': [300, 300], 'quality': 85}}
+
+
+def make_source(tmp_path, content=b'fonte'):
+    source = tmp_path / 'base-images' / 'UT4685.jpg'
+    source.parent.mkdir(exist_ok=True)
+    source.write_bytes(content)
+    output = tmp_path / 'thumb' / 'UT4685.jpg'
+    output.parent.mkdir(exist_ok=True)
+    output.write_bytes(b'saida')
+    return source, output
+
+
+def test_fresh_after_record(tmp_path):
+    source, output = make_source(tmp_path)
+    manifest = BuildManifest(tmp_path / 'manifest.json')
+    manifest.record(source, SETTINGS, [output])
+    assert manifest.is_fresh(source, SETTINGS)
+
+
+def test_not_fresh_when_settings_change(tmp_path):
+    source, output = make_source(tmp_path)
+    manifest = BuildManifest(tmp_path / 'manifest.json')
+    manifest.record(source, SETTINGS, [output])
+    assert not manifest.is_fresh(source, {**SETTINGS, 'low_memory': True})
+
+
+def test_not_fresh_when_output_missing(tmp_path):
+    source, output = make_source(tmp_path)
+    manifest = BuildManifest(tmp_path / 'manifest.json')
+    manifest.record(source, SETTINGS, [output])
+    output.unlink()
+    assert not manifest.is_fresh(source, SETTINGS)
+
+
+def test_not_fresh_when_content_changes(tmp_path):
+    source, output = make_source(tmp_path)
+    manifest = BuildManifest(tmp_path / 'manifest.json')
+    manifest.record(source, SETTINGS, [output])
+    source.write_bytes(b'outra fonte')
+    assert not manifest.is_fresh(source, SETTINGS)
+
+
+def test_fresh_when_only_mtime_changes(tmp_path):
+    source, output = make_source(tmp_path)
+    manifest = BuildManifest(tmp_path / 'manifest.json')
+    manifest.record(source, SETTINGS, [output])
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    # Mesmo conteúdo (cópia, checkout): continua em dia, com o mtime novo guardado
+    assert manifest.is_fresh(source, SETTINGS)
+    assert manifest.sources[manifest.key(source)]['mtime_ns'] == source.stat().st_mtime_ns
+
+
+def test_record_returns_unclaimed_stale_outputs(tmp_path):
+    source, output = make_source(tmp_path)
+    webp = output.with_suffix('.webp')
+    webp.write_bytes(b'variante')
+    manifest = BuildManifest(tmp_path / 'manifest.json')
+    manifest.record(source, SETTINGS, [output, webp])
+    assert manifest.record(source, SETTINGS, [output]) == [manifest.key(webp)]
+
+
+def test_journal_replayed_without_save(tmp_path):
+    source, output = make_source(tmp_path)
+    manifest = BuildManifest(tmp_path / 'manifest.json')
+    manifest.record(source, SETTINGS, [output])
+    # Build interrompido: nenhum save(), só o diário no disco
+    resumed = BuildManifest(tmp_path / 'manifest.json')
+    assert resumed.load()
+    assert resumed.replayed == 1
+    assert resumed.is_fresh(source, SETTINGS)
+
+
+def test_journal_ignores_torn_last_line(tmp_path):
+    source, output = make_source(tmp_path)
+    manifest = BuildManifest(tmp_path / 'manifest.json')
+    manifest.record(source, SETTINGS, [output])
+    with open(manifest.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"key": "base-images/UT46')  # Queda no meio da escrita
+    resumed = BuildManifest(tmp_path / 'manifest.json')
+    resumed.load()
+    assert list(resumed.sources) == [manifest.key(source)]
+
+
+def test_journal_replays_removals(tmp_path):
+    source, output = make_source(tmp_path)
+    manifest = BuildManifest(tmp_path / 'manifest.json')
+    manifest.record(source, SETTINGS, [output])
+    manifest.save()
+    assert manifest.prune(source.parent, []) == [manifest.key(output)]
+    resumed = BuildManifest(tmp_path / 'manifest.json')
+    resumed.load()
+    assert resumed.sources == {}
+
+
+def test_save_truncates_journal(tmp_path):
+    source, output = make_source(tmp_path)
+    manifest = BuildManifest(tmp_path / 'manifest.json')
+    manifest.record(source, SETTINGS, [output])
+    manifest.save()
+    assert not manifest.journal_path.exists()
+    data = json.loads(manifest.path.read_text(encoding='utf-8'))
+    assert manifest.key(source) in data['sources']
+    reloaded = BuildManifest(tmp_path / 'manifest.json')
+    assert reloaded.load() and reloaded.replayed == 0
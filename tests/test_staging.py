@@ -0,0 +1,112 @@
+"""Gerações publicadas: promoção do staging e rollback nos dois modos de troca"""
+
+import tempfile
+
+import pytest
+
+from usatex.staging import Generations, symlinks_supported
+
+
+def build(root, label, atlas=False):
+    """Uma geração com uma pasta de thumbs, um JSON e o manifesto"""
+    (root / 'assets' / 'thumb').mkdir(parents=True)
+    (root / 'assets' / 'thumb' / 'UT4685.jpg').write_text(label)
+    (root / 'listaImages.json').write_text(label)
+    (root / 'manifest.json').write_text(label)
+    if atlas:
+        (root / 'assets' / 'atlas').mkdir()
+        (root / 'assets' / 'atlas' / 'atlas.json').write_text(label)
+    return root
+
+
+def generations(tmp_path, mode):
+    site, state = tmp_path / 'site', tmp_path / '.usatex'
+    entries = {'assets/thumb': site / 'static' / 'assets' / 'thumb',
+               'assets/atlas': site / 'static' / 'assets' / 'atlas',
+               'listaImages.json': site / 'listaImages.json'}
+    return Generations(entries, state / 'anterior', state / 'geracoes', mode,
+                       {'manifest.json': state / 'manifest.json'})
+
+
+def published(gens):
+    return {name: (live / 'UT4685.jpg' if name == 'assets/thumb' else live).read_text()
+            for name, live in gens.entries.items() if name != 'assets/atlas'}
+
+
+def publish_live(gens, label):
+    """Saídas publicadas por um build sem staging (pastas e arquivos comuns)"""
+    thumb = gens.entries['assets/thumb']
+    thumb.mkdir(parents=True)
+    (thumb / 'UT4685.jpg').write_text(label)
+    gens.entries['listaImages.json'].write_text(label)
+    gens.state['manifest.json'].parent.mkdir(parents=True, exist_ok=True)
+    gens.state['manifest.json'].write_text(label)
+
+
+# Windows sem permissão de criar links: só o modo rename é testado
+needs_symlinks = pytest.mark.skipif(not symlinks_supported(tempfile.gettempdir()),
+                                    reason='sem permissão para criar links simbólicos')
+MODES = ['rename', pytest.param('symlink', marks=needs_symlinks)]
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_promote_then_rollback(tmp_path, mode):
+    gens = generations(tmp_path, mode)
+    publish_live(gens, 'v1')
+    gens.promote(build(tmp_path / 'staging', 'v2'))
+
+    assert published(gens) == {'assets/thumb': 'v2', 'listaImages.json': 'v2'}
+    assert gens.state['manifest.json'].read_text() == 'v2'
+    assert not (tmp_path / 'staging').exists()
+
+    assert gens.rollback() is not None
+    assert published(gens) == {'assets/thumb': 'v1', 'listaImages.json': 'v1'}
+    assert gens.state['manifest.json'].read_text() == 'v1'
+
+    # A substituída vira a anterior: um segundo rollback desfaz o primeiro
+    gens.rollback()
+    assert published(gens) == {'assets/thumb': 'v2', 'listaImages.json': 'v2'}
+    assert gens.state['manifest.json'].read_text() == 'v2'
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_missing_entry_keeps_published(tmp_path, mode):
+    gens = generations(tmp_path, mode)
+    gens.promote(build(tmp_path / 'staging', 'v1', atlas=True))
+    # Build sem --atlas: o atlas publicado continua
+    gens.promote(build(tmp_path / 'staging', 'v2'))
+    assert published(gens)['assets/thumb'] == 'v2'
+    assert (gens.entries['assets/atlas'] / 'atlas.json').read_text() == 'v1'
+
+
+def test_rename_keeps_regular_files(tmp_path):
+    gens = generations(tmp_path, 'rename')
+    publish_live(gens, 'v1')
+    gens.promote(build(tmp_path / 'staging', 'v2'))
+    for live in gens.entries.values():
+        assert not live.is_symlink()
+    assert (gens.previous / 'assets' / 'thumb' / 'UT4685.jpg').read_text() == 'v1'
+
+
+def test_rollback_without_previous(tmp_path):
+    assert generations(tmp_path, 'rename').rollback() is None
+
+
+@needs_symlinks
+def test_rename_after_symlink_restores_regular_folders(tmp_path):
+    gens = generations(tmp_path, 'symlink')
+    publish_live(gens, 'v1')
+    gens.promote(build(tmp_path / 'staging', 'v2'))
+    assert gens.entries['assets/thumb'].is_symlink()
+
+    gens = generations(tmp_path, 'rename')
+    gens.promote(build(tmp_path / 'staging', 'v3'))
+    assert published(gens) == {'assets/thumb': 'v3', 'listaImages.json': 'v3'}
+    for name, live in gens.entries.items():
+        assert not live.is_symlink(), name
+    assert (gens.previous / 'assets' / 'thumb' / 'UT4685.jpg').read_text() == 'v2'
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        Generations({}, 'anterior', 'geracoes', 'copy')
@@ -0,0 +1,69 @@
+"""Validação: arquivos truncados e dados anexados depois do fim do formato"""
+
+import pytest
+from PIL import Image
+
+from usatex.validate import check_tail, validate_image
+
+FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+def save(tmp_path, fmt, size=(64, 48)):
+    # Ruído: sem ele o JPEG inteiro cabe nos últimos bytes e o corte não é testado
+    img = Image.effect_noise(size, 64).convert('RGB')
+    path = tmp_path / f"UT4685.{FORMATS[fmt]}"
+    img.save(path, fmt)
+    return path
+
+
+def truncate(path, keep=0.6):
+    data = path.read_bytes()
+    path.write_bytes(data[:int(len(data) * keep)])
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_complete_file_passes(tmp_path, fmt):
+    assert check_tail(save(tmp_path, fmt), fmt) is None
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_truncated_file_fails(tmp_path, fmt):
+    path = save(tmp_path, fmt)
+    truncate(path)
+    assert 'truncado' in check_tail(path, fmt)
+
+
+@pytest.mark.parametrize('fmt', ['JPEG', 'PNG'])
+def test_trailing_data_after_end_passes(tmp_path, fmt):
+    # Trailers de câmera e metadados anexados depois do EOI/IEND não são truncamento
+    path = save(tmp_path, fmt)
+    with open(path, 'ab') as f:
+        f.write(b'\x00' * 16 + b'trailer de camera' * 8)
+    assert check_tail(path, fmt) is None
+
+
+def test_large_png_chunks_are_walked(tmp_path):
+    # PNG com dados anexados longos: o IEND sai dos últimos bytes e os blocos são percorridos
+    path = save(tmp_path, 'PNG', size=(256, 256))
+    with open(path, 'ab') as f:
+        f.write(b'x' * 4096)
+    assert check_tail(path, 'PNG') is None
+    truncate(path, keep=0.3)
+    assert check_tail(path, 'PNG') is not None
+
+
+@pytest.mark.parametrize('level', ['header', 'verify', 'decode'])
+def test_validate_image_reports_truncation(tmp_path, level):
+    path = save(tmp_path, 'JPEG')
+    truncate(path)
+    result = validate_image({'source': str(path), 'level': level})
+    assert 'truncado' in result['error']
+
+
+def test_header_level_skips_hashing(tmp_path):
+    path = save(tmp_path, 'PNG')
+    header = validate_image({'source': str(path), 'level': 'header'})
+    verify = validate_image({'source': str(path), 'level': 'verify'})
+    assert header['error'] is None and header['sha256'] is None
+    assert verify['error'] is None and len(verify['sha256']) == 64
+    assert header['facts'] == {'width': 64, 'height': 48, 'mode': 'RGB', 'format': 'PNG'}
@@ -10,9 +10,28 @@ Uso:
     python update.py --validate     # Apenas validação
     python update.py --duplicates   # Buscar duplicatas
     python update.py --mockups      # Apenas mockups
+    python update.py --incremental  # Reprocessa apenas fontes novas/alteradas
+    python update.py --jobs 4       # Limita a renderização a 4 processos
+    python update.py --compare-render  # Compara os caminhos de renderização
+    python update.py --query errors # Consulta o índice do catálogo
+    python update.py --variants avif,webp  # Gera também AVIF (mais lento)
+    python update.py --ladder 480,960      # Escada de resoluções dos modelos
+    python update.py --atlas        # Gera também o atlas de sprites dos thumbs
+    python update.py --watch        # Observa as pastas e processa o que mudar
+    python update.py --pipeline     # Leitura/renderização/gravação em estágios
+    python update.py --memory-budget 2G  # Scans enormes sem estourar a memória
+    python update.py --preset modelo=progressive  # Preset do codificador JPEG por classe
+    python update.py --compare-presets  # Compara tempo/bytes dos presets
+    python update.py --adaptive-quality 0.985  # Qualidade do modelo pelo SSIM alvo
+    python update.py --serve        # Servidor de redimensionamento sob demanda
+    python update.py --similar UT4685  # Estampas com cores parecidas
+    python update.py --sync s3://bucket/site  # Sobe para o bucket só o que mudou
+    python update.py --staging      # Build retomável, publicado só no fim
+    python update.py --rollback     # Volta para a geração publicada anterior
     python update.py --help         # Ajuda
 """
 
+import asyncio
 import os
 import re
 import shutil
@@ -20,30 +39,160 @@ import json
 import subprocess
 import sys
 import argparse
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
 from pathlib import Path
-from typing import List, Tuple, Dict
+from typing import Iterable, Iterator, List, Tuple, Dict, Optional, Set
+
+from usatex.cachebust import PublishedUrls, logical_name
+from usatex.catalog import CatalogIndex, quality_key
+from usatex.config import load_config
+from usatex.events import ImageDone, ImageEvent, ImageFailed, ImageSkipped, Output
+from usatex.inventory import FolderInventory
+from usatex.manifest import BuildManifest
+from usatex.metrics import RunMetrics
+from usatex.parallel import run_tasks
+from usatex.staging import SWAP_MODES, Generations, symlinks_supported
+from usatex.sync import DEFAULT_SYNC_JOBS, S3Sync, SyncState, collect_files, parse_target
+from usatex.presets import (DEFAULT_PRESET, ENCODER_PRESETS, PRESET_CLASSES, available_presets,
+                            encoder_options, select_presets)
+from usatex.variants import (DEFAULT_LADDER, DEFAULT_VARIANTS, VARIANT_FORMATS, ladder_path,
+                             variant_path, variant_url_patterns)
+from usatex.watch import debounced_batches, open_watcher
 
 # Importar PIL apenas quando necessário
 try:
-    from PIL import Image
+    from PIL import Image, __version__ as PIL_VERSION
+    from usatex.atlas import ATLAS_FORMATS, build_atlas
+    from usatex.dedupe import compute_hashes, find_clusters
+    from usatex.memory import low_memory_settings, plan_memory
+    from usatex.pipeline import StagedPipeline
+    from usatex.validate import LEVELS as VALIDATION_LEVELS, validate_files
+    from usatex.render import (RENDER_PATHS, benchmark_encoders, benchmark_render, psnr,
+                               render_image, render_mockup)
+    from usatex.variants import available_variants
     PIL_AVAILABLE = True
 except ImportError:
     PIL_AVAILABLE = False
+    PIL_VERSION = None
+    RENDER_PATHS = ('cascade', 'classic')
+    ATLAS_FORMATS = ('jpeg', 'webp', 'png')
+    VALIDATION_LEVELS = ('header', 'verify', 'decode')
+
+# SSIM alvo padrão de --adaptive-quality
+DEFAULT_TARGET_SSIM = 0.99
+
+# Endereço padrão de --serve
+DEFAULT_SERVE_ADDRESS = '127.0.0.1:8080'
+
+# NumPy é opcional: só os placeholders (BlurHash/LQIP) e a qualidade adaptativa dependem dele
+try:
+    import numpy  # noqa: F401
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 class UsaTexUpdater:
     """Sistema unificado para processamento de imagens e metadados"""
 
-    def __init__(self):
+    def __init__(self, incremental: bool = False, jobs: Optional[int] = None,
+                 render_path: str = 'cascade', duplicate_distance: int = 8,
+                 variants: Optional[List[str]] = None, ladder: Optional[List[int]] = None,
+                 atlas: bool = False, pipeline: bool = False, io_threads: int = 4,
+                 memory_budget: Optional[int] = None, placeholders: bool = True,
+                 hashed_names: bool = False, adaptive_quality: Optional[float] = None,
+                 similarity: bool = True):
         self.base_folder = Path("./base-images")
         self.base_mocks_folder = Path("./base-mocks")  # Nova pasta para mockups
         self.thumb_folder = Path("./static/assets/thumb")
         self.modelos_folder = Path("./static/assets/modelos")
         self.mockups_folder = Path("./static/assets/mockups")
+        self.atlas_folder = Path("./static/assets/atlas")
+        self.json_folder = Path(".")  # listaImages.json, listaMockups.json...
+        self.manifest = BuildManifest(Path("./.usatex/manifest.json"))
+        # --staging: build completo em staging, promovido no fim por rename (pastas e
+        # JSONs continuam arquivos comuns, versionáveis) ou, com --swap symlink, pela
+        # troca atômica de um link; a geração anterior fica em previous_folder (ou
+        # generations_folder) para --rollback, com o manifesto e o catálogo dela
+        self.staging = False
+        self.swap_mode = 'rename'
+        self.resume = True  # Retomar um build interrompido em vez de recomeçar
+        self.staging_folder = Path("./.usatex/staging")
+        self.previous_folder = Path("./.usatex/anterior")
+        self.generations_folder = Path("./.usatex/geracoes")
+        self.staged = False  # Pastas de saída apontando para o staging nesta execução
+        self._live: Optional[dict] = None
+        # Estado das URLs publicadas e lista de alteradas/removidas da última execução
+        self.published = PublishedUrls(Path("./.usatex/urls.json"), Path("./static"))
+        self.url_changes_path = Path("./.usatex/urls-alteradas.json")
+        # Servidor sob demanda (--serve): cache de variantes em disco e limites dos caches
+        self.server_cache_folder = Path("./.usatex/cache/variantes")
+        self.server_memory_cache = 64 * 1024 ** 2
+        self.server_disk_cache = 1024 ** 3
+        # Sincronização com bucket S3 (--sync): destino s3://bucket/prefixo e limites
+        self.sync_target: Optional[str] = None
+        self.sync_endpoint: Optional[str] = None  # MinIO, R2, moto...
+        self.sync_region: Optional[str] = None
+        self.sync_jobs = DEFAULT_SYNC_JOBS
+        self.sync_rate: Optional[int] = None  # Bytes/s somando todos os uploads
+        self.sync_delete = False  # Remover do bucket o que não existe mais localmente
+        self.sync_dry_run = False
+        self.sync_state_path = Path("./.usatex/sync.json")
+        self.catalog_path = Path("./.usatex/catalog.db")
+        self._catalog: Optional[CatalogIndex] = None
+        # Uma varredura por pasta de fontes, compartilhada pelas etapas
+        self.inventories: Dict[Path, FolderInventory] = {}
 
         # Configurações
         self.thumb_size = (128, 128)
         self.modelos_size = (1182, 1182)
         self.mockup_size = (800, 600)  # Tamanho para mockups
+        self.modelo_ladder = list(DEFAULT_LADDER) if ladder is None else ladder  # Degraus menores do modelo
+        self.atlas = atlas  # Etapa opcional: atlas de sprites dos thumbs
+        self.atlas_page_size = (2048, 2048)  # 16x16 thumbs por página
+        self.atlas_format = 'jpeg'
+        self.atlas_quality = 85
+        self.placeholders = placeholders  # BlurHash, cor dominante e micro-JPEG em listaImages.json
+        self.placeholder_components = (4, 3)
+        self.placeholder_size = 16
+        self.placeholder_quality = 40
+        self.similarity = similarity  # Histograma HSV e paleta por imagem, vizinhos em listaSimilares.json
+        self.similarity_bins = (12, 2, 3, 4)  # Matiz x saturação x valor + baldes de cinza
+        self.similarity_colors = 5
+        self.similarity_sample = 64
+        self.similar_count = 12  # Vizinhos pré-calculados por imagem
+        self.similarity_path = Path("./.usatex/similaridade.npz")
+        self.thumb_quality = 85
+        self.modelos_quality = 90
+        self.mockup_quality = 90
+        # Mockups PNG com transparência: recorte das bordas, paleta com alfa até a
+        # tolerância (erro RMS, 0 = só sem perdas) e estratégias do zlib testadas
+        self.mockup_trim = True
+        self.mockup_tolerance = 4.0
+        self.mockup_png_strategies = ['optimize', 'default', 'filtered', 'rle']
+        # Qualidade do modelo por imagem: menor qualidade com SSIM >= alvo, dentro da faixa
+        self.adaptive_quality = adaptive_quality
+        self.adaptive_range = (60, 95)
+        # Presets do codificador JPEG (embutidos + definidos no usatex.json) e o escolhido por classe
+        self.encoder_presets = {name: dict(fields) for name, fields in ENCODER_PRESETS.items()}
+        self.preset_choice = {cls: DEFAULT_PRESET for cls in PRESET_CLASSES}
+        # Variantes modernas de thumbs e modelos (além do JPEG) e seus codificadores
+        self.variant_formats = list(DEFAULT_VARIANTS) if variants is None else variants
+        self.variant_settings = {
+            'webp': {'quality': 80, 'method': 2},
+            'avif': {'quality': 60, 'speed': 6},
+        }
+        self.incremental = incremental  # Reprocessar apenas fontes novas/alteradas
+        self.jobs = jobs or os.cpu_count() or 1  # Processos para renderização
+        self.pipeline = pipeline  # Estágios com threads e filas limitadas em vez do pool
+        self.io_threads = io_threads  # Threads de leitura e de gravação no modo pipeline
+        self.memory_budget = memory_budget  # Bytes; admite tarefas pela memória estimada
+        self.hashed_names = hashed_names  # Saídas como UT4685.3fa9c1.jpg (cache imutável)
+        self.render_path = render_path  # 'cascade' (decodificação única) ou 'classic'
+        self.duplicate_distance = duplicate_distance  # Bits de diferença no pHash
         self.image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg'}
         self.mockup_extensions = {'.jpg', '.jpeg', '.png'}  # Extensões suportadas para mockups
 
@@ -55,8 +204,15 @@ class UsaTexUpdater:
             'mockups_processed': 0,
             'errors': 0,
             'validated': 0,
-            'corrupted': 0
+            'corrupted': 0,
+            'skipped': 0,
+            'removed': 0,
+            'bytes_saved': 0
         }
+        # Qualidade adaptativa nesta execução: buscas, acertos no cache e segundos de busca
+        self.adaptive_stats = {'searched': 0, 'cached': 0, 'seconds': 0.0}
+        self.failures: List[Tuple[str, str]] = []  # (arquivo, erro) por tarefa que falhou
+        self.metrics = RunMetrics()
 
     def print_header(self, title: str):
         """Imprime cabeçalho formatado"""
@@ -89,15 +245,141 @@ class UsaTexUpdater:
 
         return f"{name.rstrip('-')}{ext}"
 
+    @property
+    def catalog(self) -> CatalogIndex:
+        """Índice SQLite do catálogo, aberto sob demanda"""
+        if self._catalog is None:
+            self._catalog = CatalogIndex(self.catalog_path)
+        return self._catalog
+
+    def inventory(self, folder: Path) -> FolderInventory:
+        """Inventário da pasta, varrida na primeira consulta; renames e o --watch o mantêm em dia"""
+        if folder not in self.inventories:
+            self.inventories[folder] = FolderInventory(folder).scan()
+        return self.inventories[folder]
+
+    def source_files(self, folder: Path, extensions: Set[str]) -> List[Path]:
+        """Arquivos de uma pasta de fontes com as extensões dadas, em ordem de nome"""
+        return self.inventory(folder).files(extensions)
+
+    def stat_of(self, file_path: Path) -> os.stat_result:
+        """
+        stat de uma fonte, do inventário da sua pasta se ela já foi varrida;
+        senão direto do disco (stream_images com poucas fontes não varre a pasta)
+        """
+        inventory = self.inventories.get(file_path.parent)
+        return inventory.stat(file_path) if inventory is not None else file_path.stat()
+
+    def image_settings(self) -> dict:
+        """Configurações que determinam os bytes de thumbs e modelos"""
+        settings = {
+            'pillow': PIL_VERSION,
+            'render': self.render_path,
+            'thumb': {'size': list(self.thumb_size), 'format': 'JPEG',
+                      **self.encoder_options('thumb', self.thumb_quality)},
+            'modelo': {'size': list(self.modelos_size), 'format': 'JPEG',
+                       **self.encoder_options('modelo', self.modelos_quality)},
+            'ladder': sorted(step for step in self.modelo_ladder if step < max(self.modelos_size)),
+            'variants': {ext: dict(self.variant_settings[ext], format=VARIANT_FORMATS[ext])
+                         for ext in self.enabled_variants()},
+        }
+        if self.placeholders and NUMPY_AVAILABLE:
+            settings['placeholder'] = {'componentes': list(self.placeholder_components),
+                                       'tamanho': self.placeholder_size,
+                                       'qualidade': self.placeholder_quality}
+        if self.similarity and NUMPY_AVAILABLE:
+            settings['similarity'] = {'baldes': list(self.similarity_bins),
+                                      'cores': self.similarity_colors,
+                                      'amostra': self.similarity_sample}
+        if self.adaptive_quality and NUMPY_AVAILABLE:
+            settings['adaptive'] = {'ssim': self.adaptive_quality,
+                                    'min': self.adaptive_range[0], 'max': self.adaptive_range[1]}
+        if self.hashed_names:
+            settings['hashed_names'] = True
+        return settings
+
+    def encoder_options(self, output_class: str, quality: int) -> dict:
+        """Opções do codificador JPEG do preset escolhido para a classe"""
+        return encoder_options(self.encoder_presets[self.preset_choice[output_class]], quality)
+
+    def enabled_variants(self) -> List[str]:
+        """Variantes pedidas que o Pillow instalado consegue gravar"""
+        available = available_variants() if PIL_AVAILABLE else []
+        return [ext for ext in self.variant_formats if ext in available]
+
+    def mockup_settings(self) -> dict:
+        """Configurações que determinam os bytes dos mockups"""
+        settings = {
+            'pillow': PIL_VERSION,
+            'mockup': {'size': list(self.mockup_size),
+                       **self.encoder_options('mockup', self.mockup_quality)},
+            'png': {'trim': self.mockup_trim, 'tolerance': self.mockup_tolerance, 'colors': 256,
+                    'strategies': list(self.mockup_png_strategies)},
+        }
+        if self.hashed_names:
+            settings['hashed_names'] = True
+        return settings
+
+    def published_files(self, folder: Path) -> Dict[str, Path]:
+        """
+        Arquivos de uma pasta de saída pelo nome lógico. Com --hashed-names o
+        nome lógico é o nome sem o hash de conteúdo (UT4685.3fa9c1.jpg -> UT4685.jpg).
+        """
+        files = {}
+        if folder.is_dir():
+            with os.scandir(folder) as entries:
+                for entry in sorted(entries, key=lambda e: e.name):
+                    if entry.is_file() and not entry.name.startswith('.'):
+                        name = logical_name(entry.name) if self.hashed_names else entry.name
+                        files[name] = Path(entry.path)
+        return files
+
+    def output_name_for(self, file_path: Path) -> str:
+        """Nome de saída de uma imagem (remove o prefixo UC_/UT_)"""
+        output_name = file_path.name
+        if file_path.name.startswith(('UC_', 'UT')):
+            parts = file_path.name.split('_', 1)
+            if len(parts) > 1:
+                output_name = parts[1]
+        return output_name
+
+    def remove_outputs(self, outputs: List[str]):
+        """Remove saídas cujas fontes foram apagadas"""
+        for output in outputs:
+            try:
+                Path(output).unlink(missing_ok=True)
+                self.stats['removed'] += 1
+                print(f"    🗑️  Removido: {output}")
+            except Exception as e:
+                print(f"    ❌ Erro ao remover {output}: {e}")
+                self.stats['errors'] += 1
+
+    def prepare_incremental(self) -> bool:
+        """Carrega o manifesto; sem manifesto válido faz uma limpeza completa"""
+        self.print_section("📒 Carregando manifesto incremental")
+
+        if self.manifest.load():
+            print(f"  ✓ {len(self.manifest.sources)} fontes registradas em {self.manifest.path}")
+            for folder in [self.thumb_folder, self.modelos_folder, self.mockups_folder]:
+                folder.mkdir(parents=True, exist_ok=True)
+            return True
+
+        print("  ℹ️  Manifesto ausente ou inválido, executando build completo")
+        return self.prepare_staging() if self.staging else self.clean_folders()
+
     def clean_folders(self) -> bool:
         """Limpa pastas de destino"""
         self.print_section("🧹 Limpando pastas de destino")
 
         folders = [self.thumb_folder, self.modelos_folder, self.mockups_folder]
+        self.manifest.clear()
 
         for folder in folders:
             try:
-                if folder.exists():
+                if folder.is_symlink():
+                    folder.unlink()  # --swap symlink: a geração apontada fica para --rollback
+                    print(f"  ✓ {folder} desvinculada")
+                elif folder.exists():
                     shutil.rmtree(folder)
                     print(f"  ✓ {folder} limpa")
 
@@ -109,22 +391,142 @@ class UsaTexUpdater:
                 self.stats['errors'] += 1
                 return False
 
+        self.manifest.save()
+        return True
+
+    def output_entries(self) -> Dict[str, Path]:
+        """Entradas publicadas de uma geração: {nome no staging: caminho publicado}"""
+        entries = {f"assets/{folder.name}": folder for folder in
+                   (self.thumb_folder, self.modelos_folder, self.mockups_folder, self.atlas_folder)}
+        for name in ('listaImages.json', 'listaMockups.json', 'listaAtlas.json', 'listaSimilares.json'):
+            entries[name] = self.json_folder / name
+        return entries
+
+    def generations(self) -> Generations:
+        # Manifesto, catálogo e índice de cores descrevem a geração: trocam junto com ela
+        state = {'manifest.json': self.manifest.path, 'catalog.db': self.catalog_path,
+                 'similaridade.npz': self.similarity_path}
+        if self.swap_mode == 'symlink' and not symlinks_supported(self.generations_folder):
+            # Windows sem permissão de criar links: publica por rename em vez de falhar
+            print("  ⚠️  Sem permissão para criar links simbólicos: usando --swap rename")
+            self.swap_mode = 'rename'
+        return Generations(self.output_entries(), self.previous_folder, self.generations_folder,
+                           self.swap_mode, state)
+
+    def close_catalog(self):
+        """Fecha o índice (o SQLite leva o WAL para o arquivo) antes de copiá-lo ou trocá-lo"""
+        if self._catalog is not None:
+            self._catalog.close()
+            self._catalog = None
+
+    def prepare_staging(self) -> bool:
+        """
+        Build completo sem tocar no que está publicado: as saídas vão para o
+        staging, com o manifesto próprio (e seu diário). Se um build anterior
+        foi interrompido, retoma: as fontes já registradas não são refeitas.
+        """
+        self.print_section("🏗️  Preparando build em staging")
+
+        manifest = BuildManifest(self.staging_folder / 'manifest.json')
+        try:
+            if not self.resume:
+                shutil.rmtree(self.staging_folder, ignore_errors=True)
+            if manifest.load():
+                print(f"  ♻️  Retomando build interrompido: {len(manifest.sources)} fontes já prontas "
+                      f"({manifest.replayed} do diário)")
+            else:
+                shutil.rmtree(self.staging_folder, ignore_errors=True)
+                manifest.clear()
+                print(f"  ✓ Novo build em {self.staging_folder}")
+
+            staged_catalog = self.staging_folder / 'catalog.db'
+            if not staged_catalog.exists():
+                # O build altera uma cópia: o índice publicado continua descrevendo o publicado
+                self.catalog.backup(staged_catalog)
+            self.close_catalog()
+
+            self._live = {'thumb_folder': self.thumb_folder, 'modelos_folder': self.modelos_folder,
+                          'mockups_folder': self.mockups_folder, 'atlas_folder': self.atlas_folder,
+                          'json_folder': self.json_folder, 'manifest': self.manifest,
+                          'catalog_path': self.catalog_path, 'similarity_path': self.similarity_path}
+            assets = self.staging_folder / 'assets'
+            for attr in ('thumb_folder', 'modelos_folder', 'mockups_folder', 'atlas_folder'):
+                setattr(self, attr, assets / self._live[attr].name)
+            self.json_folder = self.staging_folder
+            self.manifest = manifest
+            self.catalog_path = staged_catalog
+            self.similarity_path = self.staging_folder / self._live['similarity_path'].name
+            # No staging o build é incremental sobre ele mesmo: só pula o que já ficou pronto
+            self.incremental = True
+            self.staged = True
+
+            for folder in [self.thumb_folder, self.modelos_folder, self.mockups_folder]:
+                folder.mkdir(parents=True, exist_ok=True)
+            self.manifest.save()
+        except Exception as e:
+            print(f"  ❌ Erro ao preparar o staging: {e}")
+            self.stats['errors'] += 1
+            return False
+        return True
+
+    def promote_staging(self) -> bool:
+        """Publica o build do staging de uma vez; a geração substituída fica para --rollback"""
+        if not self.staged:
+            return True
+        self.print_section("🔀 Promovendo build")
+
+        staged_assets = self.thumb_folder.parent
+        live_assets = self._live['thumb_folder'].parent
+        try:
+            # Caminhos das saídas já como ficarão depois da troca
+            self.manifest.relocate(staged_assets, live_assets)
+            self.manifest.save()
+            self.catalog.relocate_outputs(staged_assets, live_assets)
+            self.close_catalog()
+            for attr, value in self._live.items():
+                setattr(self, attr, value)
+            # Diário do manifesto publicado é de uma geração que vai deixar de valer
+            self.manifest.journal_path.unlink(missing_ok=True)
+            previous = self.generations().promote(self.staging_folder)
+        except OSError as e:
+            print(f"  ❌ Erro ao promover {self.staging_folder}: {e}")
+            self.stats['errors'] += 1
+            return False
+        self.manifest.load()
+        self.staged = False
+        print(f"  ✅ Build publicado ({self.swap_mode}); anterior em {previous or '-'}")
+        return True
+
+    def rollback(self) -> bool:
+        """Volta as pastas e JSONs publicados para a geração anterior"""
+        self.print_section("⏪ Voltando à geração anterior")
+        try:
+            self.close_catalog()
+            self.manifest.journal_path.unlink(missing_ok=True)
+            restored = self.generations().rollback()
+        except OSError as e:
+            print(f"  ❌ Erro no rollback: {e}")
+            self.stats['errors'] += 1
+            return False
+        if restored is None:
+            print("  ℹ️  Nenhuma geração anterior guardada")
+            return False
+        print(f"  ✅ Geração de {restored} publicada (a substituída virou a anterior)")
         return True
 
     def preview_name_changes(self) -> List[Tuple[str, str]]:
         """Preview das mudanças de nomes"""
         self.print_section("🔍 Preview das mudanças de nomes")
 
-        if not self.base_folder.exists():
+        if not self.inventory(self.base_folder).exists:
             print(f"  ❌ Pasta {self.base_folder} não encontrada!")
             return []
 
         changes = []
-        for file_path in self.base_folder.iterdir():
-            if file_path.is_file() and file_path.suffix.lower() in self.image_extensions:
-                new_name = self.standardize_filename(file_path.name)
-                if file_path.name != new_name:
-                    changes.append((file_path.name, new_name))
+        for file_path in self.source_files(self.base_folder, self.image_extensions):
+            new_name = self.standardize_filename(file_path.name)
+            if file_path.name != new_name:
+                changes.append((file_path.name, new_name))
 
         if changes:
             print(f"  📊 {len(changes)} arquivos serão renomeados:")
@@ -137,57 +539,46 @@ class UsaTexUpdater:
 
         return changes
 
+    def rename_to_standard(self, file_path: Path) -> Optional[Path]:
+        """Renomeia um arquivo para o nome padronizado; retorna o novo caminho se renomeou"""
+        new_name = self.standardize_filename(file_path.name)
+        if file_path.name == new_name:
+            return None
+
+        new_path = file_path.parent / new_name
+        try:
+            if new_path.exists():
+                print(f"    ⚠️  {new_name} já existe, pulando {file_path.name}")
+                return None
+
+            file_path.rename(new_path)
+            self.inventory(file_path.parent).renamed(file_path, new_path)
+            self.stats['renamed'] += 1
+            print(f"    ✓ {file_path.name} → {new_name}")
+            return new_path
+
+        except Exception as e:
+            print(f"    ❌ Erro ao renomear {file_path.name}: {e}")
+            self.stats['errors'] += 1
+            return None
+
     def rename_files(self) -> bool:
         """Renomeia arquivos para padronizar"""
         self.print_section("📝 Padronizando nomes dos arquivos")
 
         # Processar base-images
-        if self.base_folder.exists():
+        if self.inventory(self.base_folder).exists:
             print(f"  🖼️  Processando {self.base_folder}")
-            for file_path in self.base_folder.iterdir():
-                if file_path.is_file() and file_path.suffix.lower() in self.image_extensions:
-                    new_name = self.standardize_filename(file_path.name)
-
-                    if file_path.name != new_name:
-                        new_path = file_path.parent / new_name
-
-                        try:
-                            if new_path.exists():
-                                print(f"    ⚠️  {new_name} já existe, pulando {file_path.name}")
-                                continue
-
-                            file_path.rename(new_path)
-                            self.stats['renamed'] += 1
-                            print(f"    ✓ {file_path.name} → {new_name}")
-
-                        except Exception as e:
-                            print(f"    ❌ Erro ao renomear {file_path.name}: {e}")
-                            self.stats['errors'] += 1
+            for file_path in self.source_files(self.base_folder, self.image_extensions):
+                self.rename_to_standard(file_path)
         else:
             print(f"  ⚠️  Pasta {self.base_folder} não encontrada!")
 
         # Processar base-mocks
-        if self.base_mocks_folder.exists():
+        if self.inventory(self.base_mocks_folder).exists:
             print(f"  🎭 Processando {self.base_mocks_folder}")
-            for file_path in self.base_mocks_folder.iterdir():
-                if file_path.is_file() and file_path.suffix.lower() in self.image_extensions:
-                    new_name = self.standardize_filename(file_path.name)
-
-                    if file_path.name != new_name:
-                        new_path = file_path.parent / new_name
-
-                        try:
-                            if new_path.exists():
-                                print(f"    ⚠️  {new_name} já existe, pulando {file_path.name}")
-                                continue
-
-                            file_path.rename(new_path)
-                            self.stats['renamed'] += 1
-                            print(f"    ✓ {file_path.name} → {new_name}")
-
-                        except Exception as e:
-                            print(f"    ❌ Erro ao renomear {file_path.name}: {e}")
-                            self.stats['errors'] += 1
+            for file_path in self.source_files(self.base_mocks_folder, self.image_extensions):
+                self.rename_to_standard(file_path)
         else:
             print(f"  ⚠️  Pasta {self.base_mocks_folder} não encontrada!")
 
@@ -196,53 +587,110 @@ class UsaTexUpdater:
 
         return True
 
-    def validate_images(self) -> bool:
-        """Valida integridade das imagens"""
+    def validate_images(self, level: str = 'verify') -> bool:
+        """
+        Valida integridade das imagens em paralelo, no nível pedido:
+        header (cabeçalho e fim do arquivo), verify ou decode (decodificação completa)
+        """
         self.print_section("🔍 Validando integridade das imagens")
 
         if not PIL_AVAILABLE:
             print("  ❌ PIL/Pillow não instalado. Execute: pip install pillow")
             return False
 
-        if not self.base_folder.exists():
+        if not self.inventory(self.base_folder).exists:
             print(f"  ❌ Pasta {self.base_folder} não encontrada!")
             return False
 
-        image_files = [f for f in self.base_folder.iterdir()
-                      if f.is_file() and f.suffix.lower() in self.image_extensions]
+        image_files = self.source_files(self.base_folder, self.image_extensions)
 
-        print(f"  📊 Validando {len(image_files)} imagens...")
+        print(f"  📊 Validando {len(image_files)} imagens (nível {level})...")
 
-        for file_path in image_files:
-            try:
-                with Image.open(file_path) as img:
-                    img.verify()
+        self.catalog.prune(self.base_folder, image_files)
+        cached = 0
+        for file_path, error, from_cache in validate_files(self.catalog, image_files, level,
+                                                          self.jobs, self.stat_of):
+            cached += from_cache
+            if error is None:
                 self.stats['validated'] += 1
-            except Exception as e:
-                print(f"  ❌ {file_path.name}: {e}")
+            else:
+                print(f"  ❌ {file_path.name}: {error}")
                 self.stats['corrupted'] += 1
 
+        if cached:
+            print(f"  ⏭️  {cached} resultados reaproveitados do índice")
+
         print(f"  ✅ {self.stats['validated']} válidas, {self.stats['corrupted']} corrompidas")
         return self.stats['corrupted'] == 0
 
     def find_duplicates(self) -> Dict[str, List[str]]:
-        """Encontra possíveis duplicatas"""
+        """Encontra duplicatas pelo conteúdo (hash exato + hashes perceptuais)"""
         self.print_section("🔍 Verificando duplicatas")
 
-        if not self.base_folder.exists():
+        if not self.inventory(self.base_folder).exists:
             print(f"  ❌ Pasta {self.base_folder} não encontrada!")
             return {}
 
+        if not PIL_AVAILABLE:
+            print("  ⚠️  PIL/Pillow não instalado, agrupando apenas pelo código no nome")
+            return self.find_duplicates_by_name()
+
+        image_files = self.source_files(self.base_folder, self.image_extensions)
+
+        # Hashes do índice valem enquanto tamanho e mtime não mudarem
+        self.catalog.prune(self.base_folder, image_files)
+        hashes, stats, tasks = {}, {}, []
+        for file_path in image_files:
+            stats[str(file_path)] = self.stat_of(file_path)
+            cached = self.catalog.get_hashes(file_path, stats[str(file_path)])
+            if cached:
+                hashes[file_path.name] = cached
+            else:
+                tasks.append({'source': str(file_path)})
+
+        if tasks:
+            print(f"  📊 Calculando hashes de {len(tasks)} imagens "
+                  f"({len(hashes)} em cache)...")
+        for task, result, error in run_tasks(compute_hashes, tasks, self.jobs):
+            file_path = Path(task['source'])
+            if error:
+                print(f"    ❌ Erro ao ler {file_path.name}: {error}")
+                self.stats['errors'] += 1
+                continue
+            self.catalog.put_hashes(file_path, stats[task['source']], result)
+            hashes[file_path.name] = result
+        self.catalog.commit()
+
+        clusters = find_clusters(hashes, max_distance=self.duplicate_distance)
+        duplicates = {cluster[0][0]: [name for name, _, _ in cluster] for cluster in clusters}
+
+        if clusters:
+            print(f"  📊 {len(clusters)} grupos de imagens idênticas ou quase idênticas "
+                  f"(distância pHash ≤ {self.duplicate_distance}):")
+            for cluster in clusters[:5]:  # Mostrar apenas 5
+                head = cluster[0][0]
+                print(f"    {head}:")
+                for name, score, same_bytes in cluster[1:]:
+                    label = "bytes idênticos" if same_bytes else f"{score:.1%} similar"
+                    print(f"      ≈ {name} ({label})")
+            if len(clusters) > 5:
+                print(f"    ... e mais {len(clusters) - 5} grupos")
+        else:
+            print("  ✅ Nenhuma duplicata encontrada")
+
+        return duplicates
+
+    def find_duplicates_by_name(self) -> Dict[str, List[str]]:
+        """Agrupa arquivos pelo código no nome (UC_/UT), sem abrir as imagens"""
         groups = {}
-        for file_path in self.base_folder.iterdir():
-            if file_path.is_file() and file_path.suffix.lower() in self.image_extensions:
-                # Extrair número base
-                base_match = re.search(r'(UC_\d+|UT\d+)', file_path.name)
-                if base_match:
-                    base = base_match.group(1)
-                    if base not in groups:
-                        groups[base] = []
-                    groups[base].append(file_path.name)
+        for file_path in self.source_files(self.base_folder, self.image_extensions):
+            # Extrair número base
+            base_match = re.search(r'(UC_\d+|UT\d+)', file_path.name)
+            if base_match:
+                base = base_match.group(1)
+                if base not in groups:
+                    groups[base] = []
+                groups[base].append(file_path.name)
 
         # Filtrar apenas grupos com múltiplos arquivos
         duplicates = {k: v for k, v in groups.items() if len(v) > 1}
@@ -258,135 +706,609 @@ class UsaTexUpdater:
 
         return duplicates
 
-    def process_images(self) -> bool:
-        """Processa todas as imagens"""
+    def process_images(self, only: Optional[Set[Path]] = None) -> bool:
+        """Processa todas as imagens (ou só as de `only`, no modo --watch)"""
         self.print_section("🖼️  Processando imagens")
 
         if not PIL_AVAILABLE:
             print("  ❌ PIL/Pillow não instalado. Execute: pip install pillow")
             return False
 
-        if not self.base_folder.exists():
+        if not self.inventory(self.base_folder).exists:
             print(f"  ❌ Pasta {self.base_folder} não encontrada!")
             return False
 
-        image_files = [f for f in self.base_folder.iterdir()
-                      if f.is_file() and f.suffix.lower() in self.image_extensions]
+        image_files = self.source_files(self.base_folder, self.image_extensions)
+        candidates = image_files if only is None else [f for f in image_files if f in only]
 
-        total = len(image_files)
+        total = len(candidates)
         print(f"  📊 Processando {total} imagens...")
 
-        for i, file_path in enumerate(image_files, 1):
-            try:
-                # Determinar nome de saída
-                output_name = file_path.name
-                if file_path.name.startswith(('UC_', 'UT')):
-                    parts = file_path.name.split('_', 1)
-                    if len(parts) > 1:
-                        output_name = parts[1]
-
-                if i % 50 == 0:  # Log a cada 50 imagens
-                    print(f"    [{i:3d}/{total}] Processando: {file_path.name}")
-
-                with Image.open(file_path) as img:
-                    # Converter para RGB se necessário
-                    if img.mode in ('RGBA', 'LA', 'P'):
-                        img = img.convert('RGB')
-
-                    # Criar thumbnail
-                    thumb_img = img.copy()
-                    thumb_img.thumbnail(self.thumb_size, Image.Resampling.LANCZOS)
-
-                    # Centralizar em canvas 128x128
-                    thumb_canvas = Image.new('RGB', self.thumb_size, (255, 255, 255))
-                    offset = ((self.thumb_size[0] - thumb_img.width) // 2,
-                             (self.thumb_size[1] - thumb_img.height) // 2)
-                    thumb_canvas.paste(thumb_img, offset)
-
-                    thumb_path = self.thumb_folder / output_name
-                    thumb_canvas.save(thumb_path, "JPEG", quality=85, optimize=True)
-                    self.stats['thumbs_created'] += 1
-
-                    # Criar modelo redimensionado
-                    modelo_img = img.copy()
-                    modelo_img.thumbnail(self.modelos_size, Image.Resampling.LANCZOS)
-                    modelo_path = self.modelos_folder / output_name
-                    modelo_img.save(modelo_path, "JPEG", quality=90, optimize=True)
-                    self.stats['modelos_created'] += 1
-
-            except Exception as e:
-                print(f"    ❌ Erro ao processar {file_path.name}: {e}")
-                self.stats['errors'] += 1
+        settings = self.image_settings()
+        for ext in self.variant_formats:
+            if ext not in settings['variants']:
+                print(f"  ⚠️  Este Pillow não grava {ext.upper()}, variante ignorada")
+        if self.placeholders and 'placeholder' not in settings:
+            print("  ⚠️  NumPy não instalado: placeholders (BlurHash/LQIP) ignorados")
+        if self.similarity and 'similarity' not in settings:
+            print("  ⚠️  NumPy não instalado: índice de similaridade ignorado")
+        if self.adaptive_quality and 'adaptive' not in settings:
+            print("  ⚠️  NumPy não instalado: qualidade adaptativa ignorada")
+        if not self.manifest.loaded:
+            self.manifest.load()
+        if self.incremental:
+            self.remove_outputs(self.manifest.prune(self.base_folder, image_files))
+        self.catalog.prune(self.base_folder, image_files)
+
+        # Duas fontes com o mesmo nome de saída: a última da lista vence
+        sources: Dict[str, Path] = {}
+        for file_path in candidates:
+            output_name = self.output_name_for(file_path)
+            if output_name in sources:
+                print(f"    ⚠️  {file_path.name} e {sources[output_name].name} "
+                      f"geram {output_name}, usando {file_path.name}")
+            sources[output_name] = file_path
+
+        # O CLI é só um consumidor do stream: loga o progresso e os erros
+        done = 0
+        for event in self.stream_images(sources.values(), refresh=False):
+            if isinstance(event, ImageSkipped):
+                continue
+            done += 1
+            self.log_progress(done, total, 50, event.source,
+                              event.error if isinstance(event, ImageFailed) else None)
+        if 'adaptive' in settings:
+            self.report_adaptive_quality(settings)
 
         print(f"  ✅ Processamento concluído: {self.stats['thumbs_created']} imagens")
+        if self.stats['skipped']:
+            print(f"  ⏭️  {self.stats['skipped']} fontes sem alterações foram puladas")
         return True
 
-    def process_mockups(self) -> bool:
-        """Processa mockups da pasta base-mocks"""
+    def image_task(self, file_path: Path, settings: dict, stat: os.stat_result) -> dict:
+        """Tarefa de renderização de uma fonte de imagem"""
+        output_name = self.output_name_for(file_path)
+        task = {
+            'source': str(file_path),
+            'thumb': str(self.thumb_folder / output_name),
+            'modelo': str(self.modelos_folder / output_name),
+            'settings': settings,
+        }
+        if 'adaptive' in settings:
+            # Qualidade já escolhida para este conteúdo: o worker confere o SHA-256
+            task['quality_cache'] = self.catalog.cached_quality(file_path, stat,
+                                                                quality_key(settings))
+        return task
+
+    def stream_images(self, sources: Iterable[Path], cancel: Optional[threading.Event] = None,
+                      refresh: bool = True) -> Iterator[ImageEvent]:
+        """
+        API de biblioteca: renderiza as fontes dadas (thumb, modelo, escada e
+        variantes) e gera um evento por imagem na ordem de conclusão:
+        ImageDone, ImageFailed ou ImageSkipped (--incremental, sem mudanças).
+
+        As fontes são tiradas do iterável só quando há vaga para renderizar,
+        então um consumidor lento segura o trabalho. Com `cancel` acionado, ou
+        com o gerador fechado, nenhuma fonte nova começa. O manifesto e o
+        catálogo são gravados ao final, mesmo se cancelado.
+
+        `refresh` relê o stat de cada fonte em vez de confiar no inventário
+        (que pode estar velho num processo de longa duração). Pastas ainda não
+        varridas não são varridas: o stat vem direto de cada fonte pedida.
+        """
+        settings = self.image_settings()
+        if not self.manifest.loaded:
+            self.manifest.load()
+        immediate: deque = deque()  # Eventos sem renderização, entregues entre os resultados
+
+        def tasks():
+            for file_path in map(Path, sources):
+                try:
+                    if refresh and file_path.parent in self.inventories:
+                        self.inventories[file_path.parent].refresh([file_path])
+                    stat = self.stat_of(file_path)
+                except OSError as e:
+                    immediate.append(ImageFailed(file_path, f"{type(e).__name__}: {e}"))
+                    continue
+                source_settings = settings
+                if self.incremental:
+                    # Fonte renderizada com/sem o modo reduzido do orçamento não está em dia
+                    source_settings = self.budget_settings(file_path, settings)
+                    if self.manifest.is_fresh(file_path, source_settings, stat):
+                        self.stats['skipped'] += 1
+                        immediate.append(ImageSkipped(file_path))
+                        continue
+                yield self.image_task(file_path, source_settings, stat)
+
+        try:
+            for task, result, error in self.render_stream(render_image, tasks(), 'images', cancel):
+                while immediate:
+                    yield immediate.popleft()
+                source = Path(task['source'])
+                if error:
+                    yield ImageFailed(source, error)
+                    continue
+                yield ImageDone(source, [Output(kind, Path(path), size)
+                                         for kind, path, size in result['files']],
+                                result['hash'], dict(result['info']), dict(result['timings']),
+                                result.get('quality'))
+            while immediate:
+                yield immediate.popleft()
+        finally:
+            self.manifest.save()
+
+    def log_progress(self, done: int, total: int, every: int, source: Path,
+                     error: Optional[str] = None):
+        """Log a cada `every` arquivos concluídos; erros sempre"""
+        if error:
+            print(f"    ❌ Erro ao processar {source.name}: {error}")
+        elif done % every == 0:
+            print(f"    [{done:3d}/{total}] Concluído: {source.name}")
+
+    def process_mockups(self, only: Optional[Set[Path]] = None) -> bool:
+        """Processa mockups da pasta base-mocks (ou só os de `only`, no modo --watch)"""
         self.print_section("🎭 Processando mockups")
 
         if not PIL_AVAILABLE:
             print("  ❌ PIL/Pillow não instalado. Execute: pip install pillow")
             return False
 
-        if not self.base_mocks_folder.exists():
+        if not self.inventory(self.base_mocks_folder).exists:
             print(f"  ⚠️  Pasta {self.base_mocks_folder} não encontrada!")
             return True  # Não é erro crítico, pode não ter mockups
 
-        mockup_files = [f for f in self.base_mocks_folder.iterdir()
-                       if f.is_file() and f.suffix.lower() in self.mockup_extensions]
+        mockup_files = self.source_files(self.base_mocks_folder, self.mockup_extensions)
+        candidates = mockup_files if only is None else [f for f in mockup_files if f in only]
 
         if not mockup_files:
             print("  ℹ️  Nenhum mockup encontrado")
             return True
 
-        total = len(mockup_files)
+        total = len(candidates)
         print(f"  📊 Processando {total} mockups...")
 
-        for i, file_path in enumerate(mockup_files, 1):
-            try:
-                output_name = self.standardize_filename(file_path.name)
+        settings = self.mockup_settings()
+        if not self.manifest.loaded:
+            self.manifest.load()
+        if self.incremental:
+            self.remove_outputs(self.manifest.prune(self.base_mocks_folder, mockup_files))
+        self.catalog.prune(self.base_mocks_folder, mockup_files)
+
+        tasks = []
+        for file_path in candidates:
+            if self.incremental and self.manifest.is_fresh(file_path, settings,
+                                                           self.stat_of(file_path)):
+                self.stats['skipped'] += 1
+                continue
+
+            output_name = self.standardize_filename(file_path.name)
+            tasks.append({
+                'source': str(file_path),
+                'mockup': str(self.mockups_folder / output_name),
+                'settings': settings,
+            })
+
+        self.run_render_tasks(render_mockup, tasks, 'mockups', log_every=10)
+        self.report_mockup_png()
+
+        self.manifest.save()
+        print(f"  ✅ Processamento de mockups concluído: {self.stats['mockups_processed']} mockups")
+        return True
 
-                if i % 10 == 0:  # Log a cada 10 mockups
-                    print(f"    [{i:2d}/{total}] Processando: {file_path.name}")
-
-                with Image.open(file_path) as img:
-                    # Preservar transparência para mockups
-                    original_mode = img.mode
-
-                    # Redimensionar mantendo proporção
-                    img.thumbnail(self.mockup_size, Image.Resampling.LANCZOS)
-
-                    mockup_path = self.mockups_folder / output_name
-
-                    # Salvar mantendo transparência se for PNG
-                    if file_path.suffix.lower() == '.png' and original_mode in ('RGBA', 'LA', 'P'):
-                        # Manter como PNG com transparência
-                        if original_mode == 'P':
-                            img = img.convert('RGBA')
-                        output_name_png = output_name.rsplit('.', 1)[0] + '.png'
-                        mockup_path = self.mockups_folder / output_name_png
-                        img.save(mockup_path, "PNG", optimize=True)
-                    else:
-                        # Converter para RGB apenas se não for PNG com transparência
-                        if img.mode in ('RGBA', 'LA', 'P'):
-                            if img.mode == 'RGBA':
-                                # Criar fundo branco e colar a imagem
-                                background = Image.new('RGB', img.size, (255, 255, 255))
-                                background.paste(img, mask=img.split()[-1])  # usar canal alpha como máscara
-                                img = background
-                            else:
-                                img = img.convert('RGB')
-
-                        img.save(mockup_path, "JPEG", quality=90, optimize=True)
-
-                    self.stats['mockups_processed'] += 1
+    def run_render_tasks(self, render_func, tasks: List[dict], source_class: str, log_every: int):
+        """Executa as tarefas de renderização (em paralelo se jobs > 1) e loga o progresso"""
+        for i, (task, _, error) in enumerate(self.render_stream(render_func, tasks, source_class), 1):
+            self.log_progress(i, len(tasks), log_every, Path(task['source']), error)
 
-            except Exception as e:
-                print(f"    ❌ Erro ao processar {file_path.name}: {e}")
-                self.stats['errors'] += 1
+    def render_stream(self, render_func, tasks: Iterable[dict], source_class: str,
+                      cancel: Optional[threading.Event] = None):
+        """
+        Executa as tarefas de renderização (em paralelo se jobs > 1), registra
+        cada resultado no manifesto, no catálogo e nas métricas e gera
+        (task, resultado, erro) na ordem de conclusão
+        """
+        if self.memory_budget or (self.pipeline and render_func is render_image):
+            # Orçamento e pipeline planejam/enfileiram o lote inteiro de uma vez
+            tasks = list(tasks)
+        total = len(tasks) if isinstance(tasks, list) else None
+        if self.memory_budget and total:
+            self.plan_memory_budget(tasks, source_class)
+        staged = None
+        if self.pipeline and render_func is render_image and total:
+            staged = StagedPipeline(self.jobs, self.io_threads, budget=self.memory_budget)
+            print(f"  ⚙️  Pipeline: {self.io_threads} leitores, {self.jobs} renderizadores, "
+                  f"{self.io_threads} gravadores, filas de {staged.queue_size}")
+            results = staged.run(tasks, cancel)
+        else:
+            count = total
+            if count is None:
+                # Iterável preguiçoso: espia as duas primeiras para saber se vai haver pool
+                tasks = iter(tasks)
+                head = list(islice(tasks, 2))
+                tasks, count = chain(head, tasks), len(head)
+            if self.jobs > 1 and count > 1:
+                limit = ", admitidos pelo orçamento de memória" if self.memory_budget else ""
+                print(f"  ⚙️  Usando {min(self.jobs, total or self.jobs)} processos{limit}")
+            results = run_tasks(render_func, tasks, self.jobs, self.memory_budget, cancel)
 
-        print(f"  ✅ Processamento de mockups concluído: {self.stats['mockups_processed']} mockups")
+        try:
+            for task, result, error in results:
+                self.record_result(task, result, error, source_class)
+                yield task, result, error
+        finally:
+            results.close()
+            self.catalog.commit()
+        if staged:
+            self.report_pipeline(staged.report())
+        if self.memory_budget and total:
+            self.report_memory(tasks)
+
+    def record_result(self, task: dict, result: Optional[dict], error: Optional[str],
+                      source_class: str):
+        """Consolida o resultado de uma tarefa no manifesto, no catálogo e nas métricas"""
+        source = Path(task['source'])
+        stat = self.stat_of(source)
+
+        if error:
+            self.stats['errors'] += 1
+            self.failures.append((source.name, error))
+            # Falha ao renderizar não diz que a fonte é inválida: a validação fica como estava
+            self.catalog.update(source, stat, render_error=error)
+            return
+
+        for key, value in result['stats'].items():
+            self.stats[key] += value
+        stale = self.manifest.record(source, task['settings'], result['outputs'], result['hash'],
+                                     result.get('trim'), stat)
+        self.remove_outputs(stale)
+        # Renderizar decodifica a fonte inteira: vale como validação completa
+        placeholder, features = result.get('placeholder'), result.get('features')
+        self.catalog.update(source, stat, sha256=result['hash'], valid=1,
+                            validated_level=VALIDATION_LEVELS.index('decode'), error=None,
+                            render_error=None,
+                            placeholder=json.dumps(placeholder) if placeholder else None,
+                            features=json.dumps(features) if features else None,
+                            **result['info'])
+        self.catalog.set_outputs(source, result['files'])
+        if result.get('quality'):
+            choice = result['quality']
+            self.adaptive_stats['cached' if choice['cached'] else 'searched'] += 1
+            self.adaptive_stats['seconds'] += result['timings'].get('quality', 0.0)
+            modelo_bytes = next(size for kind, _, size in result['files'] if kind == 'modelo')
+            self.catalog.put_quality(result['hash'], quality_key(task['settings']),
+                                     choice, modelo_bytes)
+        self.metrics.record_render(source_class, stat.st_size, result)
+        self.metrics.record_memory(source.name, result, task.get('memory'))
+        if result.get('png'):
+            self.metrics.record_png(source.name, result['png'], result.get('trim'))
+
+    def report_adaptive_quality(self, settings: dict):
+        """Economia da qualidade adaptativa no catálogo inteiro e o custo da busca nesta execução"""
+        run = self.adaptive_stats
+        totals = self.catalog.quality_totals(quality_key(settings))
+        self.metrics.adaptive_quality = dict(run, catalog=totals)
+        print(f"  🎯 Qualidade adaptativa (SSIM >= {self.adaptive_quality}): "
+              f"{run['searched']} buscas, {run['cached']} do cache, "
+              f"+{run['seconds']:.2f}s de codificação")
+        if totals['images'] and totals['fixed_bytes']:
+            print(f"    Catálogo: {totals['images']} modelos, qualidade média "
+                  f"{totals['mean_quality']:.1f} ({totals['min_quality']}-{totals['max_quality']}); "
+                  f"{totals['bytes'] / 2**20:.1f} MiB em vez de {totals['fixed_bytes'] / 2**20:.1f} MiB "
+                  f"na qualidade fixa {self.modelos_quality} "
+                  f"({totals['bytes'] / totals['fixed_bytes'] - 1:+.1%})")
+
+    def report_mockup_png(self):
+        """Bytes antes (PNG RGBA com optimize) e depois da otimização, por mockup PNG"""
+        reports = self.metrics.mockup_png
+        if not reports:
+            return
+        print(f"\n  {'mockup PNG':<30} {'antes':>10} {'depois':>10} {'':>7} {'escolha':<16} {'erro':>5}")
+        for name, entry in sorted(reports.items()):
+            error = f"{entry['error']:.2f}" if entry['error'] is not None else "-"
+            trimmed = " ✂️" if entry.get('trim') else ""
+            print(f"  {name:<30} {entry['before']:>10,} {entry['after']:>10,} "
+                  f"{entry['after'] / entry['before'] - 1:>+7.1%} {entry['choice']:<16} {error:>5}{trimmed}")
+        before = sum(entry['before'] for entry in reports.values())
+        after = sum(entry['after'] for entry in reports.values())
+        print(f"  💾 Mockups PNG: {before / 1024:.0f} KiB → {after / 1024:.0f} KiB "
+              f"({after / before - 1:+.1%}); ✂️ = bordas transparentes recortadas")
+
+    def budget_settings(self, file_path: Path, settings: dict) -> dict:
+        """Configurações de uma fonte de imagem, com 'low_memory' se ela passa do orçamento"""
+        if not self.memory_budget:
+            return settings
+        try:
+            return low_memory_settings(file_path, settings, self.memory_budget)
+        except Exception:
+            return settings  # Cabeçalho ilegível: a renderização reporta o erro
+
+    def plan_memory_budget(self, tasks: List[dict], source_class: str):
+        """Estima a memória de cada tarefa pelo cabeçalho e marca as que passam do orçamento"""
+        plan = plan_memory(tasks, source_class, self.memory_budget)
+        self.metrics.memory_budget = self.memory_budget
+        largest = max(task['memory'] for task in tasks)
+        print(f"  🧠 Orçamento de memória: {self.memory_budget / 2**20:.0f} MiB "
+              f"(maior estimativa: {largest / 2**20:.0f} MiB)")
+        if plan['over']:
+            print(f"    ⚠️  {len(plan['over'])} fontes acima do orçamento: decodificação "
+                  f"em escala reduzida (JPEG) ou redimensionamento em faixas (os demais "
+                  f"formatos ainda decodificam a fonte inteira)")
+        for task in plan['alone']:
+            print(f"    ⚠️  {Path(task['source']).name} ainda estima "
+                  f"{task['memory'] / 2**20:.0f} MiB: roda sozinha")
+
+    def report_memory(self, tasks: List[dict], top: int = 5):
+        """Imagens com maior pico de RSS, ao lado da estimativa usada na admissão"""
+        names = {Path(task['source']).name for task in tasks}
+        peaks = [(name, entry) for name, entry in self.metrics.memory.items()
+                 if entry.get('peak_rss_kb') and name in names]
+        if not peaks:
+            return
+        peaks.sort(key=lambda item: item[1]['peak_rss_kb'], reverse=True)
+        print("  🧠 Maiores picos de RSS por imagem (acima da base do processo / estimado):")
+        for name, entry in peaks[:top]:
+            growth = entry.get('rss_growth_kb')
+            growth = f"+{growth / 1024:.0f}" if growth is not None else "n/d"
+            estimate = entry.get('estimated_bytes')
+            estimate = f"{estimate / 2**20:.0f}" if estimate is not None else "n/d"
+            print(f"    {name:<30} {entry['peak_rss_kb'] / 1024:>6.0f} MiB "
+                  f"({growth} / {estimate} MiB)")
+
+    def report_pipeline(self, report: dict):
+        """Mostra fila e espera por estágio do pipeline e qual estágio limita a vazão"""
+        self.metrics.record_pipeline(report)
+        print(f"\n  {'estágio':<8} {'workers':>7} {'ocupado':>9} {'faminto':>9} "
+              f"{'bloqueado':>10} {'uso':>6} {'fila méd/máx':>13}")
+        for name, entry in report['stages'].items():
+            utilization = f"{entry['utilization']:.0%}" if entry['utilization'] is not None else "n/d"
+            print(f"  {name:<8} {entry['workers']:>7} {entry['busy_seconds']:>8.2f}s "
+                  f"{entry['starved_seconds']:>8.2f}s {entry['blocked_seconds']:>9.2f}s "
+                  f"{utilization:>6} {entry['queue_depth_mean']:>7.1f}/{entry['queue_depth_max']:<5}")
+        print(f"  🐢 Gargalo: {report['bottleneck']}")
+        if report.get('memory'):
+            memory = report['memory']
+            print(f"  🧠 Memória estimada em uso (máx.): {memory['peak_estimated_bytes'] / 2**20:.0f} "
+                  f"de {memory['budget_bytes'] / 2**20:.0f} MiB; "
+                  f"{memory['admission_waits']} esperas por orçamento")
+
+    def compare_render_paths(self, sample: int = 20) -> bool:
+        """Compara qualidade, tempo e pico de memória dos caminhos de renderização"""
+        self.print_section("⚖️  Comparando caminhos de renderização")
+
+        if not PIL_AVAILABLE:
+            print("  ❌ PIL/Pillow não instalado. Execute: pip install pillow")
+            return False
+
+        if not self.inventory(self.base_folder).exists:
+            print(f"  ❌ Pasta {self.base_folder} não encontrada!")
+            return False
+
+        image_files = [str(f) for f in self.source_files(self.base_folder, self.image_extensions)]
+        sources = image_files[:sample] if sample > 0 else image_files
+        if not sources:
+            print("  ℹ️  Nenhuma imagem encontrada")
+            return True
+
+        print(f"  📊 Amostra: {len(sources)} imagens")
+
+        results = {}
+        for path in RENDER_PATHS:
+            settings = dict(self.image_settings(), render=path)
+            # Processo novo por caminho: o pico de RSS não se mistura entre eles
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                results[path] = pool.submit(benchmark_render, sources, settings).result()
+
+        for source, error in results['classic']['errors'].items():
+            print(f"  ❌ {Path(source).name}: {error}")
+            self.stats['errors'] += 1
+        sources = [src for src in sources if all(src in r['outputs'] for r in results.values())]
+        if not sources:
+            return False
+
+        print(f"\n  {'caminho':<10} {'total':>9} {'média':>9} {'pico RSS':>10} {'bytes thumb':>12} {'bytes modelo':>13}")
+        for path, result in results.items():
+            total_time = sum(result['timings'])
+            thumb_bytes = sum(len(out[0]) for out in result['outputs'].values())
+            modelo_bytes = sum(len(out[1]) for out in result['outputs'].values())
+            rss = f"{result['peak_rss_kb'] / 1024:.0f} MiB" if result['peak_rss_kb'] else "n/d"
+            print(f"  {path:<10} {total_time:>8.2f}s {total_time / len(result['timings']) * 1000:>7.0f}ms "
+                  f"{rss:>10} {thumb_bytes:>12,} {modelo_bytes:>13,}")
+
+        # Qualidade: PSNR do caminho novo em relação ao atual
+        thumb_psnr, modelo_psnr = [], []
+        for source in sources:
+            new_out = results['cascade']['outputs'][source]
+            old_out = results['classic']['outputs'][source]
+            thumb_psnr.append(psnr(old_out[0], new_out[0]))
+            modelo_psnr.append(psnr(old_out[1], new_out[1]))
+
+        print("\n  PSNR cascade x classic (maior é mais parecido):")
+        for label, values in (("Thumbs: ", thumb_psnr), ("Modelos:", modelo_psnr)):
+            finite = [v for v in values if v != float('inf')]
+            identical = len(values) - len(finite)
+            if finite:
+                print(f"    {label} média {sum(finite) / len(finite):.2f} dB, "
+                      f"mínimo {min(finite):.2f} dB, {identical} idênticos")
+            else:
+                print(f"    {label} todos os {identical} idênticos")
+        worst = min(zip(modelo_psnr, sources))
+        print(f"    Pior modelo: {Path(worst[1]).name} ({worst[0]:.2f} dB)")
+        return True
+
+    def compare_encoder_presets(self, sample: int = 10) -> bool:
+        """Codifica uma amostra com cada preset e compara tempo de codificação, bytes e PSNR"""
+        self.print_section("⚖️  Comparando presets do codificador")
+
+        if not PIL_AVAILABLE:
+            print("  ❌ PIL/Pillow não instalado. Execute: pip install pillow")
+            return False
+
+        if not self.inventory(self.base_folder).exists:
+            print(f"  ❌ Pasta {self.base_folder} não encontrada!")
+            return False
+
+        image_files = [str(f) for f in self.source_files(self.base_folder, self.image_extensions)]
+        sources = image_files[:sample] if sample > 0 else image_files
+        if not sources:
+            print("  ℹ️  Nenhuma imagem encontrada")
+            return True
+
+        options = {name: {'thumb': encoder_options(preset, self.thumb_quality),
+                          'modelo': encoder_options(preset, self.modelos_quality)}
+                   for name, preset in self.encoder_presets.items()}
+        # Renderiza uma vez por fonte: só a codificação muda entre presets
+        result = benchmark_encoders(sources, self.image_settings(), options)
+        for source, error in result['errors'].items():
+            print(f"  ❌ {Path(source).name}: {error}")
+            self.stats['errors'] += 1
+        images = result['images']
+        if not images:
+            return False
+
+        print(f"  📊 Amostra: {images} imagens (* = preset em uso na classe)")
+        print(f"\n  {'preset':<13} {'classe':<7} {'codif./img':>10} {'bytes':>12} "
+              f"{'x ' + DEFAULT_PRESET:>12} {'PSNR':>9}")
+        for cls in ('thumb', 'modelo'):
+            reference = result['results'][DEFAULT_PRESET][cls]['bytes']
+            for name, by_class in result['results'].items():
+                entry = by_class[cls]
+                finite = [v for v in entry['psnr'] if v != float('inf')]
+                quality = f"{sum(finite) / len(finite):.2f} dB" if finite else "idêntico"
+                marker = '*' if self.preset_choice[cls] == name else ' '
+                print(f"  {marker}{name:<12} {cls:<7} {entry['time'] / images * 1000:>8.1f}ms "
+                      f"{entry['bytes']:>12,} {(entry['bytes'] / reference - 1) * 100:>+11.1f}% "
+                      f"{quality:>9}")
+            print()
+        return True
+
+    def query_catalog(self, conditions: List[str], limit: Optional[int] = None) -> bool:
+        """Consulta o índice do catálogo sem abrir nenhuma imagem"""
+        self.print_section("🔎 Consultando o índice do catálogo")
+
+        if not self.catalog_path.exists():
+            print(f"  ⚠️  Índice {self.catalog_path} ainda não existe. Execute o processamento primeiro")
+            return False
+
+        started = time.perf_counter()
+        try:
+            rows = self.catalog.query(conditions, limit)
+        except ValueError as e:
+            print(f"  ❌ {e}")
+            return False
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        for row in rows:
+            dims = f"{row['width']}x{row['height']}" if row['width'] else "?"
+            status = "⚠️" if row['render_error'] else {1: "✅", 0: "❌"}.get(row['valid'], "❔")
+            line = f"  {status} {row['path']:<40} {dims:>11} {row['mode'] or '':<5} " \
+                   f"{row['format'] or '':<5} {row['size']:>11,} B → {row['output_bytes']:>9,} B"
+            if row['error']:
+                line += f"  ({row['error']})"
+            if row['render_error']:
+                line += f"  (processamento: {row['render_error']})"
+            print(line)
+
+        print(f"\n  📊 {len(rows)} fontes em {elapsed_ms:.1f} ms")
+        return True
+
+    def build_thumb_atlas(self) -> bool:
+        """Empacota os thumbs em páginas de atlas e gera listaAtlas.json"""
+        self.print_section("🧩 Gerando atlas de thumbnails")
+
+        thumbs = {name: path for name, path in self.published_files(self.thumb_folder).items()
+                  if Path(name).suffix.lower() in self.image_extensions}
+
+        try:
+            result = build_atlas(thumbs, self.atlas_folder, self.json_folder / 'listaAtlas.json',
+                                 self.atlas_page_size, self.thumb_size,
+                                 self.atlas_format, self.atlas_quality)
+        except Exception as e:
+            print(f"  ❌ Erro ao gerar atlas: {e}")
+            self.stats['errors'] += 1
+            return False
+
+        print(f"  ✅ {len(thumbs)} thumbs em {result['pages']} páginas "
+              f"({result['written']} regravadas, {result['reused']} sem mudanças)")
+        if result['removed']:
+            print(f"  🗑️  {result['removed']} páginas antigas removidas")
+        return True
+
+    def load_similarity_index(self):
+        """Índice de similaridade dos thumbs publicados, com o que está no catálogo"""
+        from usatex.similarity import SimilarityIndex
+
+        published = {name for name in self.published_files(self.thumb_folder)
+                     if Path(name).suffix.lower() in self.image_extensions}
+        stored = self.by_logical_name(self.catalog.features())
+        return SimilarityIndex.build({name: value for name, value in stored.items()
+                                      if name in published}, self.similarity_colors)
+
+    def build_similarity_index(self) -> bool:
+        """Grava o índice de cores (.npz) e os vizinhos pré-calculados em listaSimilares.json"""
+        self.print_section("🎨 Gerando índice de similaridade")
+
+        if not NUMPY_AVAILABLE:
+            print("  ⚠️  NumPy não instalado: índice de similaridade ignorado")
+            return True
+
+        try:
+            started = time.perf_counter()
+            index = self.load_similarity_index()
+            index.save(self.similarity_path)
+            data = {
+                # {nome: [[vizinho, semelhança 0-1], ...]}, do mais parecido ao menos
+                'vizinhos': index.neighbours(self.similar_count),
+                # Cores dominantes de cada imagem, da mais presente à menos
+                'cores': {name: index.palette_of(name) for name in index.names},
+            }
+            with open(self.json_folder / 'listaSimilares.json', 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        except Exception as e:
+            print(f"  ❌ Erro ao gerar índice de similaridade: {e}")
+            self.stats['errors'] += 1
+            return False
+
+        print(f"  ✅ {len(index)} imagens indexadas, {self.similar_count} vizinhos cada "
+              f"({time.perf_counter() - started:.2f}s)")
+        return True
+
+    def query_similarity(self, similar_to: Optional[str] = None,
+                         color: Optional[str] = None, top: int = 12):
+        """Consulta o índice de similaridade (--similar / --near-color)"""
+        if not NUMPY_AVAILABLE:
+            print("❌ NumPy não instalado. Execute: pip install numpy")
+            return False
+        from usatex.similarity import SimilarityIndex
+
+        if self.similarity_path.exists():
+            index = SimilarityIndex.load(self.similarity_path)
+        else:
+            index = self.load_similarity_index()
+        if not len(index):
+            print("❌ Índice vazio: rode o processamento completo antes")
+            return False
+
+        started = time.perf_counter()
+        try:
+            if similar_to is not None:
+                name = similar_to if Path(similar_to).suffix else f"{similar_to}.jpg"
+                if name not in index.positions:
+                    print(f"❌ {name} não está no índice")
+                    return False
+                title = f"🎨 Parecidas com {name} ({' '.join(index.palette_of(name))})"
+                results = index.similar(name, top)
+            else:
+                title = f"🎨 Perto da cor {color}"
+                results = index.near_color(color, top)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return False
+        elapsed = (time.perf_counter() - started) * 1000
+
+        self.print_section(title)
+        for name, score in results:
+            print(f"  {score:6.3f}  {name:<32} {' '.join(index.palette_of(name))}")
+        print(f"\n  ⏱️  {len(index)} imagens consultadas em {elapsed:.2f} ms")
         return True
 
     def generate_images_json(self) -> bool:
@@ -394,18 +1316,28 @@ class UsaTexUpdater:
         self.print_section("📄 Gerando listaImages.json")
 
         try:
-            image_files = []
-            if self.thumb_folder.exists():
-                image_files = [f.name for f in self.thumb_folder.iterdir()
-                              if f.is_file() and f.suffix.lower() in self.image_extensions]
-                image_files.sort()
-
-            data = {'imagens': image_files}
-
-            with open('./listaImages.json', 'w', encoding='utf-8') as f:
+            image_files = sorted(name for name in self.published_files(self.thumb_folder)
+                                 if Path(name).suffix.lower() in self.image_extensions)
+
+            formats = [ext for ext in VARIANT_FORMATS if ext in self.variant_formats]
+            variants, files = self.collect_variants(image_files, formats)
+            data = {
+                'imagens': image_files,
+                # URL = /assets/<thumb|modelos>/ + formatos[fmt] com {nome} = item de imagens
+                'formatos': variant_url_patterns(formats),
+                'variantes': variants,
+                # Pintados antes da imagem chegar: {nome: {thumb|modelo: {blurhash, cor, lqip}}}
+                'placeholders': self.collect_placeholders(image_files),
+            }
+            if self.hashed_names:
+                # Com hash no nome os formatos acima não valem: URL = /assets/ + arquivos[nome][pasta][fmt]
+                data['arquivos'] = files
+
+            with open(self.json_folder / 'listaImages.json', 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
 
             print(f"  ✅ listaImages.json criado com {len(image_files)} imagens")
+            self.report_variant_savings(variants)
             return True
 
         except Exception as e:
@@ -413,32 +1345,135 @@ class UsaTexUpdater:
             self.stats['errors'] += 1
             return False
 
+    def collect_variants(self, image_files: List[str],
+                         formats: List[str]) -> Tuple[Dict[str, dict], Dict[str, dict]]:
+        """
+        Bytes de cada formato disponível de thumb e modelo, por imagem, e a
+        escada de resoluções do modelo (do menor degrau ao modelo completo).
+        Retorna também os caminhos publicados {nome: {pasta: {formato: caminho}}},
+        relativos a /assets (com --hashed-names são os nomes com hash).
+        """
+        assets = self.thumb_folder.parent
+        folders: Dict[Path, Dict[str, Path]] = {}
+
+        def outputs_of(path: Path) -> Dict[str, Path]:
+            """Arquivos publicados de uma saída lógica e das suas variantes"""
+            found = {}
+            for fmt, logical in [('jpeg', path)] + [(ext, variant_path(path, ext)) for ext in formats]:
+                if logical.parent not in folders:
+                    folders[logical.parent] = self.published_files(logical.parent)
+                real = folders[logical.parent].get(logical.name)
+                if real:
+                    found[fmt] = real
+            return found
+
+        def sizes_of(found: Dict[str, Path]) -> Dict[str, int]:
+            return {fmt: path.stat().st_size for fmt, path in found.items()}
+
+        def relative(found: Dict[str, Path]) -> Dict[str, str]:
+            return {fmt: path.relative_to(assets).as_posix() for fmt, path in found.items()}
+
+        variants = {}
+        files = {}
+        for name in image_files:
+            modelo = self.modelos_folder / name
+            thumb_found, modelo_found = outputs_of(self.thumb_folder / name), outputs_of(modelo)
+            entry = {'thumb': sizes_of(thumb_found), 'modelo': sizes_of(modelo_found)}
+            paths = {'thumb': relative(thumb_found)}
+
+            ladder = []
+            steps = [ladder_path(modelo, step) for step in sorted(self.modelo_ladder)] + [modelo]
+            for path in steps:
+                found = modelo_found if path == modelo else outputs_of(path)
+                if 'jpeg' not in found:
+                    continue
+                with Image.open(found['jpeg']) as img:  # Só o cabeçalho
+                    width, height = img.size
+                folder = path.parent.relative_to(assets).as_posix()
+                ladder.append({'pasta': folder, 'largura': width, 'altura': height,
+                               'bytes': sizes_of(found)})
+                paths[folder] = relative(found)
+            entry['escada'] = ladder
+            variants[name] = entry
+            files[name] = paths
+        return variants, files
+
+    def collect_placeholders(self, image_files: List[str]) -> Dict[str, dict]:
+        """Placeholders calculados na renderização (guardados no catálogo), por imagem"""
+        if not self.placeholders:
+            return {}
+        stored = self.by_logical_name(self.catalog.placeholders())
+        return {name: stored[name] for name in image_files if name in stored}
+
+    def by_logical_name(self, stored: Dict[str, dict]) -> Dict[str, dict]:
+        """Dados do catálogo (pelo nome do thumb gravado) pelo nome lógico da imagem"""
+        if not self.hashed_names:
+            return stored
+        return {logical_name(name): value for name, value in stored.items()}
+
+    def report_variant_savings(self, variants: Dict[str, dict]):
+        """Bytes economizados servindo o menor formato de cada saída em vez de só JPEG"""
+        jpeg_total = best_total = 0
+        per_format: Dict[str, List[int]] = {}
+        for entry in variants.values():
+            # A escada inclui o modelo completo como último degrau
+            for sizes in [entry['thumb']] + [step['bytes'] for step in entry['escada']]:
+                if 'jpeg' not in sizes:
+                    continue
+                jpeg_total += sizes['jpeg']
+                best_total += min(sizes.values())
+                for ext, size in sizes.items():
+                    if ext != 'jpeg':
+                        totals = per_format.setdefault(ext, [0, 0])
+                        totals[0] += sizes['jpeg']
+                        totals[1] += size
+
+        self.stats['bytes_saved'] = jpeg_total - best_total
+        if not per_format or not jpeg_total:
+            return
+        for ext, (jpeg_bytes, ext_bytes) in sorted(per_format.items()):
+            print(f"  💾 {ext.upper():<5} {ext_bytes:>12,} B vs JPEG {jpeg_bytes:>12,} B "
+                  f"({(ext_bytes - jpeg_bytes) / jpeg_bytes:+.1%})")
+        print(f"  💾 Menor formato por saída: {self.stats['bytes_saved']:,} B a menos que só JPEG "
+              f"({self.stats['bytes_saved'] / jpeg_total:.1%})")
+
+    def mockup_entry(self, file_path: Path, trims: Dict[str, dict]) -> dict:
+        """
+        Entrada de listaMockups.json para um mockup gerado. PNGs recortados
+        trazem em `recorte` a posição (x, y) no quadro original (largura x altura).
+        """
+        # Criar nome amigável removendo extensão (e o hash de conteúdo) e formatando
+        name = logical_name(file_path.name) if self.hashed_names else file_path.name
+        display_name = Path(name).stem.replace('-', ' ').replace('_', ' ')
+        # Capitalizar primeira letra de cada palavra
+        display_name = ' '.join(word.capitalize() for word in display_name.split())
+
+        entry = {
+            "name": display_name,
+            "img": f"/assets/mockups/{file_path.name}"
+        }
+        if file_path.name in trims:
+            entry["recorte"] = trims[file_path.name]
+        return entry
+
     def update_mockups_json(self) -> bool:
         """Atualiza JSON dos mockups"""
         self.print_section("📄 Gerando listaMockups.json")
 
         try:
             mockups_list = []
+            if not self.manifest.loaded:
+                self.manifest.load()
+            trims = self.manifest.trims()
 
-            if self.mockups_folder.exists():
-                mockup_files = [f for f in self.mockups_folder.iterdir()
-                               if f.is_file() and f.suffix.lower() in self.mockup_extensions]
-
-                for file_path in sorted(mockup_files):
-                    # Criar nome amigável removendo extensão e formatando
-                    display_name = file_path.stem.replace('-', ' ').replace('_', ' ')
-                    # Capitalizar primeira letra de cada palavra
-                    display_name = ' '.join(word.capitalize() for word in display_name.split())
-
-                    mockups_list.append({
-                        "name": display_name,
-                        "img": f"/assets/mockups/{file_path.name}"
-                    })
+            for _, file_path in sorted(self.published_files(self.mockups_folder).items()):
+                if file_path.suffix.lower() in self.mockup_extensions:
+                    mockups_list.append(self.mockup_entry(file_path, trims))
 
             data = {"mockups": mockups_list}
 
             # Verificar se houve mudanças
-            output_file = Path('./listaMockups.json')
+            output_file = self.json_folder / 'listaMockups.json'
             file_changed = True
 
             if output_file.exists():
@@ -463,6 +1498,250 @@ class UsaTexUpdater:
             self.stats['errors'] += 1
             return False
 
+    def patch_images_json(self, names: Set[str]) -> bool:
+        """Atualiza no lugar as entradas de listaImages.json das imagens em `names`"""
+        output_file = self.json_folder / 'listaImages.json'
+        try:
+            with open(output_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            imagens = set(data['imagens'])
+            variantes = data.setdefault('variantes', {})
+        except (OSError, ValueError, KeyError):
+            return self.generate_images_json()
+
+        formats = [ext for ext in VARIANT_FORMATS if ext in self.variant_formats]
+        present = names & self.published_files(self.thumb_folder).keys()
+        removed = (names - present) & imagens  # Nomes que nunca foram publicados não contam
+        imagens = (imagens - names) | present
+        placeholders = data.get('placeholders', {})
+        arquivos = data.get('arquivos', {})
+        for name in names - present:
+            variantes.pop(name, None)
+            placeholders.pop(name, None)
+            arquivos.pop(name, None)
+        new_variants, new_files = self.collect_variants(sorted(present), formats)
+        variantes.update(new_variants)
+        arquivos.update(new_files)
+        placeholders.update(self.collect_placeholders(sorted(present)))
+
+        patched = dict(data, imagens=sorted(imagens), formatos=variant_url_patterns(formats),
+                       variantes=dict(sorted(variantes.items())),
+                       placeholders=dict(sorted(placeholders.items())))
+        if self.hashed_names:
+            patched['arquivos'] = dict(sorted(arquivos.items()))
+        else:
+            patched.pop('arquivos', None)
+        if patched != data:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(patched, f, indent=2, ensure_ascii=False)
+            print(f"  ✅ listaImages.json: {len(present)} atualizadas, "
+                  f"{len(removed)} removidas")
+        return True
+
+    def patch_mockups_json(self, names: Set[str]) -> bool:
+        """Atualiza no lugar as entradas de listaMockups.json dos mockups em `names`"""
+        output_file = self.json_folder / 'listaMockups.json'
+        try:
+            with open(output_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            entries = {}
+            for entry in data['mockups']:
+                name = Path(entry['img']).name
+                entries[logical_name(name) if self.hashed_names else name] = entry
+        except (OSError, ValueError, KeyError):
+            return self.update_mockups_json()
+
+        published = self.published_files(self.mockups_folder)
+        if not self.manifest.loaded:
+            self.manifest.load()
+        trims = self.manifest.trims()
+        for name in names:
+            if name in published:
+                entries[name] = self.mockup_entry(published[name], trims)
+            else:
+                entries.pop(name, None)
+
+        patched = {"mockups": [entries[name] for name in sorted(entries)]}
+        if patched != data:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(patched, f, indent=2, ensure_ascii=False)
+            print(f"  ✅ listaMockups.json atualizado com {len(entries)} mockups")
+        return True
+
+    def write_url_changes(self) -> bool:
+        """Grava as URLs publicadas novas/alteradas e removidas desde a última execução"""
+        self.print_section("🔗 URLs alteradas")
+        folders = [self.thumb_folder, self.modelos_folder, self.mockups_folder, self.atlas_folder]
+        try:
+            changes = self.published.update(folders, self.url_changes_path)
+        except Exception as e:
+            print(f"  ❌ Erro ao comparar URLs publicadas: {e}")
+            self.stats['errors'] += 1
+            return False
+        if changes is None:
+            print(f"  ℹ️  Primeiro registro das URLs publicadas em {self.published.state_path}")
+        else:
+            print(f"  ✅ {len(changes['alteradas'])} alteradas, {len(changes['removidas'])} "
+                  f"removidas → {self.url_changes_path}")
+        return True
+
+    def sync_assets(self) -> bool:
+        """Sobe para o bucket só as saídas e JSONs que mudaram; remove órfãos com --sync-delete"""
+        self.print_section(f"☁️  Sincronizando com {self.sync_target}")
+        try:
+            import boto3  # noqa: F401
+        except ImportError:
+            print("  ❌ boto3 não instalado. Execute: pip install boto3")
+            return False
+
+        bucket, prefix = parse_target(self.sync_target)
+        root = self.thumb_folder.parent.parent  # static/: chaves assets/thumb/...
+        folders = [self.thumb_folder, self.modelos_folder, self.mockups_folder, self.atlas_folder]
+        manifests = [self.json_folder / name for name in ('listaImages.json', 'listaMockups.json',
+                                                          'listaAtlas.json', 'listaSimilares.json')]
+        local = collect_files(folders, root, manifests, prefix)
+        # Só esses prefixos são comparados (e limpos): o resto do bucket não é tocado
+        scopes = ([prefix + folder.relative_to(root).as_posix() + '/' for folder in folders]
+                  + [prefix + path.name for path in manifests])
+
+        try:
+            syncer = S3Sync(bucket, prefix, self.sync_endpoint, self.sync_region,
+                            self.sync_jobs, self.sync_rate)
+            report = syncer.run(local, SyncState(self.sync_state_path).load(), scopes,
+                                delete=self.sync_delete, dry_run=self.sync_dry_run)
+        except Exception as e:
+            print(f"  ❌ Erro ao sincronizar: {e}")
+            self.stats['errors'] += 1
+            return False
+
+        print(f"  📊 {report['local']} arquivos locais, {report['remote']} no bucket "
+              f"({report['hashed']} MD5 recalculados, {report['plan_seconds']:.2f}s)")
+        if self.sync_dry_run:
+            for key in report['pending']:
+                print(f"    ⬆️  {key}")
+            for key in report['orphan_keys']:
+                print(f"    🗑️  {key}")
+            print(f"  ℹ️  Simulação: {report['uploads']} a enviar, {report['unchanged']} iguais, "
+                  f"{report['orphans']} órfãos")
+            return True
+
+        self.metrics.sync = report
+        print(f"  ✅ {report['uploaded']} enviados ({report['bytes']:,} bytes, "
+              f"{report['throughput'] / 1024 ** 2:.1f} MiB/s), {report['unchanged']} iguais")
+        if report['orphans']:
+            if self.sync_delete:
+                print(f"  🗑️  {report['deleted']} órfãos removidos do bucket")
+            else:
+                print(f"  ℹ️  {report['orphans']} órfãos no bucket (remova com --sync-delete)")
+        for key, error in report['failed']:
+            print(f"    ❌ {key}: {error}")
+            self.failures.append((key, error))
+        if report['skipped']:
+            print(f"  ⚠️  {len(report['skipped'])} JSONs não enviados: apontariam para imagens "
+                  f"que não chegaram ao bucket")
+        self.stats['errors'] += len(report['failed'])
+        return not report['failed']
+
+    def process_batch(self, changed: Set[Path]):
+        """Processa um lote do --watch: só as fontes afetadas, e corrige os JSONs no lugar"""
+        images = {p for p in changed if p.parent == self.base_folder
+                  and p.suffix.lower() in self.image_extensions}
+        mockups = {p for p in changed if p.parent == self.base_mocks_folder
+                   and p.suffix.lower() in self.mockup_extensions}
+
+        # Eventos mudam só os arquivos citados: o inventário é corrigido sem nova varredura
+        for folder, group in ((self.base_folder, images), (self.base_mocks_folder, mockups)):
+            if group:
+                self.inventory(folder).refresh(group)
+
+        # Padronizar nomes de arquivos novos (o evento do rename cai no próximo lote, já fresco).
+        # O nome antigo nunca foi publicado: sai do lote em vez de contar como removido
+        for group in (images, mockups):
+            for file_path in list(group):
+                if file_path in self.inventory(file_path.parent):
+                    new_path = self.rename_to_standard(file_path)
+                    if new_path:
+                        group.discard(file_path)
+                        group.add(new_path)
+
+        if images:
+            self.process_images(only=images)
+            self.patch_images_json({self.output_name_for(p) for p in images})
+            if self.similarity and NUMPY_AVAILABLE:
+                self.build_similarity_index()
+            if self.atlas:
+                self.build_thumb_atlas()
+        if mockups:
+            self.process_mockups(only=mockups)
+            names = set()
+            for file_path in mockups:
+                output_name = self.standardize_filename(file_path.name)
+                names |= {output_name, str(Path(output_name).with_suffix('.png'))}
+            self.patch_mockups_json(names)
+        if images or mockups:
+            self.write_url_changes()
+
+    def watch(self, window: float = 0.25, polling: bool = False) -> bool:
+        """Observa base-images e base-mocks e processa só o que mudou, em lotes"""
+        self.incremental = True
+        if not self.run_full_update():
+            return False
+
+        folders = [f for f in (self.base_folder, self.base_mocks_folder) if self.inventory(f).exists]
+        watcher = open_watcher(folders, polling)
+        print(f"\n👀 Observando {', '.join(str(f) for f in folders)} "
+              f"({watcher.name}, janela de {window * 1000:.0f} ms). Ctrl+C para parar")
+        try:
+            for batch in debounced_batches(watcher, window):
+                started = time.perf_counter()
+                # Contadores por lote: o que cada etapa imprime vale só para este lote
+                for counters in (self.stats, self.adaptive_stats):
+                    for key in counters:
+                        counters[key] = 0
+                self.failures.clear()
+                self.process_batch(batch)
+                errors = f", {self.stats['errors']} erro(s)" if self.stats['errors'] else ""
+                print(f"\n⚡ Lote de {len(batch)} evento(s) processado em "
+                      f"{time.perf_counter() - started:.2f}s{errors}")
+        except KeyboardInterrupt:
+            print("\n👋 Observação encerrada")
+        finally:
+            watcher.close()
+        return True
+
+    def serve(self, address: str = DEFAULT_SERVE_ADDRESS) -> bool:
+        """
+        Servidor HTTP de redimensionamento sob demanda: /img/<nome>?w=&fmt=&q=
+        a partir de base-images, com o mesmo núcleo de renderização e os
+        presets do modelo; /assets/ serve os arquivos pré-gerados (linha de base)
+        """
+        from usatex.server import ImageServer
+
+        host, _, port = address.rpartition(':')
+        encoders = {'jpeg': dict(self.encoder_options('modelo', self.modelos_quality), format='JPEG')}
+        for ext in available_variants():
+            encoders[ext] = dict(self.variant_settings[ext], format=VARIANT_FORMATS[ext])
+        server = ImageServer(self.base_folder, self.image_extensions, self.output_name_for,
+                             encoders, self.modelos_size[0], self.thumb_folder.parent,
+                             self.server_cache_folder, self.server_memory_cache,
+                             self.server_disk_cache, self.jobs)
+
+        self.print_header("USATEX - SERVIDOR DE IMAGENS")
+        print(f"🌐 http://{host or '0.0.0.0'}:{port}/img/<nome>?w=&fmt=&q=  "
+              f"(formatos: {', '.join(encoders)})")
+        print(f"📦 Cache: {self.server_memory_cache / 1024 ** 2:.0f} MiB em memória, "
+              f"{self.server_disk_cache / 1024 ** 2:.0f} MiB em {self.server_cache_folder}")
+        print(f"⚙️  {self.jobs} processos de renderização; métricas em /metrics e /metrics.json")
+        try:
+            asyncio.run(server.serve(host or None, int(port)))
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            print(f"❌ Não foi possível abrir {address}: {e}")
+            return False
+        print("\n👋 Servidor encerrado")
+        return True
+
     def print_stats(self):
         """Imprime estatísticas finais"""
         self.print_header("RELATÓRIO FINAL")
@@ -471,10 +1750,22 @@ class UsaTexUpdater:
         print(f"🖼️  Thumbnails criados:       {self.stats['thumbs_created']}")
         print(f"📐 Modelos criados:          {self.stats['modelos_created']}")
         print(f"🎭 Mockups processados:      {self.stats['mockups_processed']}")
+        if self.stats['bytes_saved']:
+            print(f"💾 Economia WebP/AVIF:       {self.stats['bytes_saved']:,} bytes")
+        if self.incremental:
+            print(f"⏭️  Fontes inalteradas:       {self.stats['skipped']}")
+            print(f"🗑️  Saídas removidas:         {self.stats['removed']}")
         print(f"✅ Imagens validadas:        {self.stats['validated']}")
         print(f"💥 Imagens corrompidas:      {self.stats['corrupted']}")
         print(f"❌ Erros encontrados:        {self.stats['errors']}")
 
+        if self.failures:
+            print("\n⚠️  Falhas por arquivo:")
+            for name, error in self.failures[:20]:
+                print(f"    {name}: {error}")
+            if len(self.failures) > 20:
+                print(f"    ... e mais {len(self.failures) - 20} falhas")
+
         print("\n" + "=" * 60)
         if self.stats['errors'] == 0:
             print("🎉 PROCESSAMENTO CONCLUÍDO COM SUCESSO!")
@@ -482,27 +1773,62 @@ class UsaTexUpdater:
             print(f"⚠️  PROCESSAMENTO CONCLUÍDO COM {self.stats['errors']} ERRO(S)")
         print("=" * 60)
 
+    def run_step(self, name: str, func, *args):
+        """Executa uma etapa medindo tempo de parede e de CPU"""
+        with self.metrics.stage(name):
+            return func(*args)
+
+    def write_metrics(self, json_path: Optional[str] = None, prom_path: Optional[str] = None):
+        """Exporta as métricas da execução (JSON e/ou textfile do Prometheus)"""
+        shipped = self.catalog.output_totals() if self.catalog_path.exists() else {}
+        report = self.metrics.report(self.stats, self.failures, shipped)
+        if json_path:
+            self.metrics.write_json(Path(json_path), report)
+            print(f"📈 Métricas gravadas em {json_path}")
+        if prom_path:
+            self.metrics.write_prometheus(Path(prom_path), report)
+            print(f"📈 Métricas Prometheus gravadas em {prom_path}")
+
     def run_full_update(self):
         """Executa atualização completa"""
         self.print_header("USATEX - ATUALIZAÇÃO COMPLETA")
 
         steps = [
-            ("Limpeza", self.clean_folders),
+            ("Limpeza", self.prepare_incremental if self.incremental
+                        else self.prepare_staging if self.staging else self.clean_folders),
             ("Renomeação", self.rename_files),
             ("Processamento", self.process_images),
+            *([("Atlas", self.build_thumb_atlas)] if self.atlas else []),
             ("Mockups", self.process_mockups),
             ("JSON Imagens", self.generate_images_json),
+            *([("Similaridade", self.build_similarity_index)] if self.similarity else []),
             ("JSON Mockups", self.update_mockups_json),
+            ("Promoção", self.promote_staging),
+            ("URLs alteradas", self.write_url_changes),
+            *([("Sincronização", self.sync_assets)] if self.sync_target else []),
         ]
 
         for step_name, step_func in steps:
-            if not step_func():
+            if not self.run_step(step_name, step_func):
                 print(f"\n❌ Falha na etapa: {step_name}")
                 return False
 
         self.print_stats()
         return True
 
+def parse_size(text: str) -> Tuple[int, int]:
+    """Converte "LxA" (ou "N" para quadrado) em (largura, altura)"""
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height or width)
+
+
+def parse_bytes(text: str) -> int:
+    """Converte "512M", "2G", "800k" ou um número (em MiB) em bytes"""
+    units = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+    text = text.strip().lower().removesuffix('ib').removesuffix('b')
+    unit = text[-1] if text and text[-1] in units else 'm'
+    return int(float(text.rstrip('kmg')) * units[unit])
+
 def main():
     """Função principal com argumentos de linha de comando"""
     parser = argparse.ArgumentParser(
@@ -514,8 +1840,35 @@ Exemplos de uso:
   python update.py --preview       # Ver mudanças antes de executar
   python update.py --clean         # Apenas limpeza de pastas
   python update.py --validate      # Apenas validação de imagens
+  python update.py --validate decode  # Auditoria com decodificação completa
   python update.py --duplicates    # Buscar duplicatas
   python update.py --mockups       # Processar mockups da pasta base-mocks
+  python update.py --incremental   # Reprocessar apenas fontes novas/alteradas
+  python update.py --jobs 4        # Limitar a renderização a 4 processos
+  python update.py --render classic  # Usar o caminho de redimensionamento antigo
+  python update.py --compare-render  # Comparar qualidade/tempo/memória dos caminhos
+  python update.py --query "width>3000"      # Estampas com mais de 3000px de largura
+  python update.py --query errors            # Fontes com erro de validação/processamento
+  python update.py --metrics-out run.json    # Exportar métricas da execução
+  python update.py --variants avif,webp --avif-quality 50  # WebP e AVIF
+  python update.py --ladder none   # Sem a escada de resoluções dos modelos
+  python update.py --atlas --atlas-page 1024x1024  # Atlas de thumbs em páginas 1024px
+  python update.py --watch --debounce 0.5  # Observar e processar lotes de eventos
+  python update.py --pipeline --io-threads 8  # Estágios com mais threads de E/S (NFS)
+  python update.py --memory-budget 2G  # Concorrência limitada pela memória estimada
+  python update.py --hashed-names  # Nomes com hash de conteúdo (Cache-Control immutable)
+  python update.py --preset progressive --preset thumb=fast  # Presets do codificador JPEG
+  python update.py --compare-presets 20  # Tempo de codificação e bytes de cada preset
+  python update.py --adaptive-quality 0.985  # Menor qualidade do modelo com SSIM >= 0.985
+  python update.py --serve 0.0.0.0:8080 --cache-disk 5G  # Redimensionamento sob demanda
+  python update.py --similar UT4685 --top 20  # 20 estampas de cores mais parecidas
+  python update.py --near-color "#c0392b"     # Estampas com bastante desse vermelho
+  python update.py --sync s3://usatex/site --sync-delete  # Atualiza e sincroniza o bucket
+  python update.py --sync-only --sync-endpoint http://localhost:9000 --sync-rate 5M  # MinIO
+  python update.py --staging       # Build retomável, publicado só no fim
+  python update.py --staging --swap symlink  # Publica trocando um link (atômico)
+  python update.py --no-resume     # Descarta um build interrompido e recomeça
+  python update.py --rollback      # Volta para a geração publicada anterior
         """
     )
 
@@ -523,25 +1876,195 @@ Exemplos de uso:
                        help='Visualizar mudanças sem executar')
     parser.add_argument('--clean', action='store_true',
                        help='Apenas limpar pastas de destino')
-    parser.add_argument('--validate', action='store_true',
-                       help='Apenas validar integridade das imagens')
+    parser.add_argument('--validate', nargs='?', const='verify', choices=VALIDATION_LEVELS,
+                       metavar='NIVEL',
+                       help='Apenas validar integridade das imagens; nível header, verify '
+                            '(padrão) ou decode (auditoria completa, usa todos os núcleos)')
     parser.add_argument('--duplicates', action='store_true',
                        help='Apenas buscar duplicatas')
+    parser.add_argument('--distance', type=int, default=8, metavar='BITS',
+                       help='Distância máxima de Hamming (pHash) para duplicatas (padrão: 8)')
     parser.add_argument('--mockups', action='store_true',
                        help='Processar mockups da pasta base-mocks')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Reprocessar apenas fontes novas ou alteradas (usa manifesto)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, metavar='N',
+                       help='Processos usados na renderização (padrão: número de CPUs)')
+    parser.add_argument('--render', choices=RENDER_PATHS, default='cascade',
+                       help='Caminho de redimensionamento (padrão: cascade)')
+    parser.add_argument('--variants', type=lambda t: [] if t == 'none' else t.split(','),
+                       default=list(DEFAULT_VARIANTS), metavar='FMT[,FMT]',
+                       help='Formatos extras de thumbs/modelos: avif,webp ou none (padrão: webp)')
+    parser.add_argument('--ladder', type=lambda t: [] if t == 'none' else [int(n) for n in t.split(',')],
+                       default=list(DEFAULT_LADDER), metavar='PX[,PX]',
+                       help='Degraus menores dos modelos, em px, ou none (padrão: 256,512,768)')
+    parser.add_argument('--watch', action='store_true',
+                       help='Observar base-images e base-mocks e processar só o que mudar')
+    parser.add_argument('--debounce', type=float, default=0.25, metavar='SEG',
+                       help='Janela para agrupar eventos do --watch (padrão: 0.25)')
+    parser.add_argument('--poll', action='store_true',
+                       help='No --watch, usar varredura periódica em vez de inotify')
+    parser.add_argument('--pipeline', action='store_true',
+                       help='Renderizar imagens em estágios (leitura/render/gravação) com filas limitadas')
+    parser.add_argument('--io-threads', type=int, default=4, metavar='N',
+                       help='Threads de leitura e de gravação no --pipeline (padrão: 4)')
+    parser.add_argument('--memory-budget', type=parse_bytes, metavar='TAM',
+                       help='Orçamento de memória da renderização (ex.: 2G, 512M): admite '
+                            'processos pela memória estimada e reduz fontes grandes demais')
+    parser.add_argument('--hashed-names', action='store_true',
+                       help='Gravar saídas com hash do conteúdo no nome (UT4685.3fa9c1.jpg) '
+                            'para cache imutável; os JSONs mapeiam nome lógico -> arquivo')
+    parser.add_argument('--no-placeholders', action='store_true',
+                       help='Não calcular BlurHash/cor dominante/micro-JPEG (exigem NumPy)')
+    parser.add_argument('--no-similarity', action='store_true',
+                       help='Não calcular histograma/paleta nem gerar listaSimilares.json')
+    parser.add_argument('--config', type=Path, metavar='ARQUIVO',
+                       help='Arquivo de configuração JSON (padrão: usatex.json, se existir)')
+    parser.add_argument('--preset', action='append', metavar='[CLASSE=]NOME',
+                       help='Preset do codificador JPEG para todas as classes ou para uma '
+                            '(thumb, modelo, mockup); repetível. Presets: '
+                            + ', '.join(ENCODER_PRESETS) + ' (padrão: baseline)')
+    parser.add_argument('--adaptive-quality', type=float, nargs='?', const=DEFAULT_TARGET_SSIM,
+                       metavar='SSIM',
+                       help='Escolher a qualidade de cada modelo por busca binária até o SSIM '
+                            f'alvo (padrão: {DEFAULT_TARGET_SSIM}; exige NumPy)')
+    parser.add_argument('--no-mockup-trim', action='store_true',
+                       help='Não recortar as bordas transparentes dos mockups PNG')
+    parser.add_argument('--mockup-tolerance', type=float, default=4.0, metavar='ERRO',
+                       help='Erro RMS máximo (0-255) para gravar mockups PNG com paleta '
+                            '(padrão: 4.0; 0 = só quando não há perda)')
+    parser.add_argument('--atlas', action='store_true',
+                       help='Gerar atlas de sprites dos thumbs (listaAtlas.json)')
+    parser.add_argument('--atlas-page', type=parse_size,
+                       default=(2048, 2048), metavar='LxA',
+                       help='Tamanho das páginas do atlas em px (padrão: 2048x2048)')
+    parser.add_argument('--atlas-format', choices=list(ATLAS_FORMATS), default='jpeg',
+                       help='Formato das páginas do atlas (padrão: jpeg)')
+    parser.add_argument('--webp-quality', type=int, metavar='Q',
+                       help='Qualidade das variantes WebP (padrão: 80)')
+    parser.add_argument('--avif-quality', type=int, metavar='Q',
+                       help='Qualidade das variantes AVIF (padrão: 60)')
+    parser.add_argument('--query', nargs='+', metavar='COND',
+                       help='Consultar o índice: condições "campo op valor" (op: = != > < >= <= ~) '
+                            'ou atalhos errors/unvalidated')
+    parser.add_argument('--limit', type=int, metavar='N',
+                       help='Máximo de linhas retornadas por --query')
+    parser.add_argument('--similar', metavar='NOME',
+                       help='Listar as estampas de cores mais parecidas com NOME (exige NumPy)')
+    parser.add_argument('--near-color', metavar='#RRGGBB',
+                       help='Listar as estampas com mais da cor dada (exige NumPy)')
+    parser.add_argument('--top', type=int, default=12, metavar='N',
+                       help='Resultados de --similar/--near-color (padrão: 12)')
+    parser.add_argument('--metrics-out', metavar='ARQUIVO',
+                       help='Gravar relatório de métricas da execução em JSON')
+    parser.add_argument('--metrics-prom', metavar='ARQUIVO',
+                       help='Gravar métricas no formato textfile do Prometheus (node_exporter)')
+    parser.add_argument('--compare-render', type=int, nargs='?', const=20, metavar='N',
+                       help='Comparar os caminhos de renderização em N imagens (0 = todas)')
+    parser.add_argument('--compare-presets', type=int, nargs='?', const=10, metavar='N',
+                       help='Comparar os presets do codificador em N imagens (0 = todas)')
+    parser.add_argument('--serve', nargs='?', const=DEFAULT_SERVE_ADDRESS, metavar='HOST:PORTA',
+                       help='Servir /img/<nome>?w=&fmt=&q= redimensionando sob demanda '
+                            f'(padrão: {DEFAULT_SERVE_ADDRESS})')
+    parser.add_argument('--cache-memory', type=parse_bytes, default=64 * 1024 ** 2, metavar='TAM',
+                       help='Limite do cache de variantes em memória do --serve (padrão: 64M)')
+    parser.add_argument('--cache-disk', type=parse_bytes, default=1024 ** 3, metavar='TAM',
+                       help='Limite do cache de variantes em disco do --serve (padrão: 1G)')
+    parser.add_argument('--sync', nargs='?', const='', metavar='s3://BUCKET/PREFIXO',
+                       help='Depois do processamento, subir saídas e JSONs alterados para o '
+                            'bucket (padrão: "sync.destino" do usatex.json; exige boto3)')
+    parser.add_argument('--sync-only', action='store_true',
+                       help='Apenas sincronizar com o bucket, sem processar')
+    parser.add_argument('--sync-endpoint', metavar='URL',
+                       help='Endpoint S3 compatível (MinIO, R2, moto); padrão: AWS')
+    parser.add_argument('--sync-region', metavar='REGIAO',
+                       help='Região do bucket (padrão: a das credenciais AWS)')
+    parser.add_argument('--sync-jobs', type=int, default=DEFAULT_SYNC_JOBS, metavar='N',
+                       help=f'Uploads simultâneos e conexões do pool (padrão: {DEFAULT_SYNC_JOBS})')
+    parser.add_argument('--sync-rate', type=parse_bytes, metavar='TAM',
+                       help='Limite de banda dos uploads por segundo (ex.: 5M, 800k)')
+    parser.add_argument('--sync-delete', action='store_true',
+                       help='Remover do bucket os objetos que não existem mais localmente')
+    parser.add_argument('--staging', action='store_true',
+                       help='Build completo em .usatex/staging, retomável, publicado só no fim '
+                            '(a geração anterior fica para --rollback)')
+    parser.add_argument('--swap', choices=SWAP_MODES, default='rename',
+                       help='Como publicar o build do --staging: rename pasta a pasta (padrão, '
+                            'arquivos comuns) ou troca atômica de symlink (links não versionáveis)')
+    parser.add_argument('--rollback', action='store_true',
+                       help='Voltar as pastas e JSONs publicados para a geração anterior')
+    parser.add_argument('--no-resume', action='store_true',
+                       help='Descartar um build interrompido em .usatex/staging e recomeçar')
+    parser.add_argument('--sync-dry-run', action='store_true',
+                       help='Só listar o que seria enviado e removido')
 
     args = parser.parse_args()
 
-    updater = UsaTexUpdater()
+    updater = UsaTexUpdater(incremental=args.incremental, jobs=args.jobs,
+                            render_path=args.render, duplicate_distance=args.distance,
+                            variants=args.variants, ladder=args.ladder, atlas=args.atlas,
+                            pipeline=args.pipeline, io_threads=args.io_threads,
+                            memory_budget=args.memory_budget,
+                            placeholders=not args.no_placeholders,
+                            hashed_names=args.hashed_names,
+                            similarity=not args.no_similarity)
+    updater.atlas_page_size = args.atlas_page
+    updater.mockup_trim = not args.no_mockup_trim
+    updater.mockup_tolerance = args.mockup_tolerance
+    updater.atlas_format = args.atlas_format
+    updater.server_memory_cache = args.cache_memory
+    updater.server_disk_cache = args.cache_disk
+    unknown = [ext for ext in args.variants if ext not in VARIANT_FORMATS]
+    if unknown:
+        parser.error(f"formato de variante desconhecido: {', '.join(unknown)}")
+    for ext, quality in (('webp', args.webp_quality), ('avif', args.avif_quality)):
+        if quality is not None:
+            updater.variant_settings[ext]['quality'] = quality
+    try:
+        config = load_config(args.config)
+        updater.encoder_presets = available_presets(config)
+        updater.preset_choice = select_presets(config, args.preset)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    adaptive = config.get('qualidade_adaptativa') or {}
+    updater.adaptive_quality = args.adaptive_quality or adaptive.get('ssim')
+    updater.adaptive_range = (adaptive.get('min', updater.adaptive_range[0]),
+                              adaptive.get('max', updater.adaptive_range[1]))
+    sync = config.get('sync') or {}
+    if args.sync is not None or args.sync_only:
+        updater.sync_target = args.sync or sync.get('destino')
+        if not updater.sync_target:
+            parser.error("informe o bucket em --sync s3://BUCKET/PREFIXO ou em sync.destino")
+        try:
+            parse_target(updater.sync_target)
+        except ValueError as e:
+            parser.error(str(e))
+    updater.sync_endpoint = args.sync_endpoint or sync.get('endpoint')
+    updater.sync_region = args.sync_region or sync.get('regiao')
+    updater.sync_jobs = args.sync_jobs
+    updater.sync_rate = args.sync_rate
+    updater.sync_delete = args.sync_delete
+    updater.sync_dry_run = args.sync_dry_run
+    updater.swap_mode = args.swap
+    updater.resume = not args.no_resume
+    updater.staging = args.staging
+    if updater.adaptive_quality is not None and not 0 < updater.adaptive_quality < 1:
+        parser.error("o SSIM alvo deve estar entre 0 e 1 (ex.: 0.985)")
+    unknown = sorted(set(updater.preset_choice.values()) - set(updater.encoder_presets))
+    if unknown:
+        parser.error(f"preset desconhecido: {', '.join(unknown)} "
+                     f"(disponíveis: {', '.join(updater.encoder_presets)})")
 
     try:
         # Verificar se PIL está disponível para operações que precisam
-        if (not args.preview and not args.duplicates and not args.mockups) and not PIL_AVAILABLE:
+        if (not args.preview and not args.duplicates and not args.mockups
+                and not args.query and not args.sync_only and not args.rollback) and not PIL_AVAILABLE:
             print("❌ PIL/Pillow não está instalado!")
             print("Execute: pip install pillow")
             return 1
 
         # Executar comando específico
+        code = 0
         if args.preview:
             updater.print_header("PREVIEW DAS MUDANÇAS")
             changes = updater.preview_name_changes()
@@ -553,27 +2076,64 @@ Exemplos de uso:
 
         elif args.validate:
             updater.print_header("VALIDAÇÃO DE IMAGENS")
-            updater.validate_images()
+            updater.run_step("Validação", updater.validate_images, args.validate)
             updater.print_stats()
 
         elif args.duplicates:
             updater.print_header("BUSCA DE DUPLICATAS")
-            updater.find_duplicates()
+            updater.run_step("Duplicatas", updater.find_duplicates)
+
+        elif args.query:
+            return 0 if updater.query_catalog(args.query, args.limit) else 1
+
+        elif args.similar or args.near_color:
+            return 0 if updater.query_similarity(args.similar, args.near_color, args.top) else 1
+
+        elif args.compare_render is not None:
+            updater.print_header("COMPARAÇÃO DE RENDERIZAÇÃO")
+            updater.compare_render_paths(args.compare_render)
+
+        elif args.compare_presets is not None:
+            updater.print_header("COMPARAÇÃO DE PRESETS DO CODIFICADOR")
+            updater.compare_encoder_presets(args.compare_presets)
+
+        elif args.watch:
+            code = 0 if updater.watch(args.debounce, args.poll) else 1
+
+        elif args.sync_only:
+            updater.print_header("SINCRONIZAÇÃO COM O BUCKET")
+            code = 0 if updater.run_step("Sincronização", updater.sync_assets) else 1
+
+        elif args.serve:
+            code = 0 if updater.serve(args.serve) else 1
+
+        elif args.rollback:
+            updater.print_header("ROLLBACK")
+            if updater.run_step("Rollback", updater.rollback):
+                updater.run_step("URLs alteradas", updater.write_url_changes)
+            else:
+                code = 1
 
         elif args.mockups:
             updater.print_header("PROCESSAMENTO DE MOCKUPS")
-            if updater.process_mockups():
-                updater.update_mockups_json()
+            if updater.run_step("Mockups", updater.process_mockups):
+                updater.run_step("JSON Mockups", updater.update_mockups_json)
+                updater.run_step("URLs alteradas", updater.write_url_changes)
             updater.print_stats()
 
         else:
             # Processamento completo
-            return 0 if updater.run_full_update() else 1
+            code = 0 if updater.run_full_update() else 1
 
-        return 0
+        if args.metrics_out or args.metrics_prom:
+            updater.write_metrics(args.metrics_out, args.metrics_prom)
+        return code
 
     except KeyboardInterrupt:
         print("\n\n⛔ Operação cancelada pelo usuário")
+        if updater.staged:
+            print(f"💾 Build parcial em {updater.staging_folder}: a próxima execução retoma daí "
+                  f"(--no-resume para recomeçar)")
         return 1
     except Exception as e:
         print(f"\n\n❌ Erro crítico: {e}")
@@ -0,0 +1,4 @@
+"""
+UsaTex - Núcleo do pipeline de imagens
+Módulos reutilizados pelo update.py e pelos scripts auxiliares
+"""
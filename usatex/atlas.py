@@ -0,0 +1,121 @@
+"""
+Atlas de sprites dos thumbnails
+Empacota os thumbs em páginas de tamanho fixo e gera o mapa nome -> (página, x, y)
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from usatex.manifest import hash_file
+
+ATLAS_FORMATS = {'jpeg': ('JPEG', 'jpg'), 'webp': ('WEBP', 'webp'), 'png': ('PNG', 'png')}
+
+
+def assign_slots(names: List[str], previous: Dict[str, int]) -> Dict[str, int]:
+    """
+    Posição (slot) de cada thumb. Nomes que já estavam no atlas mantêm o slot;
+    nomes novos ocupam os slots liberados e depois o fim. Assim, incluir uma
+    estampa só altera a página que a recebe.
+    """
+    alive = set(names)
+    slots = {name: slot for name, slot in previous.items() if name in alive}
+    used = set(slots.values())
+    free = (slot for slot in range(len(names) + len(used)) if slot not in used)
+    for name in sorted(alive - slots.keys()):
+        slots[name] = next(free)
+    return slots
+
+
+def page_signature(config: dict, members: List[Tuple[int, str, str]]) -> str:
+    """Hash do conteúdo de uma página: configuração e (slot, nome, hash do thumb) dos membros"""
+    payload = json.dumps({'config': config, 'members': sorted(members)}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:12]
+
+
+def load_atlas_map(path: Path) -> Optional[dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_atlas(thumbs: Dict[str, Path], out_dir: Path, map_path: Path,
+                page_size: Tuple[int, int] = (2048, 2048), cell: Tuple[int, int] = (128, 128),
+                fmt: str = 'jpeg', quality: int = 85) -> dict:
+    """
+    Gera as páginas do atlas em `out_dir` e o mapa em `map_path`.
+    Só regrava páginas cujos membros (ou thumbs) mudaram.
+    Retorna {'pages', 'written', 'reused', 'removed'}.
+    """
+    pil_format, ext = ATLAS_FORMATS[fmt]
+    cols, rows = page_size[0] // cell[0], page_size[1] // cell[1]
+    if cols < 1 or rows < 1:
+        raise ValueError(f"página {page_size} menor que a célula {cell}")
+    per_page = cols * rows
+    config = {'pagina': list(page_size), 'celula': list(cell), 'formato': fmt, 'qualidade': quality}
+
+    # Slots anteriores só valem com a mesma geometria
+    previous_map = load_atlas_map(map_path) or {}
+    previous_slots = {}
+    previous_pages = {}
+    if previous_map.get('config') == config:
+        for name, (page, x, y) in previous_map.get('imagens', {}).items():
+            previous_slots[name] = page * per_page + (y // cell[1]) * cols + x // cell[0]
+        previous_pages = {i: entry for i, entry in enumerate(previous_map.get('paginas', []))}
+
+    slots = assign_slots(sorted(thumbs), previous_slots)
+    page_count = max(slots.values()) // per_page + 1 if slots else 0
+    members: Dict[int, List[Tuple[int, str, str]]] = {page: [] for page in range(page_count)}
+    for name, slot in slots.items():
+        members[slot // per_page].append((slot, name, hash_file(thumbs[name])))
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pages = []
+    written = 0
+    for page in range(page_count):
+        signature = page_signature(config, members[page])
+        filename = f"atlas-{page:03d}.{ext}"
+        old = previous_pages.get(page)
+        if not (old and old['versao'] == signature and (out_dir / filename).exists()):
+            sheet = Image.new('RGB', page_size, (255, 255, 255))
+            for slot, name, _ in members[page]:
+                index = slot % per_page
+                with Image.open(thumbs[name]) as thumb:
+                    sheet.paste(thumb.convert('RGB'), ((index % cols) * cell[0], (index // cols) * cell[1]))
+            tmp_path = out_dir / f".{filename}.tmp"
+            sheet.save(tmp_path, pil_format, quality=quality, optimize=True)
+            os.replace(tmp_path, out_dir / filename)
+            written += 1
+        pages.append({'arquivo': filename, 'versao': signature, 'imagens': len(members[page])})
+
+    # Páginas que sobraram de um atlas maior
+    keep = {entry['arquivo'] for entry in pages}
+    removed = 0
+    for path in out_dir.glob('atlas-*'):
+        if path.name not in keep:
+            path.unlink()
+            removed += 1
+
+    data = {
+        'config': config,
+        'paginas': pages,
+        'imagens': {name: [slot // per_page,
+                           (slot % per_page) % cols * cell[0],
+                           (slot % per_page) // cols * cell[1]]
+                    for name, slot in sorted(slots.items())},
+    }
+    if data != previous_map:
+        tmp_path = map_path.with_suffix(map_path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # Compacto: com milhares de thumbs o mapa vai inteiro para o front-end
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, map_path)
+
+    return {'pages': page_count, 'written': written, 'reused': page_count - written,
+            'removed': removed}
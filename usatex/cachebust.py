@@ -0,0 +1,110 @@
+"""
+Cache imutável das saídas publicadas
+Nomes com hash de conteúdo (UT4685.3fa9c1.jpg) e a lista de URLs alteradas e
+removidas a cada execução, para purgar só o que mudou no CDN/WebView
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from usatex.manifest import hash_file
+
+HASH_LENGTH = 6
+_HASHED_NAME = re.compile(rf'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{{{HASH_LENGTH}}})(?P<ext>\.[^.]+)$')
+
+
+def content_hash(payload: bytes) -> str:
+    """Prefixo do SHA-256 usado no nome (6 hex: colisão só importa entre versões do mesmo nome)"""
+    return hashlib.sha256(payload).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_path(path, payload: bytes) -> Path:
+    """thumb/UT4685.jpg -> thumb/UT4685.3fa9c1.jpg (variantes: webp/UT4685.jpg.3fa9c1.webp)"""
+    path = Path(path)
+    return path.with_name(f"{path.stem}.{content_hash(payload)}{path.suffix}")
+
+
+def logical_name(name: str) -> str:
+    """Nome sem o hash de conteúdo (o próprio nome se não tiver hash)"""
+    match = _HASHED_NAME.match(name)
+    return match['stem'] + match['ext'] if match else name
+
+
+def url_for(path: Path, root: Path) -> str:
+    """URL pública de um arquivo servido a partir de `root` (static/assets/x -> /assets/x)"""
+    return '/' + Path(path).relative_to(root).as_posix()
+
+
+class PublishedUrls:
+    """
+    Estado das URLs publicadas entre execuções ({url: tamanho, mtime, hash}).
+    Só arquivos novos ou com tamanho/mtime diferentes são relidos; com nomes
+    com hash, o próprio nome identifica o conteúdo.
+    """
+
+    def __init__(self, state_path: Path, root: Path):
+        self.state_path = Path(state_path)
+        self.root = Path(root)
+
+    def _load(self) -> Optional[Dict[str, dict]]:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def scan(self, folders: Iterable[Path], previous: Dict[str, dict]) -> Dict[str, dict]:
+        current = {}
+        for folder in folders:
+            for dirpath, _, filenames in os.walk(folder):
+                for filename in filenames:
+                    if filename.startswith('.'):
+                        continue  # temporários de escrita atômica
+                    path = Path(dirpath) / filename
+                    stat = path.stat()
+                    url = url_for(path, self.root)
+                    old = previous.get(url)
+                    if old and (old['size'], old['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+                        digest = old['hash']
+                    else:
+                        match = _HASHED_NAME.match(filename)
+                        digest = match['hash'] if match else hash_file(path)
+                    current[url] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                    'hash': digest}
+        return current
+
+    def update(self, folders: Iterable[Path], changes_path: Path) -> Optional[dict]:
+        """
+        Compara as pastas publicadas com a execução anterior e grava em
+        `changes_path` as URLs novas/alteradas e as removidas. Na primeira
+        execução só registra o estado (retorna None).
+        """
+        previous = self._load()
+        current = self.scan(folders, previous or {})
+        changes = None
+        if previous is not None:
+            changes = {
+                'gerado_em': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'alteradas': sorted(url for url, entry in current.items()
+                                    if previous.get(url, {}).get('hash') != entry['hash']),
+                'removidas': sorted(previous.keys() - current.keys()),
+            }
+            _write_json(Path(changes_path), changes)
+        _write_json(self.state_path, current, compact=True)
+        return changes
+
+
+def _write_json(path: Path, data, compact: bool = False):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        if compact:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        else:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
@@ -0,0 +1,339 @@
+"""
+Índice persistente do catálogo (SQLite)
+Guarda por fonte: dimensões, modo, formato, validação, erro de processamento,
+hashes e saídas geradas
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from usatex.manifest import hash_file
+
+SCHEMA_VERSION = 6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path      TEXT PRIMARY KEY,
+    folder    TEXT NOT NULL,
+    name      TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    sha256    TEXT,
+    width     INTEGER,
+    height    INTEGER,
+    mode      TEXT,
+    format    TEXT,
+    valid     INTEGER,
+    validated_level INTEGER,
+    error     TEXT,
+    render_error TEXT,
+    ahash     TEXT,
+    dhash     TEXT,
+    phash     TEXT,
+    color     TEXT,
+    placeholder TEXT,
+    features  TEXT
+);
+CREATE INDEX IF NOT EXISTS sources_sha256 ON sources (sha256);
+CREATE TABLE IF NOT EXISTS outputs (
+    path      TEXT PRIMARY KEY,
+    source    TEXT NOT NULL REFERENCES sources (path) ON DELETE CASCADE,
+    kind      TEXT NOT NULL,
+    bytes     INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outputs_source ON outputs (source);
+CREATE TABLE IF NOT EXISTS qualities (
+    sha256    TEXT NOT NULL,
+    settings  TEXT NOT NULL,
+    quality   INTEGER NOT NULL,
+    ssim      REAL,
+    fixed_bytes INTEGER,
+    bytes     INTEGER,
+    PRIMARY KEY (sha256, settings)
+);
+"""
+
+# Colunas que deixam de valer quando o conteúdo da fonte muda
+# (valid/error: só a validação; render_error: a última renderização, ex.: codificador ou memória)
+FACT_COLUMNS = ('sha256', 'width', 'height', 'mode', 'format', 'valid', 'validated_level',
+                'error', 'render_error', 'ahash', 'dhash', 'phash', 'color', 'placeholder',
+                'features')
+
+# Migrações a partir de cada versão anterior do esquema
+MIGRATIONS = {
+    1: "ALTER TABLE sources ADD COLUMN validated_level INTEGER",
+    2: "ALTER TABLE sources ADD COLUMN placeholder TEXT",
+    3: "SELECT 1",  # Só a tabela qualities, criada pelo SCHEMA
+    4: "ALTER TABLE sources ADD COLUMN features TEXT",
+    5: "ALTER TABLE sources ADD COLUMN render_error TEXT",
+}
+
+# Campos aceitos pelo CLI de consulta (nome no CLI -> expressão SQL)
+QUERY_FIELDS = {
+    'name': 'name', 'nome': 'name',
+    'folder': 'folder', 'pasta': 'folder',
+    'size': 'size', 'bytes': 'size',
+    'width': 'width', 'largura': 'width',
+    'height': 'height', 'altura': 'height',
+    'pixels': 'width * height',
+    'mode': 'mode', 'modo': 'mode',
+    'format': 'format', 'formato': 'format',
+    'valid': 'valid', 'valida': 'valid',
+    'level': 'validated_level', 'nivel': 'validated_level',
+    'error': 'error', 'erro': 'error',
+    'render_error': 'render_error', 'erro_render': 'render_error',
+    'sha256': 'sha256',
+    'output_bytes': '(SELECT COALESCE(SUM(bytes), 0) FROM outputs o WHERE o.source = sources.path)',
+}
+QUERY_SHORTCUTS = {
+    'errors': '(valid = 0 OR render_error IS NOT NULL)',
+    'erros': '(valid = 0 OR render_error IS NOT NULL)',
+    'render-errors': 'render_error IS NOT NULL', 'falhas-render': 'render_error IS NOT NULL',
+    'unvalidated': 'valid IS NULL', 'nao-validadas': 'valid IS NULL',
+}
+_CONDITION = re.compile(r'^\s*(\w+)\s*(>=|<=|!=|=|>|<|~)\s*(.*?)\s*$')
+
+
+def quality_key(settings: dict) -> str:
+    """
+    Chave do cache de qualidade adaptativa: tudo que muda o modelo
+    redimensionado ou o SSIM de cada qualidade (não depende da fonte)
+    """
+    relevant = {key: settings.get(key) for key in ('pillow', 'render', 'modelo', 'adaptive')}
+    if settings.get('low_memory'):
+        relevant['low_memory'] = True  # Draft mais agressivo: outro modelo redimensionado
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _hex(value: Optional[int]) -> Optional[str]:
+    return None if value is None else f"{value:016x}"
+
+
+class CatalogIndex:
+    """Fatos por imagem, indexados pelo caminho e validados por tamanho/mtime"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        while version in MIGRATIONS:
+            self.db.execute(MIGRATIONS[version])
+            version += 1
+        if version != SCHEMA_VERSION:
+            self.db.executescript("DROP TABLE IF EXISTS outputs; DROP TABLE IF EXISTS sources; "
+                                  "DROP TABLE IF EXISTS qualities;")
+        self.db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self.db.executescript(SCHEMA)
+
+    @staticmethod
+    def key(file_path: Path) -> str:
+        return Path(file_path).as_posix()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def commit(self):
+        self.db.commit()
+
+    def backup(self, target: Path):
+        """Cópia consistente do índice (API de backup do SQLite), ex.: para o staging"""
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        self.db.commit()
+        copy = sqlite3.connect(str(target))
+        try:
+            self.db.backup(copy)
+        finally:
+            copy.close()
+
+    def lookup(self, file_path: Path, stat: os.stat_result) -> Optional[sqlite3.Row]:
+        """Linha da fonte se ela não mudou desde a última indexação"""
+        row = self.db.execute("SELECT * FROM sources WHERE path = ?",
+                              (self.key(file_path),)).fetchone()
+        if row and row['size'] == stat.st_size and row['mtime_ns'] == stat.st_mtime_ns:
+            return row
+        return None
+
+    def lookup_content(self, file_path: Path, stat: os.stat_result) -> Optional[sqlite3.Row]:
+        """
+        Como lookup(), mas se só o mtime mudou (cópia, checkout) compara o
+        conteúdo pelo SHA-256 e, se igual, mantém os fatos e atualiza o mtime.
+        """
+        row = self.lookup(file_path, stat)
+        if row:
+            return row
+        path = self.key(file_path)
+        row = self.db.execute("SELECT * FROM sources WHERE path = ?", (path,)).fetchone()
+        if not row or row['size'] != stat.st_size or row['sha256'] is None:
+            return None
+        if hash_file(Path(file_path)) != row['sha256']:
+            return None
+        self.db.execute("UPDATE sources SET mtime_ns = ? WHERE path = ?", (stat.st_mtime_ns, path))
+        return self.lookup(file_path, stat)
+
+    def touch(self, file_path: Path, stat: os.stat_result):
+        """Garante a linha da fonte; se o arquivo mudou, descarta os fatos antigos"""
+        path = self.key(file_path)
+        row = self.db.execute("SELECT size, mtime_ns FROM sources WHERE path = ?",
+                              (path,)).fetchone()
+        if row and (row['size'], row['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            return
+        facts = ', '.join(f"{col} = NULL" for col in FACT_COLUMNS)
+        if row:
+            self.db.execute(f"UPDATE sources SET size = ?, mtime_ns = ?, {facts} WHERE path = ?",
+                            (stat.st_size, stat.st_mtime_ns, path))
+            self.db.execute("DELETE FROM outputs WHERE source = ?", (path,))
+        else:
+            self.db.execute("INSERT INTO sources (path, folder, name, size, mtime_ns) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (path, Path(file_path).parent.as_posix(), Path(file_path).name,
+                             stat.st_size, stat.st_mtime_ns))
+
+    def update(self, file_path: Path, stat: os.stat_result, **facts):
+        """Registra fatos de uma fonte (colunas de FACT_COLUMNS)"""
+        unknown = set(facts) - set(FACT_COLUMNS)
+        if unknown:
+            raise ValueError(f"colunas desconhecidas: {', '.join(sorted(unknown))}")
+        self.touch(file_path, stat)
+        if facts:
+            assignments = ', '.join(f"{col} = ?" for col in facts)
+            self.db.execute(f"UPDATE sources SET {assignments} WHERE path = ?",
+                            (*facts.values(), self.key(file_path)))
+
+    def set_outputs(self, file_path: Path, outputs: Iterable[Tuple[str, str, int]]):
+        """Substitui as saídas registradas de uma fonte por (tipo, caminho, bytes)"""
+        source = self.key(file_path)
+        self.db.execute("DELETE FROM outputs WHERE source = ?", (source,))
+        self.db.executemany("INSERT OR REPLACE INTO outputs (path, source, kind, bytes) "
+                            "VALUES (?, ?, ?, ?)",
+                            [(self.key(path), source, kind, size) for kind, path, size in outputs])
+
+    def relocate_outputs(self, old_folder: Path, new_folder: Path):
+        """Troca o prefixo dos caminhos de saída (staging -> pastas publicadas, após a promoção)"""
+        old = self.key(old_folder).rstrip('/') + '/'
+        new = self.key(new_folder).rstrip('/') + '/'
+        # Saídas de fontes renderizadas no staging substituem as antigas do mesmo caminho
+        self.db.execute("DELETE FROM outputs WHERE path IN (SELECT ? || substr(path, ?) "
+                        "FROM outputs WHERE substr(path, 1, ?) = ?)",
+                        (new, len(old) + 1, len(old), old))
+        self.db.execute("UPDATE outputs SET path = ? || substr(path, ?) WHERE substr(path, 1, ?) = ?",
+                        (new, len(old) + 1, len(old), old))
+
+    def get_hashes(self, file_path: Path, stat: os.stat_result) -> Optional[dict]:
+        """Hashes da fonte, no formato de usatex.dedupe, se ainda válidos"""
+        row = self.lookup(file_path, stat)
+        if not row or row['phash'] is None:
+            return None
+        return {
+            'sha256': row['sha256'],
+            'ahash': int(row['ahash'], 16),
+            'dhash': int(row['dhash'], 16),
+            'phash': int(row['phash'], 16),
+            'color': json.loads(row['color']),
+        }
+
+    def put_hashes(self, file_path: Path, stat: os.stat_result, hashes: dict):
+        self.update(file_path, stat, sha256=hashes['sha256'], ahash=_hex(hashes['ahash']),
+                    dhash=_hex(hashes['dhash']), phash=_hex(hashes['phash']),
+                    color=json.dumps(hashes['color']))
+
+    def prune(self, folder: Path, alive: Iterable[Path]) -> int:
+        """Remove fontes de `folder` que não existem mais; retorna quantas"""
+        keep = {self.key(p) for p in alive}
+        rows = self.db.execute("SELECT path FROM sources WHERE folder = ?",
+                               (self.key(folder),)).fetchall()
+        stale = [(row['path'],) for row in rows if row['path'] not in keep]
+        self.db.executemany("DELETE FROM sources WHERE path = ?", stale)
+        return len(stale)
+
+    def placeholders(self) -> Dict[str, dict]:
+        """Placeholders ({'thumb': ..., 'modelo': ...}) por nome do thumb gerado"""
+        return self._by_thumb('placeholder')
+
+    def features(self) -> Dict[str, dict]:
+        """Características de cor ({'hist', 'cores'}) por nome do thumb gerado"""
+        return self._by_thumb('features')
+
+    def _by_thumb(self, column: str) -> Dict[str, dict]:
+        rows = self.db.execute(f"SELECT o.path, s.{column} AS value FROM outputs o "
+                               "JOIN sources s ON s.path = o.source "
+                               f"WHERE o.kind = 'thumb' AND s.{column} IS NOT NULL")
+        return {Path(row['path']).name: json.loads(row['value']) for row in rows}
+
+    def cached_quality(self, file_path: Path, stat: os.stat_result, key: str) -> Optional[dict]:
+        """Qualidade adaptativa já escolhida para o conteúdo atual da fonte, se houver"""
+        row = self.lookup(file_path, stat)
+        if not row or row['sha256'] is None:
+            return None
+        cached = self.db.execute("SELECT sha256, quality, ssim, fixed_bytes FROM qualities "
+                                 "WHERE sha256 = ? AND settings = ?",
+                                 (row['sha256'], key)).fetchone()
+        return dict(cached) if cached else None
+
+    def put_quality(self, sha256: str, key: str, choice: dict, modelo_bytes: int):
+        """Guarda a qualidade escolhida para um conteúdo (SHA-256) e suas configurações"""
+        self.db.execute("INSERT OR REPLACE INTO qualities "
+                        "(sha256, settings, quality, ssim, fixed_bytes, bytes) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (sha256, key, choice['quality'], choice['ssim'],
+                         choice['fixed_bytes'], modelo_bytes))
+
+    def quality_totals(self, key: str) -> dict:
+        """Modelos do catálogo atual com qualidade adaptativa: bytes fixos x adaptativos"""
+        row = self.db.execute(
+            "SELECT COUNT(*) AS images, SUM(q.fixed_bytes) AS fixed_bytes, SUM(q.bytes) AS bytes, "
+            "AVG(q.quality) AS mean_quality, MIN(q.quality) AS min_quality, "
+            "MAX(q.quality) AS max_quality FROM sources s "
+            "JOIN qualities q ON q.sha256 = s.sha256 WHERE q.settings = ?", (key,)).fetchone()
+        return dict(row)
+
+    def output_totals(self) -> Dict[str, dict]:
+        """Quantidade e bytes das saídas registradas, por tipo"""
+        rows = self.db.execute("SELECT kind, COUNT(*) AS files, SUM(bytes) AS bytes "
+                               "FROM outputs GROUP BY kind ORDER BY kind")
+        return {row['kind']: {'files': row['files'], 'bytes': row['bytes']} for row in rows}
+
+    def query(self, conditions: List[str], limit: Optional[int] = None) -> List[Dict]:
+        """
+        Consulta fontes por condições `campo op valor` (op: = != > < >= <= ~),
+        combinadas com AND. `~` é LIKE com * como curinga.
+        Atalhos: `errors` (falharam na validação ou no processamento),
+        `render-errors` (só no processamento), `unvalidated`.
+        """
+        clauses, params = [], []
+        for condition in conditions:
+            if condition.lower() in QUERY_SHORTCUTS:
+                clauses.append(QUERY_SHORTCUTS[condition.lower()])
+                continue
+            match = _CONDITION.match(condition)
+            if not match or match.group(1).lower() not in QUERY_FIELDS:
+                raise ValueError(f"condição inválida: {condition!r} "
+                                 f"(campos: {', '.join(sorted(set(QUERY_FIELDS)))})")
+            field, op, value = match.groups()
+            expression = QUERY_FIELDS[field.lower()]
+            if op == '~':
+                clauses.append(f"{expression} LIKE ?")
+                params.append(value.replace('*', '%'))
+            else:
+                clauses.append(f"{expression} {op} ?")
+                params.append(int(value) if re.fullmatch(r'-?\d+', value) else value)
+
+        sql = ("SELECT path, name, size, width, height, mode, format, valid, error, render_error, "
+               "(SELECT COALESCE(SUM(bytes), 0) FROM outputs o WHERE o.source = sources.path) "
+               "AS output_bytes FROM sources")
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY path"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self.db.execute(sql, params)]
@@ -0,0 +1,32 @@
+"""
+Arquivo de configuração do update.py (usatex.json)
+Opções que valem para toda execução sem repetir argumentos no CLI;
+argumentos do CLI têm precedência
+"""
+
+import json
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_CONFIG_PATH = Path("./usatex.json")
+
+
+def load_config(path: Optional[Path] = None) -> dict:
+    """
+    Lê o arquivo de configuração. Sem `path`, usa ./usatex.json se existir;
+    um arquivo pedido explicitamente e ausente, ou JSON inválido, é erro.
+    """
+    explicit = path is not None
+    path = Path(path) if explicit else DEFAULT_CONFIG_PATH
+    if not path.exists():
+        if explicit:
+            raise FileNotFoundError(f"arquivo de configuração não encontrado: {path}")
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"{path}: JSON inválido ({e})") from None
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: esperado um objeto JSON")
+    return data
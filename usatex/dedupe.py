@@ -0,0 +1,177 @@
+"""
+Detecção de duplicatas por conteúdo
+Hash exato (SHA-256) + hashes perceptuais (aHash/dHash/pHash) indexados em BK-tree
+"""
+
+import math
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image
+
+from usatex.manifest import hash_file
+
+HASH_BITS = 64
+
+# Matriz de cossenos 8x32 da DCT-II (só os coeficientes de baixa frequência do pHash)
+_DCT_SIZE = 32
+_DCT_KEEP = 8
+_DCT_MATRIX = [[math.cos(math.pi * (2 * x + 1) * u / (2 * _DCT_SIZE)) for x in range(_DCT_SIZE)]
+               for u in range(_DCT_KEEP)]
+
+
+def hamming(a: int, b: int) -> int:
+    """Distância de Hamming entre dois hashes"""
+    return bin(a ^ b).count('1')
+
+
+def _bits_to_int(bits: Iterable[bool]) -> int:
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def average_hash(gray: Image.Image) -> int:
+    """aHash: pixels 8x8 acima da média"""
+    pixels = list(gray.resize((8, 8), Image.Resampling.BOX).getdata())
+    mean = sum(pixels) / len(pixels)
+    return _bits_to_int(p > mean for p in pixels)
+
+
+def difference_hash(gray: Image.Image) -> int:
+    """dHash: gradiente horizontal em 9x8"""
+    pixels = list(gray.resize((9, 8), Image.Resampling.BOX).getdata())
+    return _bits_to_int(pixels[row * 9 + col] > pixels[row * 9 + col + 1]
+                        for row in range(8) for col in range(8))
+
+
+def perceptual_hash(gray: Image.Image) -> int:
+    """pHash: coeficientes 8x8 de baixa frequência da DCT 32x32 acima da mediana"""
+    pixels = list(gray.resize((_DCT_SIZE, _DCT_SIZE), Image.Resampling.BOX).getdata())
+    rows = [pixels[i * _DCT_SIZE:(i + 1) * _DCT_SIZE] for i in range(_DCT_SIZE)]
+
+    # DCT separável: linhas e depois colunas, mantendo só 8x8
+    partial = [[sum(c * v for c, v in zip(coeffs, row)) for coeffs in _DCT_MATRIX] for row in rows]
+    dct = [[sum(_DCT_MATRIX[u][x] * partial[x][v] for x in range(_DCT_SIZE))
+            for v in range(_DCT_KEEP)] for u in range(_DCT_KEEP)]
+
+    values = [dct[u][v] for u in range(_DCT_KEEP) for v in range(_DCT_KEEP)]
+    median = sorted(values[1:])[len(values[1:]) // 2]  # ignora o termo DC
+    return _bits_to_int(v > median for v in values)
+
+
+def color_signature(img: Image.Image) -> List[int]:
+    """Cores médias em grade 3x3 (distingue variantes de cor com o mesmo desenho)"""
+    return [c for pixel in img.convert('RGB').resize((3, 3), Image.Resampling.BOX).getdata()
+            for c in pixel]
+
+
+def compute_hashes(task: dict) -> dict:
+    """Calcula hash exato, hashes perceptuais e assinatura de cor de uma fonte"""
+    source = Path(task['source'])
+    with Image.open(source) as img:
+        img.draft('RGB', (64, 64))  # decodificação reduzida: só precisamos de 32x32
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        gray = img.convert('L')
+        return {
+            'sha256': hash_file(source),
+            'ahash': average_hash(gray),
+            'dhash': difference_hash(gray),
+            'phash': perceptual_hash(gray),
+            'color': color_signature(img),
+        }
+
+
+def similarity(a: dict, b: dict) -> float:
+    """Similaridade 0..1 combinando os três hashes perceptuais"""
+    distance = sum(hamming(a[k], b[k]) for k in ('ahash', 'dhash', 'phash'))
+    return 1 - distance / (3 * HASH_BITS)
+
+
+def color_distance(a: dict, b: dict) -> float:
+    """Diferença média absoluta entre as assinaturas de cor (0..255)"""
+    return sum(abs(x - y) for x, y in zip(a['color'], b['color'])) / len(a['color'])
+
+
+class BKTree:
+    """Árvore BK sobre distância de Hamming: busca por raio sem varrer tudo"""
+
+    def __init__(self):
+        self.root: Optional[list] = None  # [hash, itens, {distância: filho}]
+
+    def add(self, value: int, item):
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, object]]:
+        """Itens a no máximo `radius` bits de `value`, como (distância, item)"""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                found.extend((distance, item) for item in node[1])
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+def find_clusters(hashes: Dict[str, dict], max_distance: int = 8,
+                  color_tolerance: float = 12.0) -> List[List[Tuple[str, float, bool]]]:
+    """
+    Agrupa arquivos idênticos ou quase idênticos.
+    Vizinhos são buscados na BK-tree do pHash (até `max_distance` bits) e
+    confirmados pela assinatura de cor. Retorna grupos de (nome, similaridade
+    com o primeiro do grupo, bytes idênticos), do mais parecido para o menos.
+    """
+    names = sorted(hashes)
+    tree = BKTree()
+    for name in names:
+        tree.add(hashes[name]['phash'], name)
+
+    parent = {name: name for name in names}
+
+    def root(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    for name in names:
+        for _, other in tree.search(hashes[name]['phash'], max_distance):
+            if other == name:
+                continue
+            same_bytes = hashes[name]['sha256'] == hashes[other]['sha256']
+            if same_bytes or color_distance(hashes[name], hashes[other]) <= color_tolerance:
+                parent[root(other)] = root(name)
+
+    groups: Dict[str, List[str]] = {}
+    for name in names:
+        groups.setdefault(root(name), []).append(name)
+
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        head = members[0]
+        scored = [(m, similarity(hashes[head], hashes[m]),
+                   hashes[head]['sha256'] == hashes[m]['sha256']) for m in members]
+        clusters.append(sorted(scored, key=lambda item: (-item[1], item[0])))
+    clusters.sort(key=lambda c: (-len(c), c[0][0]))
+    return clusters
@@ -0,0 +1,46 @@
+"""
+Eventos por imagem da API de streaming (UsaTexUpdater.stream_images)
+Um evento por fonte, na ordem de conclusão: renderizada, com erro ou pulada
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+
+class Output(NamedTuple):
+    """Arquivo gravado: tipo (thumb, modelo, modelo.512, thumb.webp...), caminho e bytes"""
+    kind: str
+    path: Path
+    size: int
+
+
+@dataclass(frozen=True)
+class ImageEvent:
+    """Base dos eventos: a fonte a que se referem"""
+    source: Path
+
+
+@dataclass(frozen=True)
+class ImageDone(ImageEvent):
+    """Fonte renderizada; saídas já gravadas e registradas no manifesto e no catálogo"""
+    outputs: List[Output] = field(default_factory=list)
+    sha256: str = ''
+    info: Dict[str, object] = field(default_factory=dict)  # width, height, mode, format
+    timings: Dict[str, float] = field(default_factory=dict)  # segundos por etapa
+    quality: Optional[dict] = None  # Escolha da qualidade adaptativa, se ligada
+
+    @property
+    def bytes_written(self) -> int:
+        return sum(output.size for output in self.outputs)
+
+
+@dataclass(frozen=True)
+class ImageFailed(ImageEvent):
+    """Fonte ilegível ou que falhou na renderização (o catálogo guarda o erro)"""
+    error: str = ''
+
+
+@dataclass(frozen=True)
+class ImageSkipped(ImageEvent):
+    """Fonte sem mudanças desde a última renderização (--incremental)"""
@@ -0,0 +1,92 @@
+"""
+Inventário das pastas de fontes
+Uma única passada de os.scandir por pasta, com o stat de cada arquivo guardado,
+compartilhada por todas as etapas (renomear, validar, duplicatas, renderizar)
+"""
+
+import os
+from pathlib import Path
+from stat import S_ISREG
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class FolderInventory:
+    """
+    Arquivos de uma pasta. O stat é feito sob demanda, no máximo uma vez por
+    arquivo (o do DirEntry, gratuito no Windows). Renomeações e eventos do
+    --watch atualizam o inventário sem varrer a pasta de novo.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = Path(folder)
+        self.exists = False
+        self.scans = 0
+        self._names: Set[str] = set()
+        self._entries: Dict[str, os.DirEntry] = {}
+        self._stats: Dict[str, os.stat_result] = {}
+
+    def scan(self) -> 'FolderInventory':
+        """(Re)varre a pasta; só is_file(), que não precisa de stat fora de links simbólicos"""
+        self._names, self._entries, self._stats = set(), {}, {}
+        try:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        self._names.add(entry.name)
+                        self._entries[entry.name] = entry
+            self.exists = True
+        except (FileNotFoundError, NotADirectoryError):
+            self.exists = False
+        self.scans += 1
+        return self
+
+    def __contains__(self, path) -> bool:
+        return Path(path).name in self._names
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def files(self, extensions: Optional[Iterable[str]] = None) -> List[Path]:
+        """Arquivos em ordem de nome, opcionalmente só com as extensões dadas (minúsculas)"""
+        extensions = set(extensions) if extensions is not None else None
+        return [self.folder / name for name in sorted(self._names)
+                if extensions is None or os.path.splitext(name)[1].lower() in extensions]
+
+    def stat(self, path) -> os.stat_result:
+        """stat do arquivo, do cache; arquivos fora do inventário são consultados no disco"""
+        name = Path(path).name
+        stat = self._stats.get(name)
+        if stat is None:
+            entry = self._entries.pop(name, None)
+            stat = entry.stat() if entry is not None else os.stat(self.folder / name)
+            if name in self._names:
+                self._stats[name] = stat
+        return stat
+
+    def renamed(self, old_path: Path, new_path: Path):
+        """Registra um rename feito pelo pipeline (tamanho e mtime não mudam no rename)"""
+        old_name, new_name = Path(old_path).name, Path(new_path).name
+        self._names.discard(old_name)
+        self._entries.pop(old_name, None)
+        stat = self._stats.pop(old_name, None)
+        self._names.add(new_name)
+        self._entries.pop(new_name, None)
+        # Sem stat em cache, o do DirEntry antigo não serve mais: consulta o novo nome
+        self._stats[new_name] = stat or os.stat(self.folder / new_name)
+
+    def refresh(self, paths: Iterable[Path]):
+        """Atualiza só os arquivos citados (eventos do --watch): novos, alterados ou removidos"""
+        for path in paths:
+            name = Path(path).name
+            self._entries.pop(name, None)
+            self._stats.pop(name, None)
+            try:
+                stat = os.stat(self.folder / name)
+            except OSError:
+                self._names.discard(name)
+                continue
+            if S_ISREG(stat.st_mode):
+                self._names.add(name)
+                self._stats[name] = stat
+            else:
+                self._names.discard(name)
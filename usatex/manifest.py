@@ -0,0 +1,207 @@
+"""
+Manifesto de build incremental
+Guarda hash, tamanho, mtime e configurações de codificação de cada fonte.
+Cada registro também vai na hora para um diário (.journal, uma linha JSON
+por fonte) que o próximo load() reaplica: um build interrompido retoma de
+onde parou em vez de refazer as imagens prontas
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+MANIFEST_VERSION = 1
+HASH_CHUNK = 1024 * 1024
+# Ordem fixa do recorte em listaMockups.json: o manifesto é gravado com sort_keys
+TRIM_KEYS = ('x', 'y', 'largura', 'altura')
+
+
+def hash_file(path: Path) -> str:
+    """Calcula o SHA-256 do conteúdo de um arquivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """Estado persistente do último build, indexado pelo caminho da fonte"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix('.journal')
+        self.sources: Dict[str, dict] = {}
+        self.loaded = False
+        self.dirty = False
+        self.replayed = 0  # Registros recuperados do diário no último load()
+        self._journal = None
+
+    @staticmethod
+    def key(file_path: Path) -> str:
+        """Chave estável para um arquivo (caminho relativo em formato posix)"""
+        return Path(file_path).as_posix()
+
+    def load(self) -> bool:
+        """Carrega o manifesto do disco; retorna False se não existir ou for inválido"""
+        self.sources = {}
+        self.loaded = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.sources = data.get('sources', {})
+                self.loaded = True
+        except (OSError, ValueError):
+            pass
+        self.replayed = self._replay()
+        if self.replayed:
+            self.loaded = self.dirty = True
+        return self.loaded
+
+    def _replay(self) -> int:
+        """Reaplica o diário sobre o snapshot; uma última linha cortada (queda) é ignorada"""
+        count = 0
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    if record['entry'] is None:
+                        self.sources.pop(record['key'], None)
+                    else:
+                        self.sources[record['key']] = record['entry']
+                    count += 1
+        except OSError:
+            pass
+        return count
+
+    def _append(self, key: str, entry: Optional[dict]):
+        """Registra uma mudança no diário e força para o disco antes de seguir"""
+        if self._journal is None:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._journal.write(json.dumps({'key': key, 'entry': entry}, ensure_ascii=False) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _truncate_journal(self):
+        """O snapshot já contém tudo: o diário recomeça vazio"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self.journal_path.unlink(missing_ok=True)
+
+    def save(self):
+        """Grava o manifesto de forma atômica"""
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'sources': self.sources},
+                      f, indent=1, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._truncate_journal()
+        self.dirty = False
+
+    def clear(self):
+        """Esquece todas as entradas (após uma limpeza completa)"""
+        self.sources = {}
+        self.loaded = True
+        self.dirty = True
+        self._truncate_journal()
+
+    def source_hash(self, file_path: Path, stat: Optional[os.stat_result] = None) -> str:
+        """Hash do conteúdo, reaproveitando o do manifesto se tamanho e mtime não mudaram"""
+        stat = stat or file_path.stat()
+        entry = self.sources.get(self.key(file_path))
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['hash']
+        return hash_file(file_path)
+
+    def is_fresh(self, file_path: Path, settings: dict,
+                 stat: Optional[os.stat_result] = None) -> bool:
+        """Indica se as saídas de uma fonte estão atualizadas (stat: o do inventário, se houver)"""
+        entry = self.sources.get(self.key(file_path))
+        if not entry or entry.get('settings') != settings:
+            return False
+        if not all(Path(p).exists() for p in entry['outputs']):
+            return False
+
+        stat = stat or file_path.stat()
+        if entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return True
+
+        # mtime mudou (cópia, checkout): só reprocessa se o conteúdo mudou
+        if entry['size'] != stat.st_size or hash_file(file_path) != entry['hash']:
+            return False
+        entry['mtime_ns'] = stat.st_mtime_ns
+        self.dirty = True
+        return True
+
+    def record(self, file_path: Path, settings: dict, outputs: Iterable[Path],
+               file_hash: Optional[str] = None, trim: Optional[dict] = None,
+               stat: Optional[os.stat_result] = None) -> List[str]:
+        """
+        Registra as saídas geradas a partir de uma fonte (e o recorte das
+        bordas transparentes, nos mockups PNG recortados).
+        Retorna as saídas anteriores que ela não gera mais (ex.: formato desativado).
+        """
+        stat = stat or file_path.stat()
+        previous = self.sources.get(self.key(file_path), {}).get('outputs', [])
+        self.sources[self.key(file_path)] = {
+            'hash': file_hash or self.source_hash(file_path, stat),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'settings': settings,
+            'outputs': [self.key(p) for p in outputs],
+        }
+        if trim:
+            self.sources[self.key(file_path)]['trim'] = trim
+        self._append(self.key(file_path), self.sources[self.key(file_path)])
+        self.dirty = True
+
+        # Caso comum (mesmas saídas): nada a conferir nas outras fontes
+        stale = set(previous) - set(self.sources[self.key(file_path)]['outputs'])
+        if not stale:
+            return []
+        claimed = {p for entry in self.sources.values() for p in entry['outputs']}
+        return sorted(stale - claimed)
+
+    def relocate(self, old_folder: Path, new_folder: Path):
+        """Troca o prefixo das saídas (staging -> pastas publicadas, após a promoção)"""
+        old, new = self.key(old_folder).rstrip('/') + '/', self.key(new_folder).rstrip('/') + '/'
+        for entry in self.sources.values():
+            entry['outputs'] = [new + p[len(old):] if p.startswith(old) else p
+                                for p in entry['outputs']]
+        self.dirty = True
+
+    def trims(self) -> Dict[str, dict]:
+        """Recorte {x, y, largura, altura} por saída (nome do arquivo) das fontes recortadas"""
+        return {Path(output).name: {key: entry['trim'][key] for key in TRIM_KEYS}
+                for entry in self.sources.values()
+                if 'trim' in entry for output in entry['outputs']}
+
+    def prune(self, folder: Path, current: Iterable[Path]) -> List[str]:
+        """
+        Remove entradas de fontes que não existem mais em `folder`.
+        Retorna as saídas órfãs (não reivindicadas por nenhuma fonte viva).
+        """
+        prefix = self.key(folder).rstrip('/') + '/'
+        alive = {self.key(p) for p in current}
+        removed = [k for k in self.sources if k.startswith(prefix) and k not in alive]
+
+        orphans = []
+        for k in removed:
+            orphans.extend(self.sources.pop(k)['outputs'])
+            self._append(k, None)
+        if removed:
+            self.dirty = True
+
+        claimed = {p for entry in self.sources.values() for p in entry['outputs']}
+        return sorted(set(orphans) - claimed)
@@ -0,0 +1,139 @@
+"""
+Orçamento de memória da renderização
+Estimativa do tamanho decodificado a partir do cabeçalho e admissão de
+tarefas concorrentes pela memória estimada, não por uma contagem fixa
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Tuple
+
+from PIL import Image
+
+from usatex.render import REDUCING_GAP, STRIP_ROWS, fit_size
+
+# Bytes por pixel decodificado, por modo do Pillow
+BYTES_PER_PIXEL = {'1': 1, 'L': 1, 'P': 1, 'LA': 2, 'PA': 2, 'I;16': 2, 'RGB': 3,
+                   'YCbCr': 3, 'LAB': 3, 'HSV': 3, 'RGBA': 4, 'RGBX': 4, 'CMYK': 4,
+                   'I': 4, 'F': 4}
+
+def jpeg_draft_scale(size: Tuple[int, int], requested: Tuple[int, int]) -> int:
+    """Divisor DCT que Image.draft() escolhe (1, 2, 4 ou 8) para o tamanho pedido"""
+    scale = min(size[0] // max(requested[0], 1), size[1] // max(requested[1], 1))
+    for candidate in (8, 4, 2, 1):
+        if scale >= candidate:
+            return candidate
+    return 1
+
+
+def estimate_memory(source, settings: dict, low_memory: bool = False) -> int:
+    """
+    Pico estimado (bytes) de renderizar a fonte, lido só do cabeçalho.
+    Inclui o arquivo lido para a memória, a fonte decodificada (na escala do
+    draft para JPEG), a conversão para RGB, as cópias do caminho clássico e
+    as saídas redimensionadas. Não inclui a base fixa do processo de trabalho.
+    """
+    with Image.open(source) as img:
+        width, height = img.size
+        mode, fmt = img.mode, img.format
+    bpp = BYTES_PER_PIXEL.get(mode, 4)
+    modelo = fit_size((width, height), tuple(settings['modelo']['size']))
+    # Bytes do arquivo + modelo, degraus da escada e thumb (somados, menores que dois modelos)
+    outputs = os.path.getsize(source) + modelo[0] * modelo[1] * 3 * 2
+
+    if settings.get('render') == 'classic':
+        # Fonte inteira + conversão + duas cópias em resolução total
+        return width * height * (bpp + 3 * 3) + outputs
+
+    if fmt == 'JPEG' and modelo != (width, height):
+        gap = 1.0 if low_memory else REDUCING_GAP
+        scale = jpeg_draft_scale((width, height), (int(modelo[0] * gap), int(modelo[1] * gap)))
+        decoded = -(-width // scale) * -(-height // scale) * bpp
+        # resize(reducing_gap) cria um intermediário reduzido: até ~1/4 do decodificado
+        return decoded + decoded // 4 + outputs
+
+    # Sem escala na decodificação: a fonte inteira fica na memória em qualquer modo
+    decoded = width * height * bpp
+    if low_memory:
+        # Só uma faixa é recortada, convertida e redimensionada por vez, somada à fonte inteira
+        rows = min(height, STRIP_ROWS * -(-height // modelo[1]) + 64)
+        return decoded + rows * width * (bpp + 3) + outputs
+    if mode != 'RGB':
+        decoded += width * height * 3
+    return decoded + decoded // 4 + outputs
+
+
+def estimate_decoded(source) -> int:
+    """Fonte decodificada + uma cópia (mockups: thumbnail() e conversões)"""
+    with Image.open(source) as img:
+        width, height = img.size
+        bpp = BYTES_PER_PIXEL.get(img.mode, 4)
+    return width * height * bpp * 2
+
+
+class MemoryGate:
+    """
+    Semáforo ponderado por bytes: uma tarefa só começa se a memória estimada
+    em uso + a dela couber no orçamento. Uma tarefa maior que o orçamento
+    inteiro roda sozinha, em vez de nunca rodar.
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.in_use = 0
+        self.peak = 0
+        self.waits = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, cost: int):
+        with self._cond:
+            if self.in_use and self.in_use + cost > self.budget:
+                self.waits += 1
+            while self.in_use and self.in_use + cost > self.budget:
+                self._cond.wait()
+            self.in_use += cost
+            self.peak = max(self.peak, self.in_use)
+
+    def release(self, cost: int):
+        with self._cond:
+            self.in_use -= cost
+            self._cond.notify_all()
+
+
+def low_memory_settings(source, settings: dict, budget: int) -> dict:
+    """
+    Configurações de uma fonte de imagem sob o orçamento: com 'low_memory'
+    (draft mais agressivo no JPEG, faixas nos demais) se ela passa dele. O
+    modo reduzido gera outros bytes, então a marca vai para o manifesto.
+    """
+    if settings.get('low_memory') or estimate_memory(source, settings) <= budget:
+        return settings
+    return {**settings, 'low_memory': True}
+
+
+def plan_memory(tasks: list, source_class: str, budget: int) -> dict:
+    """
+    Anota em cada tarefa a memória estimada ('memory') e, nas configurações,
+    se ela passa do orçamento ('low_memory', ver low_memory_settings).
+    Retorna {'over': tarefas acima do orçamento, 'alone': ainda acima no modo reduzido}.
+    """
+    summary = {'over': [], 'alone': []}
+    for task in tasks:
+        source = Path(task['source'])
+        try:
+            if source_class == 'images':
+                task['settings'] = low_memory_settings(source, task['settings'], budget)
+                low_memory = task['settings'].get('low_memory', False)
+                task['memory'] = estimate_memory(source, task['settings'], low_memory)
+                if low_memory:
+                    summary['over'].append(task)
+            else:
+                task['memory'] = estimate_decoded(source)
+        except Exception:
+            # Cabeçalho ilegível: a renderização reporta o erro; custo neutro
+            task['memory'] = 0
+            continue
+        if task['memory'] > budget:
+            summary['alone'].append(task)
+    return summary
@@ -0,0 +1,238 @@
+"""
+Métricas de execução
+Tempo por etapa, histogramas por imagem, bytes e erros em JSON e Prometheus
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Limites dos buckets (segundos), no estilo dos histogramas do Prometheus
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Histograma cumulativo de durações"""
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, limit in enumerate(self.buckets):
+            if value <= limit:
+                self.counts[i] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+            'buckets': {str(limit): n for limit, n in zip(self.buckets, self.counts)},
+        }
+
+
+def _cpu_seconds() -> float:
+    """CPU do processo + filhos já finalizados (workers do pool)"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class RunMetrics:
+    """Coleta as métricas de uma execução do update.py"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages: Dict[str, dict] = {}
+        self.phases: Dict[str, Histogram] = {}
+        self.input_bytes: Dict[str, int] = {}
+        self.output_bytes: Dict[str, int] = {}
+        self.outputs: Dict[str, int] = {}
+        self.pipeline: Optional[dict] = None
+        self.memory: Dict[str, dict] = {}
+        self.memory_budget: Optional[int] = None
+        self.adaptive_quality: Optional[dict] = None
+        self.mockup_png: Dict[str, dict] = {}
+        self.sync: Optional[dict] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """Mede tempo de parede e de CPU de uma etapa"""
+        wall, cpu = time.perf_counter(), _cpu_seconds()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+            entry['wall_seconds'] += time.perf_counter() - wall
+            entry['cpu_seconds'] += _cpu_seconds() - cpu
+
+    def record_render(self, source_class: str, source_bytes: int, result: dict):
+        """Registra tempos por fase e bytes de uma fonte renderizada"""
+        for phase, seconds in result.get('timings', {}).items():
+            self.phases.setdefault(phase, Histogram()).observe(seconds)
+        for kind, _, size in result.get('files', []):
+            self.input_bytes[kind] = self.input_bytes.get(kind, 0) + source_bytes
+            self.output_bytes[kind] = self.output_bytes.get(kind, 0) + size
+            self.outputs[kind] = self.outputs.get(kind, 0) + 1
+        self.input_bytes[source_class] = self.input_bytes.get(source_class, 0) + source_bytes
+
+    def record_memory(self, source: str, result: dict, estimated: Optional[int]):
+        """Pico de RSS medido (e a estimativa de admissão, com --memory-budget) de uma fonte"""
+        entry = {key: result[key] for key in ('peak_rss_kb', 'rss_growth_kb')
+                 if result.get(key) is not None}
+        if estimated is not None:
+            entry['estimated_bytes'] = estimated
+        if entry:
+            self.memory[source] = entry
+
+    def record_png(self, source: str, report: dict, trim: Optional[dict]):
+        """Bytes antes/depois e a escolha da otimização de um mockup PNG"""
+        self.mockup_png[source] = dict(report, trim=trim)
+
+    def record_pipeline(self, pipeline_report: dict):
+        """Guarda fila e espera por estágio do pipeline (--pipeline)"""
+        self.pipeline = pipeline_report
+
+    def report(self, stats: dict, failures: List, shipped: Optional[Dict[str, dict]] = None) -> dict:
+        """Relatório completo como dicionário serializável"""
+        classes = {}
+        for kind, out_bytes in sorted(self.output_bytes.items()):
+            in_bytes = self.input_bytes.get(kind, 0)
+            classes[kind] = {
+                'outputs': self.outputs[kind],
+                'input_bytes': in_bytes,
+                'output_bytes': out_bytes,
+                'compression_ratio': round(out_bytes / in_bytes, 6) if in_bytes else None,
+            }
+        return {
+            'started_at': self.started,
+            'duration_seconds': round(time.time() - self.started, 6),
+            'stages': {name: {k: round(v, 6) for k, v in entry.items()}
+                       for name, entry in self.stages.items()},
+            'per_image_seconds': {phase: h.to_dict() for phase, h in sorted(self.phases.items())},
+            'bytes': {
+                'input_images': self.input_bytes.get('images', 0),
+                'input_mockups': self.input_bytes.get('mockups', 0),
+                'output': sum(self.output_bytes.values()),
+            },
+            'classes': classes,
+            'shipped': shipped or {},
+            'errors': {
+                'total': stats.get('errors', 0),
+                'corrupted': stats.get('corrupted', 0),
+                'failed_files': len(failures),
+            },
+            'stats': dict(stats),
+            'pipeline': self.pipeline,
+            'memory': {
+                'budget_bytes': self.memory_budget,
+                'max_peak_rss_kb': max((e['peak_rss_kb'] for e in self.memory.values()
+                                        if 'peak_rss_kb' in e), default=None),
+                'per_image': dict(sorted(self.memory.items())),
+            },
+            'adaptive_quality': self.adaptive_quality,
+            'mockups_png': dict(sorted(self.mockup_png.items())),
+            'sync': self.sync,
+        }
+
+    def write_json(self, path: Path, report: dict):
+        _write_atomic(Path(path), json.dumps(report, indent=2, ensure_ascii=False) + '\n')
+
+    def write_prometheus(self, path: Path, report: dict):
+        """Formato do textfile collector do node_exporter"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP usatex_{name} {help_text}")
+            lines.append(f"# TYPE usatex_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"usatex_{name}{{{label_text}}} {value}" if label_text
+                             else f"usatex_{name} {value}")
+
+        metric('run_timestamp_seconds', 'gauge', 'Início da última execução',
+               [({}, report['started_at'])])
+        metric('run_duration_seconds', 'gauge', 'Duração da última execução',
+               [({}, report['duration_seconds'])])
+        metric('stage_wall_seconds', 'gauge', 'Tempo de parede por etapa',
+               [({'stage': s}, e['wall_seconds']) for s, e in report['stages'].items()])
+        metric('stage_cpu_seconds', 'gauge', 'Tempo de CPU por etapa (inclui workers)',
+               [({'stage': s}, e['cpu_seconds']) for s, e in report['stages'].items()])
+
+        samples = []
+        for phase, hist in sorted(self.phases.items()):
+            for limit, n in zip(hist.buckets, hist.counts):
+                samples.append(({'phase': phase, 'le': str(limit)}, n))
+            samples.append(({'phase': phase, 'le': '+Inf'}, hist.count))
+        lines.append("# HELP usatex_image_phase_seconds Tempo por imagem em cada fase")
+        lines.append("# TYPE usatex_image_phase_seconds histogram")
+        for labels, value in samples:
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"usatex_image_phase_seconds_bucket{{{label_text}}} {value}")
+        for phase, hist in sorted(self.phases.items()):
+            lines.append(f'usatex_image_phase_seconds_sum{{phase="{phase}"}} {hist.sum:.6f}')
+            lines.append(f'usatex_image_phase_seconds_count{{phase="{phase}"}} {hist.count}')
+
+        metric('output_bytes', 'gauge', 'Bytes gerados nesta execução por classe',
+               [({'class': k}, c['output_bytes']) for k, c in report['classes'].items()])
+        metric('input_bytes', 'gauge', 'Bytes de fontes lidos nesta execução por classe',
+               [({'class': k}, c['input_bytes']) for k, c in report['classes'].items()])
+        metric('compression_ratio', 'gauge', 'Bytes de saída / bytes de fonte por classe',
+               [({'class': k}, c['compression_ratio']) for k, c in report['classes'].items()
+                if c['compression_ratio'] is not None])
+        metric('shipped_bytes', 'gauge', 'Bytes publicados no catálogo por classe',
+               [({'class': k}, v['bytes']) for k, v in report['shipped'].items()])
+        metric('errors', 'gauge', 'Erros da última execução',
+               [({'type': k}, v) for k, v in report['errors'].items()])
+
+        memory = report.get('memory') or {}
+        if memory.get('max_peak_rss_kb') is not None:
+            metric('image_peak_rss_bytes_max', 'gauge',
+                   'Maior pico de RSS do processo de trabalho ao renderizar uma imagem',
+                   [({}, memory['max_peak_rss_kb'] * 1024)])
+        if memory.get('budget_bytes'):
+            metric('memory_budget_bytes', 'gauge', 'Orçamento de memória da renderização',
+                   [({}, memory['budget_bytes'])])
+
+        if report.get('pipeline'):
+            stages = report['pipeline']['stages']
+            metric('pipeline_stage_seconds', 'gauge',
+                   'Tempo por estágio do pipeline: ocupado, faminto (fila de entrada vazia) '
+                   'ou bloqueado (fila de saída cheia)',
+                   [({'stage': name, 'state': state}, entry[f'{state}_seconds'])
+                    for name, entry in stages.items() for state in ('busy', 'starved', 'blocked')])
+            metric('pipeline_stage_utilization', 'gauge', 'Fração do tempo ocupada por estágio',
+                   [({'stage': name}, entry['utilization']) for name, entry in stages.items()
+                    if entry['utilization'] is not None])
+            metric('pipeline_queue_depth_max', 'gauge', 'Profundidade máxima da fila de entrada',
+                   [({'stage': name}, entry['queue_depth_max']) for name, entry in stages.items()])
+
+        sync = report.get('sync')
+        if sync:
+            metric('sync_objects', 'gauge', 'Objetos da sincronização com o bucket por resultado',
+                   [({'result': 'uploaded'}, sync['uploaded']),
+                    ({'result': 'unchanged'}, sync['unchanged']),
+                    ({'result': 'deleted'}, sync['deleted']),
+                    ({'result': 'failed'}, len(sync['failed']))])
+            metric('sync_uploaded_bytes', 'gauge', 'Bytes enviados ao bucket',
+                   [({}, sync['bytes'])])
+            metric('sync_seconds', 'gauge', 'Duração da sincronização com o bucket',
+                   [({}, sync['seconds'])])
+
+        _write_atomic(Path(path), '\n'.join(lines) + '\n')
+
+
+def _write_atomic(path: Path, content: str):
+    """Escrita atômica (o node_exporter nunca lê um arquivo pela metade)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
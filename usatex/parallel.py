@@ -0,0 +1,114 @@
+"""
+Execução paralela das tarefas de renderização
+Distribui as tarefas em um pool de processos e isola falhas por arquivo
+"""
+
+from collections.abc import Sized
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain, islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+WORKER_CRASHED = "processo de trabalho encerrado abruptamente"
+
+
+def _call(func: Callable, task: dict) -> Tuple[Optional[dict], Optional[str]]:
+    """Executa uma tarefa convertendo exceções em mensagem de erro"""
+    try:
+        return func(task), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def run_tasks(func: Callable, tasks: Iterable[dict], jobs: int = 1,
+              budget: Optional[int] = None,
+              cancel=None) -> Iterator[Tuple[dict, Optional[dict], Optional[str]]]:
+    """
+    Executa func(task) para cada tarefa e gera (task, resultado, erro)
+    na ordem de conclusão. Com jobs <= 1 roda no próprio processo.
+
+    `tasks` pode ser um iterável preguiçoso: uma tarefa só é tirada dele
+    quando há vaga (no máximo 2 x jobs em andamento), então quem consome
+    os resultados devagar segura a produção. Com `cancel` (threading.Event)
+    acionado nenhuma tarefa nova começa; as em andamento terminam e são geradas.
+
+    Com `budget` (bytes) uma tarefa só é enviada ao pool se a soma das
+    memórias estimadas (task['memory']) das que estão rodando couber no
+    orçamento, com no máximo `jobs` por vez; uma tarefa sozinha sempre é admitida.
+
+    Uma exceção em um arquivo vira um erro daquela tarefa; se um processo
+    morrer (falha nativa, falta de memória), as tarefas pendentes são
+    refeitas isoladamente, cada uma em seu próprio processo.
+    """
+    pending = iter(tasks)
+    head = list(islice(pending, 2))
+    if jobs <= 1 or len(head) <= 1:
+        for task in chain(head, pending):
+            if _cancelled(cancel):
+                return
+            result, error = _call(func, task)
+            yield task, result, error
+        return
+
+    workers = min(jobs, len(tasks)) if isinstance(tasks, Sized) else jobs
+    limit = jobs if budget is not None else 2 * jobs
+    retry = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from _run_admitted(pool, func, chain(head, pending), limit, budget, retry, cancel)
+
+    for task in retry:
+        if _cancelled(cancel):
+            return
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            try:
+                result, error = pool.submit(_call, func, task).result()
+            except BrokenProcessPool:
+                result, error = None, WORKER_CRASHED
+        yield task, result, error
+
+
+def _cancelled(cancel) -> bool:
+    return cancel is not None and cancel.is_set()
+
+
+def _run_admitted(pool: ProcessPoolExecutor, func: Callable, tasks: Iterator[dict], limit: int,
+                  budget: Optional[int], retry: List[dict], cancel=None):
+    """Envia as tarefas em ordem, no máximo `limit` por vez e dentro do orçamento de memória"""
+    waiting = next(tasks, None)
+    running = {}
+    in_use = 0
+    broken = False
+    while waiting is not None or running:
+        if _cancelled(cancel):
+            waiting = None
+        while waiting is not None and not broken and len(running) < limit:
+            cost = waiting.get('memory', 0)
+            if budget is not None and running and in_use + cost > budget:
+                break
+            try:
+                running[pool.submit(_call, func, waiting)] = waiting
+            except BrokenProcessPool:
+                retry.append(waiting)
+                broken = True
+            else:
+                in_use += cost
+            waiting = next(tasks, None)
+        if broken and waiting is not None:
+            # Pool quebrado: o resto vai para a repetição isolada
+            retry.append(waiting)
+            retry.extend(tasks)
+            waiting = None
+        if not running:
+            continue
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            task = running.pop(future)
+            in_use -= task.get('memory', 0)
+            try:
+                result, error = future.result()
+            except BrokenProcessPool:
+                retry.append(task)
+                broken = True
+                continue
+            yield task, result, error
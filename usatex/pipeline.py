@@ -0,0 +1,205 @@
+"""
+Pipeline em estágios para a renderização de imagens
+Leitura (threads de E/S com prefetch) -> decodificação/redimensionamento/codificação
+(threads de CPU; o Pillow libera o GIL nessas operações) -> gravação (threads de E/S),
+ligados por filas limitadas para manter a memória sob controle
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from usatex.memory import MemoryGate
+from usatex.render import encode_image, image_result, write_outputs
+
+_DONE = object()
+
+
+class StageStats:
+    """Tempo ocupado, esperando entrada (faminto) e esperando saída (bloqueado) de um estágio"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.depth_max = 0
+        self.lock = threading.Lock()
+
+    def add(self, busy: float = 0.0, starved: float = 0.0, blocked: float = 0.0, items: int = 0):
+        with self.lock:
+            self.busy += busy
+            self.starved += starved
+            self.blocked += blocked
+            self.items += items
+
+    def sample_depth(self, depth: int):
+        """Profundidade da fila de entrada do estágio, amostrada a cada item retirado"""
+        with self.lock:
+            self.depth_samples += 1
+            self.depth_total += depth
+            self.depth_max = max(self.depth_max, depth)
+
+    def to_dict(self, wall: float) -> dict:
+        capacity = wall * self.workers
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'busy_seconds': round(self.busy, 6),
+            'starved_seconds': round(self.starved, 6),
+            'blocked_seconds': round(self.blocked, 6),
+            'utilization': round(self.busy / capacity, 4) if capacity else None,
+            'queue_depth_mean': round(self.depth_total / self.depth_samples, 3)
+            if self.depth_samples else 0,
+            'queue_depth_max': self.depth_max,
+        }
+
+
+class StagedPipeline:
+    """
+    Executa as tarefas de imagem em três estágios concorrentes. `run()` gera
+    (task, resultado, erro) na ordem de conclusão, como usatex.parallel.run_tasks.
+    Cancelado (ou com o gerador fechado), os leitores descartam o que ainda
+    não foi lido e o que já está nas filas termina.
+    """
+
+    def __init__(self, jobs: int = 1, io_threads: int = 4, queue_size: Optional[int] = None,
+                 encode: Callable = encode_image, budget: Optional[int] = None):
+        self.jobs = max(1, jobs)
+        self.io_threads = max(1, io_threads)
+        self.queue_size = queue_size or 2 * self.jobs
+        self.encode = encode
+        # Renderizadores só começam uma fonte se a memória estimada couber no orçamento
+        self.gate = MemoryGate(budget) if budget else None
+        self.stages = {
+            'read': StageStats('read', self.io_threads),
+            'render': StageStats('render', self.jobs),
+            'write': StageStats('write', self.io_threads),
+        }
+        self.wall = 0.0
+        self.stop = threading.Event()
+        self.cancel: Optional[threading.Event] = None
+
+    def _get(self, q: queue.Queue, stats: StageStats):
+        started = time.perf_counter()
+        stats.sample_depth(q.qsize())
+        item = q.get()
+        stats.add(starved=time.perf_counter() - started)
+        return item
+
+    def _put(self, q: queue.Queue, item, stats: StageStats):
+        started = time.perf_counter()
+        q.put(item)
+        stats.add(blocked=time.perf_counter() - started)
+
+    def _stage(self, name: str, inbox: queue.Queue, outbox: queue.Queue, work: Callable,
+               finished: List[int], lock: threading.Lock):
+        """Laço de um worker: retira, processa e repassa; o último a sair avisa o próximo estágio"""
+        stats = self.stages[name]
+        while True:
+            item = self._get(inbox, stats)
+            if item is _DONE:
+                break
+            task, payload, error = item
+            if name == 'read' and self._stopped():
+                continue
+            if error is None:
+                started = time.perf_counter()
+                try:
+                    payload = work(task, payload)
+                except Exception as e:
+                    payload, error = None, f"{type(e).__name__}: {e}"
+                stats.add(busy=time.perf_counter() - started, items=1)
+            self._put(outbox, (task, payload, error), stats)
+
+        with lock:
+            finished[0] += 1
+            last = finished[0] == stats.workers
+        if last:
+            next_workers = {'read': self.jobs, 'render': self.io_threads, 'write': 1}[name]
+            for _ in range(next_workers):
+                outbox.put(_DONE)
+
+    def _stopped(self) -> bool:
+        return self.stop.is_set() or (self.cancel is not None and self.cancel.is_set())
+
+    def _read(self, task: dict, _) -> Tuple[bytes, float]:
+        started = time.perf_counter()
+        with open(task['source'], 'rb') as f:
+            return f.read(), time.perf_counter() - started
+
+    def _render(self, task: dict, payload):
+        data, read_seconds = payload
+        cost = task.get('memory', 0)
+        if self.gate:
+            self.gate.acquire(cost)
+        try:
+            rendered = self.encode(task, data)
+        finally:
+            if self.gate:
+                self.gate.release(cost)
+        rendered['timings']['read'] = read_seconds
+        return rendered
+
+    def _write(self, task: dict, rendered: dict) -> dict:
+        started = time.perf_counter()
+        files = write_outputs(rendered.pop('encoded'))
+        rendered['timings']['write'] = time.perf_counter() - started
+        return image_result(rendered, files)
+
+    def run(self, tasks: List[dict],
+            cancel: Optional[threading.Event] = None) -> Iterator[Tuple[dict, Optional[dict], Optional[str]]]:
+        started = time.perf_counter()
+        self.cancel = cancel
+        pending: queue.Queue = queue.Queue()
+        for task in tasks:
+            pending.put((task, None, None))
+        for _ in range(self.io_threads):
+            pending.put(_DONE)
+
+        # Filas limitadas entre os estágios: no máximo queue_size fontes/saídas em memória
+        read_q: queue.Queue = queue.Queue(self.queue_size)
+        write_q: queue.Queue = queue.Queue(self.queue_size)
+        done_q: queue.Queue = queue.Queue()
+
+        layout = [('read', pending, read_q, self._read, self.io_threads),
+                  ('render', read_q, write_q, self._render, self.jobs),
+                  ('write', write_q, done_q, self._write, self.io_threads)]
+        threads = []
+        for name, inbox, outbox, work, workers in layout:
+            finished, lock = [0], threading.Lock()
+            for i in range(workers):
+                thread = threading.Thread(target=self._stage, name=f"usatex-{name}-{i}",
+                                          args=(name, inbox, outbox, work, finished, lock),
+                                          daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        try:
+            while True:
+                item = done_q.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+        self.wall = time.perf_counter() - started
+
+    def report(self) -> Dict[str, dict]:
+        """Estatísticas por estágio; o gargalo é o estágio mais ocupado"""
+        stages = {name: stats.to_dict(self.wall) for name, stats in self.stages.items()}
+        busiest = max(stages, key=lambda n: stages[n]['utilization'] or 0)
+        report = {'wall_seconds': round(self.wall, 6), 'queue_size': self.queue_size,
+                  'bottleneck': busiest, 'stages': stages}
+        if self.gate:
+            report['memory'] = {'budget_bytes': self.gate.budget,
+                                'peak_estimated_bytes': self.gate.peak,
+                                'admission_waits': self.gate.waits}
+        return report
@@ -0,0 +1,109 @@
+"""
+Placeholders de baixa qualidade (LQIP) para thumbs e modelos
+BlurHash, cor dominante e micro-JPEG em base64, calculados com NumPy sobre
+as imagens já renderizadas (nenhuma decodificação extra)
+"""
+
+import base64
+import io
+from typing import Tuple
+
+import numpy as np
+from PIL import Image
+
+from usatex.render import fit_size
+
+# Componentes (x, y) do BlurHash: 4x3 é o padrão da referência
+BLURHASH_COMPONENTS = (4, 3)
+# Lado máximo da amostra usada no BlurHash e na cor dominante
+SAMPLE_SIZE = 32
+# Lado máximo do micro-JPEG embutido
+LQIP_SIZE = 16
+LQIP_QUALITY = 40
+
+_BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+# sRGB (0-255) -> linear, como tabela
+_SRGB_TO_LINEAR = np.where(np.arange(256) / 255 <= 0.04045, np.arange(256) / 255 / 12.92,
+                           ((np.arange(256) / 255 + 0.055) / 1.055) ** 2.4)
+
+
+def _encode83(value: int, length: int) -> str:
+    return ''.join(_BASE83[(value // 83 ** (length - i)) % 83] for i in range(1, length + 1))
+
+
+def _linear_to_srgb(value: float) -> int:
+    value = min(max(value, 0.0), 1.0)
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash(pixels: np.ndarray, components: Tuple[int, int] = BLURHASH_COMPONENTS) -> str:
+    """
+    BlurHash de uma matriz RGB (altura, largura, 3) uint8, vetorizado: os
+    fatores de todos os componentes saem de um único einsum sobre as bases
+    de cossenos. Mesmo resultado do codificador de referência.
+    """
+    cx, cy = components
+    height, width = pixels.shape[:2]
+    linear = _SRGB_TO_LINEAR[pixels]
+    basis_x = np.cos(np.pi * np.arange(cx)[:, None] * np.arange(width)[None, :] / width)
+    basis_y = np.cos(np.pi * np.arange(cy)[:, None] * np.arange(height)[None, :] / height)
+    # factors[j, i] = componente (x=i, y=j); o DC tem normalização 1, os demais 2
+    factors = np.einsum('jy,ix,yxc->jic', basis_y, basis_x, linear) / (width * height)
+    factors[1:, :] *= 2
+    factors[0, 1:] *= 2
+    factors = factors.reshape(-1, 3)
+    dc, ac = factors[0], factors[1:]
+
+    result = _encode83((cx - 1) + (cy - 1) * 9, 1)
+    if len(ac):
+        quantised_max = int(max(0, min(82, np.floor(np.abs(ac).max() * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        max_value = 1
+        result += _encode83(0, 1)
+    result += _encode83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8)
+                        + _linear_to_srgb(dc[2]), 4)
+
+    scaled = ac / max_value
+    quant = np.clip(np.floor(np.sign(scaled) * np.sqrt(np.abs(scaled)) * 9 + 9.5), 0, 18).astype(int)
+    for r, g, b in quant:
+        result += _encode83(int(r) * 19 * 19 + int(g) * 19 + int(b), 2)
+    return result
+
+
+def dominant_color(pixels: np.ndarray) -> str:
+    """
+    Cor dominante (#rrggbb): histograma 16x16x16 via bincount e média dos
+    pixels do balde mais cheio (mais estável que a média da imagem inteira)
+    """
+    flat = pixels.reshape(-1, 3)
+    buckets = flat >> 4
+    index = (buckets[:, 0].astype(np.int32) << 8) | (buckets[:, 1] << 4) | buckets[:, 2]
+    top = np.bincount(index, minlength=4096).argmax()
+    r, g, b = flat[index == top].mean(axis=0).round().astype(int)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def micro_jpeg(img: Image.Image, size: int = LQIP_SIZE, quality: int = LQIP_QUALITY) -> str:
+    """Data URI de um JPEG de até `size` px de lado, para pintar antes da imagem chegar"""
+    small = img.resize(fit_size(img.size, (size, size)), Image.Resampling.BOX)
+    buffer = io.BytesIO()
+    small.save(buffer, 'JPEG', quality=quality, optimize=True)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def placeholder(img: Image.Image, settings: dict) -> dict:
+    """BlurHash, cor dominante e micro-JPEG de uma imagem já renderizada"""
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    sample = img.resize(fit_size(img.size, (SAMPLE_SIZE, SAMPLE_SIZE)), Image.Resampling.BOX)
+    pixels = np.asarray(sample)
+    return {
+        'blurhash': blurhash(pixels, tuple(settings['componentes'])),
+        'cor': dominant_color(pixels),
+        'lqip': micro_jpeg(img, settings['tamanho'], settings['qualidade']),
+    }
@@ -0,0 +1,116 @@
+"""
+Otimização dos mockups PNG com transparência
+Recorte das bordas totalmente transparentes, paleta com alfa quando o erro
+fica abaixo da tolerância e estratégias do zlib testadas em paralelo
+"""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageChops, ImageStat
+
+# Estratégias do zlib (compress_type do Pillow: 0 padrão, 1 filtered, 3 RLE)
+ZLIB_STRATEGIES = {
+    'optimize': {'optimize': True},
+    'default': {'compress_level': 9, 'compress_type': 0},
+    'filtered': {'compress_level': 9, 'compress_type': 1},
+    'rle': {'compress_level': 9, 'compress_type': 3},
+}
+DEFAULT_STRATEGIES = ('optimize', 'default', 'filtered', 'rle')
+# Erro RMS máximo (0-255, cores ponderadas pelo alfa) para aceitar a paleta
+DEFAULT_TOLERANCE = 4.0
+
+
+def trim_transparent(img: Image.Image) -> Tuple[Image.Image, Optional[tuple]]:
+    """Recorta as bordas com alfa 0; retorna a imagem e o box recortado (None se nada mudou)"""
+    box = img.getchannel('A').getbbox()
+    if box is None or box == (0, 0, img.width, img.height):
+        return img, None
+    return img.crop(box), box
+
+
+def clear_transparent(img: Image.Image) -> Image.Image:
+    """Zera a cor dos pixels com alfa 0 (invisível): comprime melhor e não conta como erro"""
+    alpha = img.getchannel('A')
+    visible = alpha.point(lambda value: 255 if value else 0)
+    return Image.composite(img, Image.new('RGBA', img.size, (0, 0, 0, 0)), visible)
+
+
+def quantization_error(original: Image.Image, quantized: Image.Image) -> float:
+    """
+    Maior erro RMS por canal entre o RGBA original e o quantizado; a
+    diferença de cor é ponderada pelo alfa (erro em área transparente não aparece)
+    """
+    diff = ImageChops.difference(original, quantized.convert('RGBA'))
+    alpha = original.getchannel('A')
+    channels = [ImageChops.multiply(band, alpha) for band in diff.split()[:3]]
+    channels.append(diff.getchannel('A'))
+    return max(ImageStat.Stat(band).rms[0] for band in channels)
+
+
+def _encode(img: Image.Image, options: dict) -> bytes:
+    # save() guarda as opções na própria imagem (encoderinfo): cada codificação
+    # em thread precisa da sua cópia, senão uma usa as opções da outra
+    buffer = io.BytesIO()
+    img.copy().save(buffer, 'PNG', **options)
+    return buffer.getvalue()
+
+
+def encode_smallest(candidates: List[Tuple[str, Image.Image]], strategies) -> Tuple[str, bytes]:
+    """
+    Codifica cada imagem candidata com cada estratégia em threads (o
+    codificador do Pillow libera o GIL) e retorna a menor: ('modo/estratégia', bytes)
+    """
+    jobs = [(f"{label}/{name}", img, ZLIB_STRATEGIES[name])
+            for label, img in candidates for name in strategies]
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        payloads = list(pool.map(lambda job: _encode(job[1], job[2]), jobs))
+    best = min(range(len(jobs)), key=lambda i: len(payloads[i]))
+    return jobs[best][0], payloads[best]
+
+
+def optimize_png(img: Image.Image, cfg: dict) -> dict:
+    """
+    Menor PNG sem perda visível de um mockup RGBA já redimensionado.
+    Retorna payload, bytes antes (RGBA inteiro com optimize, o formato
+    anterior) e depois, o recorte {x, y, largura, altura} e a escolha feita.
+    """
+    strategies = cfg.get('strategies', DEFAULT_STRATEGIES)
+    # Decodificar antes das threads: thumbnail() não carrega imagens já pequenas
+    img.load()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # Referência do relatório, em paralelo com a busca
+        before = pool.submit(_encode, img, ZLIB_STRATEGIES['optimize'])
+
+        trim = None
+        work = img
+        if cfg.get('trim', True):
+            work, box = trim_transparent(img)
+            if box:
+                trim = {'x': box[0], 'y': box[1], 'largura': img.width, 'altura': img.height}
+        work = clear_transparent(work)
+
+        candidates = []
+        error = None
+        tolerance = cfg.get('tolerance', DEFAULT_TOLERANCE)
+        if tolerance is not None and tolerance >= 0:
+            quantized = work.quantize(cfg.get('colors', 256), method=Image.Quantize.FASTOCTREE)
+            error = quantization_error(work, quantized)
+            if error <= tolerance:
+                candidates.append(('P', quantized))
+        if not candidates:
+            candidates.append(('RGBA', work))
+        choice, payload = encode_smallest(candidates, strategies)
+        before_payload = before.result()
+        if len(payload) >= len(before_payload):
+            # Nada ganho: mantém o PNG anterior, sem recorte
+            choice, payload, trim = 'RGBA/optimize', before_payload, None
+        before_bytes = len(before_payload)
+
+    return {
+        'payload': payload,
+        'trim': trim,
+        'report': {'before': before_bytes, 'after': len(payload), 'choice': choice,
+                   'error': round(error, 2) if error is not None else None},
+    }
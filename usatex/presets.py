@@ -0,0 +1,109 @@
+"""
+Presets do codificador JPEG por classe de saída (thumb, modelo, mockup)
+Varredura progressiva, subamostragem de croma, otimização de Huffman,
+tabelas de quantização e remoção de metadados
+"""
+
+from typing import Dict, List, Optional
+
+# Campos de um preset (os quatro primeiros são opções do JPEG do Pillow):
+#   optimize: tabelas de Huffman ótimas (segunda passada, ~2x o tempo de codificação)
+#   progressive: varredura progressiva (o navegador mostra uma prévia enquanto baixa)
+#   subsampling: '4:4:4' (croma inteiro, traços finos coloridos), '4:2:2' ou '4:2:0'
+#   qtables: None (tabela padrão do libjpeg escalada pela qualidade) ou um
+#            preset do Pillow (web_low, web_high, ...), que ignora a qualidade
+#   metadata: 'strip' (remove comentários/EXIF/ICC) ou 'icc' (mantém só o perfil ICC)
+#   quality: opcional; sem ela vale a qualidade da classe
+ENCODER_PRESETS = {
+    'baseline': {'optimize': True, 'progressive': False, 'subsampling': '4:2:0',
+                 'qtables': None, 'metadata': 'strip'},
+    'fast': {'optimize': False, 'progressive': False, 'subsampling': '4:2:0',
+             'qtables': None, 'metadata': 'strip'},
+    'progressive': {'optimize': True, 'progressive': True, 'subsampling': '4:2:0',
+                    'qtables': None, 'metadata': 'strip'},
+    'sharp': {'optimize': True, 'progressive': True, 'subsampling': '4:4:4',
+              'qtables': None, 'metadata': 'strip'},
+    'web': {'optimize': True, 'progressive': True, 'subsampling': '4:2:0',
+            'qtables': 'web_high', 'metadata': 'strip'},
+    'icc': {'optimize': True, 'progressive': False, 'subsampling': '4:2:0',
+            'qtables': None, 'metadata': 'icc'},
+}
+
+PRESET_CLASSES = ('thumb', 'modelo', 'mockup')
+DEFAULT_PRESET = 'baseline'
+
+_SUBSAMPLING = ('4:4:4', '4:2:2', '4:2:0')
+_METADATA = ('strip', 'icc')
+
+
+def available_presets(config: dict) -> Dict[str, dict]:
+    """
+    Presets embutidos + os definidos em config['definicoes'] ({nome: {base, campos}}).
+    Uma definição herda os campos do preset `base` (padrão: baseline).
+    """
+    presets = {name: dict(fields) for name, fields in ENCODER_PRESETS.items()}
+    for name, fields in (config.get('definicoes') or {}).items():
+        fields = dict(fields)
+        base = fields.pop('base', DEFAULT_PRESET)
+        if base not in presets:
+            raise ValueError(f"preset {name!r}: base desconhecida {base!r}")
+        preset = dict(presets[base], **fields)
+        validate_preset(name, preset)
+        presets[name] = preset
+    return presets
+
+
+def validate_preset(name: str, preset: dict):
+    unknown = set(preset) - set(ENCODER_PRESETS[DEFAULT_PRESET]) - {'quality'}
+    if unknown:
+        raise ValueError(f"preset {name!r}: campos desconhecidos {', '.join(sorted(unknown))}")
+    if preset['subsampling'] not in _SUBSAMPLING:
+        raise ValueError(f"preset {name!r}: subsampling deve ser {', '.join(_SUBSAMPLING)}")
+    if preset['metadata'] not in _METADATA:
+        raise ValueError(f"preset {name!r}: metadata deve ser {' ou '.join(_METADATA)}")
+    if preset['qtables'] is not None:
+        from PIL import JpegPresets
+        if preset['qtables'] not in JpegPresets.presets:
+            raise ValueError(f"preset {name!r}: qtables desconhecida {preset['qtables']!r}")
+
+
+def select_presets(config: dict, choices: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Preset de cada classe: padrão < config['presets'] < CLI. No CLI, "NOME"
+    vale para todas as classes e "CLASSE=NOME" para uma só.
+    """
+    selected = {cls: DEFAULT_PRESET for cls in PRESET_CLASSES}
+    configured = config.get('presets') or {}
+    if isinstance(configured, str):
+        configured = {cls: configured for cls in PRESET_CLASSES}
+    selected.update(configured)
+    for choice in choices or []:
+        cls, _, name = choice.rpartition('=')
+        for target in ([cls] if cls else PRESET_CLASSES):
+            selected[target] = name
+
+    unknown = set(selected) - set(PRESET_CLASSES)
+    if unknown:
+        raise ValueError(f"classe desconhecida: {', '.join(sorted(unknown))} "
+                         f"(classes: {', '.join(PRESET_CLASSES)})")
+    return selected
+
+
+def encoder_options(preset: dict, quality: int) -> dict:
+    """
+    Opções de codificação JPEG de um preset, no formato das configurações
+    de saída (viram argumentos de Image.save em render.save_output)
+    """
+    options = {
+        'quality': preset.get('quality') or quality,
+        'optimize': preset['optimize'],
+        'progressive': preset['progressive'],
+        'subsampling': preset['subsampling'],
+        'metadata': preset['metadata'],
+    }
+    if preset['qtables'] is not None:
+        from PIL import JpegPresets
+        # Tabelas fixas: entram nas configurações (e no manifesto) como listas
+        options['qtables'] = [list(table) for table in
+                              JpegPresets.presets[preset['qtables']]['quantization']]
+    return options
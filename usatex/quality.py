@@ -0,0 +1,94 @@
+"""
+Qualidade JPEG adaptativa por imagem
+Busca binária da menor qualidade cujo SSIM (NumPy, sobre a luminância)
+contra o modelo redimensionado atinge o alvo
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+
+from usatex.render import save_output
+
+# Janelas do SSIM: 8x8 px a cada 4 px (somas de células 4x4, sem filtro por pixel)
+SSIM_WINDOW = 8
+SSIM_STEP = 4
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+
+def _luma(img: Image.Image) -> np.ndarray:
+    # float32 basta: as somas por célula (até 16 x 255²) são inteiros exatos
+    return np.asarray(img.convert('L'), dtype=np.float32)
+
+
+def _window_means(values: np.ndarray, window: int, step: int) -> np.ndarray:
+    """Média de cada janela window x window com passo `step` (window múltiplo de step)"""
+    rows, cols = values.shape[0] // step, values.shape[1] // step
+    # Soma por eixo em duas etapas: bem mais rápida que sum(axis=(1, 3))
+    cells = values[:rows * step, :cols * step].reshape(rows, step, cols * step).sum(axis=1)
+    cells = cells.reshape(rows, cols, step).sum(axis=2, dtype=np.float64)
+    k = window // step
+    integral = np.zeros((rows + 1, cols + 1))
+    np.cumsum(np.cumsum(cells, axis=0), axis=1, out=integral[1:, 1:])
+    sums = integral[k:, k:] - integral[:-k, k:] - integral[k:, :-k] + integral[:-k, :-k]
+    return sums / (window * window)
+
+
+class SsimReference:
+    """Estatísticas da referência calculadas uma vez e reaproveitadas a cada tentativa"""
+
+    def __init__(self, img: Image.Image, window: int = SSIM_WINDOW, step: int = SSIM_STEP):
+        if min(img.size) < window:
+            window = step = min(img.size)
+        self.window, self.step = window, step
+        self.luma = _luma(img)
+        self.mean = self._means(self.luma)
+        self.var = self._means(self.luma * self.luma) - self.mean ** 2
+
+    def _means(self, values: np.ndarray) -> np.ndarray:
+        return _window_means(values, self.window, self.step)
+
+    def ssim(self, other: np.ndarray) -> float:
+        """SSIM médio entre a referência e outra luminância do mesmo tamanho"""
+        mean = self._means(other)
+        var = self._means(other * other) - mean ** 2
+        cov = self._means(self.luma * other) - self.mean * mean
+        numerator = (2 * self.mean * mean + _C1) * (2 * cov + _C2)
+        denominator = (self.mean ** 2 + mean ** 2 + _C1) * (self.var + var + _C2)
+        return float((numerator / denominator).mean())
+
+
+def search_quality(img: Image.Image, cfg: dict, adaptive: dict) -> dict:
+    """
+    Menor qualidade em [min, max] com SSIM >= alvo; sem nenhuma, fica com max.
+    As tentativas usam Huffman padrão e varredura sequencial: os pixels
+    decodificados são os mesmos do preset, só a codificação é mais rápida.
+    Retorna {'quality', 'ssim', 'attempts'}.
+    """
+    reference = SsimReference(img)
+    probe = dict(cfg, optimize=False, progressive=False)
+    scores = {}
+
+    def score(quality: int) -> float:
+        buffer = io.BytesIO()
+        save_output(img, buffer, dict(probe, quality=quality))
+        buffer.seek(0)
+        with Image.open(buffer) as decoded:
+            # libjpeg entrega só o canal Y, sem converter as cores
+            decoded.draft('L', decoded.size)
+            scores[quality] = reference.ssim(_luma(decoded))
+        return scores[quality]
+
+    low, high = adaptive['min'], adaptive['max']
+    best = None
+    while low <= high:
+        quality = (low + high) // 2
+        if score(quality) >= adaptive['ssim']:
+            best, high = quality, quality - 1
+        else:
+            low = quality + 1
+    if best is None:
+        best = adaptive['max']
+    return {'quality': best, 'ssim': round(scores[best], 5), 'attempts': len(scores)}
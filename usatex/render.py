@@ -0,0 +1,564 @@
+"""
+Renderização de imagens e mockups
+Funções de nível de módulo para poderem rodar em processos de trabalho
+"""
+
+import hashlib
+import io
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageChops, ImageStat, UnidentifiedImageError
+
+from usatex.cachebust import hashed_path
+from usatex.manifest import hash_file
+from usatex.pngopt import optimize_png
+from usatex.variants import ladder_path, variant_path
+
+
+RENDER_PATHS = ('cascade', 'classic')
+
+# Folga mínima entre a escala decodificada e o tamanho final (draft/reduce)
+REDUCING_GAP = 2.0
+
+# Linhas de saída por faixa em resize_strips
+STRIP_ROWS = 128
+
+
+def fit_size(size: tuple, box: tuple) -> tuple:
+    """Tamanho final de thumbnail() para `size` dentro de `box` (mesmo arredondamento do Pillow)"""
+    width, height = size
+    x, y = box
+    if x >= width and y >= height:
+        return size
+
+    aspect = width / height
+    if x / y >= aspect:
+        x = max(min(math.floor(y * aspect), math.ceil(y * aspect),
+                    key=lambda n: abs(aspect - n / y)), 1)
+    else:
+        y = max(min(math.floor(x / aspect), math.ceil(x / aspect),
+                    key=lambda n: 0 if n == 0 else abs(aspect - x / n)), 1)
+    return x, y
+
+
+def decode_source(img: Image.Image, settings: dict, low_memory: bool = False):
+    """
+    Decodifica a fonte e retorna (imagem RGB, tamanho original, box do draft).
+    No caminho cascade JPEGs são decodificados já em escala reduzida
+    (escala DCT do libjpeg via draft); a folga mantém a qualidade.
+    Com low_memory (fonte acima do orçamento) o draft vai até a menor escala
+    que ainda cobre o modelo, e a conversão para RGB fica para resize_strips.
+    Os demais formatos (PNG, WebP, GIF...) não decodificam em escala: load()
+    sempre traz a fonte inteira para a memória.
+    """
+    original_size = img.size
+    box = None
+    if settings.get('render') != 'classic':
+        modelo_final = fit_size(img.size, tuple(settings['modelo']['size']))
+        if modelo_final != img.size:
+            gap = 1.0 if low_memory else REDUCING_GAP
+            # draft() só tem efeito antes de carregar o arquivo
+            res = img.draft(None, (int(modelo_final[0] * gap), int(modelo_final[1] * gap)))
+            if res is not None:
+                box = res[1]
+    img.load()
+
+    # Converter para RGB se necessário
+    if img.mode in ('RGBA', 'LA', 'P') and not (low_memory and settings.get('render') != 'classic'):
+        img = img.convert('RGB')
+    return img, original_size, box
+
+
+def resize_strips(img: Image.Image, size: tuple, strip_rows: int = STRIP_ROWS) -> Image.Image:
+    """
+    Redimensiona em faixas horizontais: cada faixa da saída vem de um recorte
+    da fonte (com margem do suporte do filtro), convertido para RGB só ali.
+    Evita a cópia RGB e o intermediário do resize() da fonte inteira, mas a
+    fonte já está toda decodificada: o pico não cai abaixo do tamanho dela.
+    O resultado é o mesmo LANCZOS do resize() direto, a menos de
+    arredondamentos nas emendas.
+    """
+    mode = 'RGB' if img.mode in ('RGBA', 'LA', 'P') else img.mode
+    out = Image.new(mode, size)
+    scale_y = img.height / size[1]
+    # Suporte do LANCZOS (3 px) na escala da fonte, mais folga de arredondamento
+    margin = math.ceil(3 * max(scale_y, 1.0)) + 2
+    for top in range(0, size[1], strip_rows):
+        bottom = min(size[1], top + strip_rows)
+        src_top, src_bottom = top * scale_y, bottom * scale_y
+        crop_top = max(0, math.floor(src_top) - margin)
+        crop_bottom = min(img.height, math.ceil(src_bottom) + margin)
+        piece = img.crop((0, crop_top, img.width, crop_bottom))
+        if piece.mode != mode:
+            piece = piece.convert(mode)
+        part = piece.resize((size[0], bottom - top), Image.Resampling.LANCZOS,
+                            box=(0, src_top - crop_top, img.width, src_bottom - crop_top))
+        out.paste(part, (0, top))
+    return out
+
+
+def resize_classic(img: Image.Image, thumb_size: tuple, modelo_size: tuple):
+    """Caminho original: duas cópias em resolução total, uma por saída"""
+    # Criar thumbnail
+    thumb_img = img.copy()
+    thumb_img.thumbnail(thumb_size, Image.Resampling.LANCZOS)
+
+    # Criar modelo redimensionado
+    modelo_img = img.copy()
+    modelo_img.thumbnail(modelo_size, Image.Resampling.LANCZOS)
+    return thumb_img, modelo_img
+
+
+def resize_cascade(img: Image.Image, thumb_size: tuple, modelo_size: tuple,
+                   original_size: tuple, box: Optional[tuple] = None,
+                   ladder: Optional[List[int]] = None, strips: bool = False):
+    """
+    Caminho de decodificação única: o modelo é gerado primeiro (a partir da
+    fonte já decodificada em escala reduzida), depois a escada de resoluções,
+    e o thumb é derivado do menor degrau que ainda o cobre, não do original.
+    Com `strips` o modelo sai de resize_strips (fontes acima do orçamento).
+    """
+    # Tamanhos calculados sobre o original, iguais aos do caminho clássico
+    modelo_final = fit_size(original_size, modelo_size)
+    thumb_final = fit_size(original_size, thumb_size)
+
+    modelo_img = img
+    if strips and box is None:
+        modelo_img = resize_strips(img, modelo_final)
+    elif img.size != modelo_final:
+        modelo_img = img.resize(modelo_final, Image.Resampling.LANCZOS,
+                                box=box, reducing_gap=REDUCING_GAP)
+
+    steps = list(render_ladder(modelo_img, original_size, ladder or []))
+    thumb_source = modelo_img
+    for _, step_img in steps:
+        if step_img.width >= thumb_final[0] and step_img.height >= thumb_final[1]:
+            thumb_source = step_img
+
+    thumb_img = thumb_source.resize(thumb_final, Image.Resampling.LANCZOS)
+    return thumb_img, modelo_img, steps
+
+
+def render_ladder(modelo_img: Image.Image, original_size: tuple, ladder: List[int]):
+    """
+    Degraus da escada de resoluções, do maior para o menor. Cada degrau é
+    reduzido a partir do anterior (não do original); o tamanho final é
+    calculado sobre o original, como no modelo. Degraus que não ficariam
+    menores que o anterior são omitidos.
+    """
+    previous = modelo_img
+    for step in sorted(ladder, reverse=True):
+        size = fit_size(original_size, (step, step))
+        if size[0] >= previous.width and size[1] >= previous.height:
+            continue
+        previous = previous.resize(size, Image.Resampling.LANCZOS)
+        yield step, previous
+
+
+def render_outputs(img: Image.Image, settings: dict, timings: Optional[dict] = None,
+                   low_memory: bool = False):
+    """
+    Gera as imagens finais: thumb centralizado no canvas, modelo e degraus
+    da escada de resoluções [(degrau, imagem)], do maior para o menor.
+    low_memory: modo reduzido para fontes acima do orçamento de memória.
+    """
+    thumb_size = tuple(settings['thumb']['size'])
+    modelo_size = tuple(settings['modelo']['size'])
+    timings = {} if timings is None else timings
+
+    started = time.perf_counter()
+    img, original_size, box = decode_source(img, settings, low_memory)
+    decoded = time.perf_counter()
+
+    ladder = settings.get('ladder', [])
+    if settings.get('render') == 'classic':
+        thumb_img, modelo_img = resize_classic(img, thumb_size, modelo_size)
+        steps = list(render_ladder(modelo_img, original_size, ladder))
+    else:
+        thumb_img, modelo_img, steps = resize_cascade(img, thumb_size, modelo_size,
+                                                      original_size, box, ladder, low_memory)
+
+    # Centralizar em canvas 128x128
+    thumb_canvas = Image.new('RGB', thumb_size, (255, 255, 255))
+    offset = ((thumb_size[0] - thumb_img.width) // 2,
+              (thumb_size[1] - thumb_img.height) // 2)
+    thumb_canvas.paste(thumb_img, offset)
+    if 'icc_profile' in thumb_img.info:
+        # Canvas novo não herda o perfil (preset de metadados 'icc')
+        thumb_canvas.info['icc_profile'] = thumb_img.info['icc_profile']
+
+    timings['decode'] = decoded - started
+    timings['resize'] = time.perf_counter() - decoded
+    return thumb_canvas, modelo_img, steps
+
+
+def save_output(img: Image.Image, target, cfg: dict):
+    """Codifica uma saída com as configurações da sua classe (chaves além de size/format viram opções do codificador)"""
+    options = {k: v for k, v in cfg.items() if k not in ('size', 'format', 'metadata')}
+    if 'metadata' in cfg:
+        # O comentário do JPEG de origem segue em img.info após o resize: sempre removido
+        options['comment'] = b''
+        if cfg['metadata'] == 'icc' and img.info.get('icc_profile'):
+            options['icc_profile'] = img.info['icc_profile']
+    img.save(target, cfg['format'], **options)
+
+
+def source_info(img: Image.Image) -> dict:
+    """Fatos do cabeçalho da fonte (antes de draft/conversões)"""
+    return {'width': img.width, 'height': img.height, 'mode': img.mode, 'format': img.format}
+
+
+def encode_image(task: dict, data: bytes, timings: Optional[dict] = None) -> dict:
+    """
+    Renderiza uma fonte a partir dos bytes já lidos e codifica as saídas em
+    memória. Retorna info, hash e 'encoded' [(tipo, caminho, bytes)], sem tocar o disco.
+    """
+    settings = task['settings']
+    timings = {} if timings is None else timings
+
+    try:
+        img = Image.open(io.BytesIO(data))
+    except UnidentifiedImageError:
+        # Mesma mensagem de Image.open(caminho), com o nome da fonte
+        raise UnidentifiedImageError(f"cannot identify image file {task['source']!r}") from None
+
+    with img:
+        info = source_info(img)
+        thumb_img, modelo_img, steps = render_outputs(img, settings, timings,
+                                                      settings.get('low_memory', False))
+        targets = [('thumb', thumb_img, Path(task['thumb'])),
+                   ('modelo', modelo_img, Path(task['modelo']))]
+        targets += [(f"modelo.{step}", step_img, ladder_path(task['modelo'], step))
+                    for step, step_img in steps]
+
+        digest = hashlib.sha256(data).hexdigest()
+        quality = None
+        modelo_cfg = settings['modelo']
+        if settings.get('adaptive'):
+            quality = adaptive_quality(modelo_img, settings, digest, task.get('quality_cache'),
+                                       timings)
+            modelo_cfg = dict(modelo_cfg, quality=quality['quality'])
+
+        started = time.perf_counter()
+        encoded = []
+        for kind, out_img, path in targets:
+            cfg = settings['thumb'] if kind == 'thumb' else settings['modelo']
+            if kind == 'modelo':
+                cfg = modelo_cfg
+            outputs = [(kind, path, cfg)]
+            # Variantes WebP/AVIF a partir da mesma imagem já redimensionada
+            outputs += [(f"{kind}.{ext}", variant_path(path, ext), variant_cfg)
+                        for ext, variant_cfg in settings.get('variants', {}).items()]
+            for out_kind, out_path, out_cfg in outputs:
+                buffer = io.BytesIO()
+                save_output(out_img, buffer, out_cfg)
+                payload = buffer.getvalue()
+                if settings.get('hashed_names'):
+                    out_path = hashed_path(out_path, payload)
+                encoded.append((out_kind, str(out_path), payload))
+        timings['encode'] = time.perf_counter() - started
+
+        placeholders = None
+        if settings.get('placeholder'):
+            # Import tardio: NumPy só é exigido com os placeholders ligados
+            from usatex.placeholder import placeholder
+            started = time.perf_counter()
+            # O menor degrau já decodificado basta para 32px; o thumb é o do canvas
+            smallest = steps[-1][1] if steps else modelo_img
+            placeholders = {'thumb': placeholder(thumb_img, settings['placeholder']),
+                            'modelo': placeholder(smallest, settings['placeholder'])}
+            timings['placeholder'] = time.perf_counter() - started
+
+        features = None
+        if settings.get('similarity'):
+            from usatex.similarity import color_features
+            started = time.perf_counter()
+            features = color_features(steps[-1][1] if steps else modelo_img, settings['similarity'])
+            timings['similarity'] = time.perf_counter() - started
+
+    return {
+        'hash': digest,
+        'info': info,
+        'encoded': encoded,
+        'timings': timings,
+        'placeholder': placeholders,
+        'features': features,
+        'quality': quality,
+    }
+
+
+def adaptive_quality(modelo_img: Image.Image, settings: dict, digest: str,
+                     cached: Optional[dict], timings: dict) -> dict:
+    """
+    Qualidade do modelo pelo SSIM alvo. Com a escolha já no cache para este
+    conteúdo (mesmo SHA-256) não há busca. Sem cache, o modelo também é
+    codificado na qualidade fixa da classe para medir a economia.
+    """
+    if cached and cached['sha256'] == digest:
+        return {'quality': cached['quality'], 'ssim': cached['ssim'],
+                'fixed_bytes': cached['fixed_bytes'], 'cached': True}
+
+    # Import tardio: NumPy só é exigido com a qualidade adaptativa ligada
+    from usatex.quality import search_quality
+    started = time.perf_counter()
+    choice = search_quality(modelo_img, settings['modelo'], settings['adaptive'])
+    buffer = io.BytesIO()
+    save_output(modelo_img, buffer, settings['modelo'])
+    timings['quality'] = time.perf_counter() - started
+    return dict(choice, fixed_bytes=buffer.tell(), cached=False)
+
+
+def write_outputs(encoded: List[tuple]) -> List[tuple]:
+    """Grava as saídas codificadas; retorna [(tipo, caminho, bytes gravados)]"""
+    files = []
+    for kind, path, payload in encoded:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(payload)
+        files.append((kind, path, len(payload)))
+    return files
+
+
+def image_result(rendered: dict, files: List[tuple]) -> dict:
+    """Resultado no formato consumido pelo orquestrador (manifesto, catálogo, métricas)"""
+    return {
+        'outputs': [path for _, path, _ in files],
+        'hash': rendered['hash'],
+        'info': rendered['info'],
+        'files': files,
+        'timings': rendered['timings'],
+        'stats': {'thumbs_created': 1, 'modelos_created': 1},
+        'placeholder': rendered.get('placeholder'),
+        'features': rendered.get('features'),
+        'quality': rendered.get('quality'),
+    }
+
+
+def render_image(task: dict) -> dict:
+    """Gera thumb e modelo de uma fonte; retorna saídas, contadores e o pico de RSS da imagem"""
+    base_kb = _reset_peak_rss()
+    with open(task['source'], 'rb') as f:
+        data = f.read()
+    rendered = encode_image(task, data)
+    result = image_result(rendered, write_outputs(rendered['encoded']))
+    result.update(_task_rss(base_kb))
+    return result
+
+
+def render_variant(task: dict) -> dict:
+    """
+    Variante sob demanda do servidor (usatex.server): a fonte reduzida à
+    largura pedida (sem ampliar), pelo mesmo draft + LANCZOS do caminho
+    cascade, e codificada com `task['encoder']` em memória.
+    Retorna {'payload', 'size', 'timings'}.
+    """
+    width = task['width']
+    started = time.perf_counter()
+    with Image.open(task['source']) as img:
+        # Altura livre: só a largura limita o tamanho final
+        img, original_size, box = decode_source(img, {'modelo': {'size': [width, 1 << 30]}})
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        decoded = time.perf_counter()
+        size = fit_size(original_size, (width, 1 << 30))
+        if img.size != size:
+            img = img.resize(size, Image.Resampling.LANCZOS, box=box, reducing_gap=REDUCING_GAP)
+        resized = time.perf_counter()
+        buffer = io.BytesIO()
+        save_output(img, buffer, task['encoder'])
+    return {
+        'payload': buffer.getvalue(),
+        'size': size,
+        'timings': {'decode': decoded - started, 'resize': resized - decoded,
+                    'encode': time.perf_counter() - resized},
+    }
+
+
+def _task_rss(base_kb: Optional[int]) -> dict:
+    """Pico de RSS da tarefa e quanto ele passou do RSS no início dela"""
+    # Sem como zerar o pico (fora do Linux) o valor seria o do processo inteiro
+    peak = _peak_rss_kb() if base_kb is not None else None
+    return {'peak_rss_kb': peak, 'rss_growth_kb': peak - base_kb if peak is not None else None}
+
+
+def _proc_status_kb(field: str) -> Optional[int]:
+    """Campo em KiB de /proc/self/status (VmRSS, VmHWM); None fora do Linux"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _reset_peak_rss() -> Optional[int]:
+    """
+    Zera o pico de RSS do processo (Linux: /proc/self/clear_refs) para medir
+    uma tarefa só; retorna o RSS atual em KiB (a base da tarefa) ou None
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return None
+    return _proc_status_kb('VmRSS')
+
+
+def _peak_rss_kb() -> Optional[int]:
+    """Pico de memória residente do processo atual, em KiB (None se indisponível)"""
+    # VmHWM respeita o _reset_peak_rss(); ru_maxrss não
+    peak = _proc_status_kb('VmHWM')
+    if peak is not None:
+        return peak
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def benchmark_render(sources: List[str], settings: dict) -> dict:
+    """
+    Renderiza as fontes em memória com o caminho de `settings['render']`.
+    Roda em um processo próprio para que o pico de RSS seja só deste caminho.
+    """
+    timings = []
+    outputs = {}
+    errors = {}
+    for source in sources:
+        started = time.perf_counter()
+        encoded = []
+        try:
+            with Image.open(source) as img:
+                thumb_img, modelo_img, _ = render_outputs(img, settings)
+                for out_img, cfg in ((thumb_img, settings['thumb']), (modelo_img, settings['modelo'])):
+                    buffer = io.BytesIO()
+                    save_output(out_img, buffer, cfg)
+                    encoded.append(buffer.getvalue())
+        except Exception as e:
+            errors[source] = str(e)
+            continue
+        timings.append(time.perf_counter() - started)
+        outputs[source] = encoded
+
+    return {'timings': timings, 'outputs': outputs, 'errors': errors,
+            'peak_rss_kb': _peak_rss_kb()}
+
+
+def benchmark_encoders(sources: List[str], settings: dict, options: Dict[str, dict]) -> dict:
+    """
+    Renderiza cada fonte uma vez e codifica thumb e modelo com as opções de
+    cada preset ({preset: {'thumb': cfg, 'modelo': cfg}}). Por preset e classe:
+    tempo de codificação, bytes e PSNR contra a saída sem perdas.
+    """
+    results = {name: {cls: {'time': 0.0, 'bytes': 0, 'psnr': []} for cls in ('thumb', 'modelo')}
+               for name in options}
+    errors = {}
+    images = 0
+    for source in sources:
+        try:
+            with Image.open(source) as img:
+                thumb_img, modelo_img, _ = render_outputs(img, settings)
+        except Exception as e:
+            errors[source] = str(e)
+            continue
+        images += 1
+        for cls, out_img in (('thumb', thumb_img), ('modelo', modelo_img)):
+            reference = io.BytesIO()
+            out_img.save(reference, 'PNG', compress_level=0)
+            for name, by_class in options.items():
+                buffer = io.BytesIO()
+                started = time.perf_counter()
+                save_output(out_img, buffer, dict(by_class[cls], format='JPEG'))
+                entry = results[name][cls]
+                entry['time'] += time.perf_counter() - started
+                entry['bytes'] += buffer.tell()
+                entry['psnr'].append(psnr(reference.getvalue(), buffer.getvalue()))
+
+    return {'results': results, 'images': images, 'errors': errors}
+
+
+def psnr(a_bytes: bytes, b_bytes: bytes) -> float:
+    """PSNR (dB) entre duas saídas codificadas; infinito se idênticas"""
+    with Image.open(io.BytesIO(a_bytes)) as a, Image.open(io.BytesIO(b_bytes)) as b:
+        a = a.convert('RGB')
+        b = b.convert('RGB')
+        if a.size != b.size:
+            b = b.resize(a.size, Image.Resampling.LANCZOS)
+        rms = ImageStat.Stat(ImageChops.difference(a, b)).rms
+    mse = sum(r * r for r in rms) / len(rms)
+    return math.inf if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def render_mockup(task: dict) -> dict:
+    """Redimensiona um mockup, preservando a transparência de PNGs"""
+    base_kb = _reset_peak_rss()
+    source = Path(task['source'])
+    mockup_cfg = task['settings']['mockup']
+    mockup_path = Path(task['mockup'])
+
+    with Image.open(source) as img:
+        info = source_info(img)
+
+        # Preservar transparência para mockups
+        original_mode = img.mode
+
+        # Redimensionar mantendo proporção (thumbnail() decodifica: o tempo inclui a decodificação)
+        started = time.perf_counter()
+        img.thumbnail(tuple(mockup_cfg['size']), Image.Resampling.LANCZOS)
+        resized = time.perf_counter()
+
+        # Codificar em memória: com nomes com hash o nome depende dos bytes
+        buffer = io.BytesIO()
+        trim = png_report = None
+
+        # Salvar mantendo transparência se for PNG
+        if source.suffix.lower() == '.png' and original_mode in ('RGBA', 'LA', 'P'):
+            # Manter como PNG com transparência
+            if original_mode == 'P' or (original_mode == 'LA' and 'png' in task['settings']):
+                img = img.convert('RGBA')
+            mockup_path = mockup_path.with_suffix('.png')
+            if 'png' in task['settings']:
+                # Recorte, paleta com alfa e estratégias do zlib (usatex.pngopt)
+                optimized = optimize_png(img, task['settings']['png'])
+                buffer.write(optimized['payload'])
+                trim, png_report = optimized['trim'], optimized['report']
+            else:
+                img.save(buffer, "PNG", optimize=mockup_cfg['optimize'])
+        else:
+            # Converter para RGB apenas se não for PNG com transparência
+            if img.mode in ('RGBA', 'LA', 'P'):
+                if img.mode == 'RGBA':
+                    # Criar fundo branco e colar a imagem
+                    background = Image.new('RGB', img.size, (255, 255, 255))
+                    background.paste(img, mask=img.split()[-1])  # usar canal alpha como máscara
+                    img = background
+                else:
+                    img = img.convert('RGB')
+
+            save_output(img, buffer, dict(mockup_cfg, format='JPEG'))
+        encoded = time.perf_counter()
+
+    payload = buffer.getvalue()
+    if task['settings'].get('hashed_names'):
+        mockup_path = hashed_path(mockup_path, payload)
+    files = write_outputs([('mockup', str(mockup_path), payload)])
+
+    return {
+        'outputs': [str(mockup_path)],
+        'hash': hash_file(source),
+        'info': info,
+        'files': files,
+        'timings': {'resize': resized - started, 'encode': encoded - resized},
+        'stats': {'mockups_processed': 1},
+        'trim': trim,
+        'png': png_report,
+        **_task_rss(base_kb),
+    }
@@ -0,0 +1,464 @@
+"""
+Servidor de imagens sob demanda
+/img/<nome>?w=&fmt=&q= redimensiona a fonte de base-images no pool de
+processos, com cache LRU em memória, cache em disco com limite de tamanho,
+misses simultâneos da mesma variante agrupados e métricas de acertos/latência
+"""
+
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import signal
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from usatex.inventory import FolderInventory
+from usatex.metrics import Histogram
+from usatex.render import render_variant
+
+# Latência das respostas (segundos): acertos em memória ficam bem abaixo de 1 ms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+OUTCOMES = ('memory', 'disk', 'miss', 'coalesced', 'static', 'not_modified',
+            'not_found', 'bad_request', 'error')
+
+MIN_WIDTH = 16
+MAX_WIDTH = 4096
+# Intervalo mínimo entre novas varreduras de base-images por nomes desconhecidos
+RESCAN_INTERVAL = 1.0
+# Validade do stat de uma fonte (o mtime entra na chave da variante)
+STAT_TTL = 1.0
+MAX_HEADER_LINES = 100
+
+CONTENT_TYPES = {'jpeg': 'image/jpeg', 'webp': 'image/webp', 'avif': 'image/avif'}
+EXTENSIONS = {'jpeg': '.jpg', 'webp': '.webp', 'avif': '.avif'}
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class MemoryCache:
+    """LRU de variantes em memória, limitado pelo total de bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._items: 'OrderedDict[str, bytes]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> Optional[bytes]:
+        payload = self._items.get(key)
+        if payload is not None:
+            self._items.move_to_end(key)
+        return payload
+
+    def put(self, key: str, payload: bytes):
+        if len(payload) > self.max_bytes:
+            return
+        previous = self._items.pop(key, None)
+        if previous is not None:
+            self.bytes -= len(previous)
+        self._items[key] = payload
+        self.bytes += len(payload)
+        while self.bytes > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+
+class DiskCache:
+    """
+    Variantes em arquivos <chave><ext>, com limite de bytes e despejo das
+    menos usadas. A ordem de uso sobrevive a reinícios pelo mtime (tocado a
+    cada acerto). Chamado de threads: o índice é protegido por um lock.
+    """
+
+    def __init__(self, folder: Path, max_bytes: int):
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index: 'OrderedDict[str, int]' = OrderedDict()
+        self.folder.mkdir(parents=True, exist_ok=True)
+        entries = []
+        with os.scandir(self.folder) as found:
+            for entry in found:
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self.bytes += size
+        self._evict()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            if name not in self._index:
+                return None
+            self._index.move_to_end(name)
+        path = self.folder / name
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.bytes -= self._index.pop(name, 0)
+            return None
+        return payload
+
+    def put(self, name: str, payload: bytes):
+        if len(payload) > self.max_bytes:
+            return
+        path = self.folder / name
+        tmp_path = path.with_name(f"{name}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Cache é só aceleração: disco cheio não derruba a resposta
+            tmp_path.unlink(missing_ok=True)
+            return
+        with self._lock:
+            self.bytes -= self._index.pop(name, 0)
+            self._index[name] = len(payload)
+            self.bytes += len(payload)
+            self._evict()
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and self._index:
+            name, size = self._index.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+            try:
+                (self.folder / name).unlink()
+            except OSError:
+                pass
+
+
+class BadRequest(ValueError):
+    """Parâmetro inválido na URL (resposta 400)"""
+
+
+class ImageServer:
+    """
+    Servidor HTTP/1.1 mínimo (asyncio, conexões keep-alive) com as rotas:
+      /img/<nome>?w=&fmt=&q=  variante sob demanda (nome da fonte ou da saída)
+      /assets/<caminho>       arquivos pré-gerados de static/assets (linha de base dos testes de carga)
+      /metrics                métricas no formato do Prometheus (/metrics.json em JSON)
+    """
+
+    def __init__(self, source_folder: Path, extensions, output_name: Callable[[Path], str],
+                 encoders: Dict[str, dict], default_width: int,
+                 assets_folder: Path, cache_folder: Path,
+                 memory_bytes: int, disk_bytes: int, jobs: int = 1):
+        self.inventory = FolderInventory(source_folder)
+        self.extensions = set(extensions)
+        self.output_name = output_name
+        self.encoders = encoders  # {fmt: configurações de save_output, com a qualidade padrão}
+        self.default_width = default_width
+        self.assets_folder = Path(assets_folder).resolve()
+        self.memory = MemoryCache(memory_bytes)
+        self.disk = DiskCache(cache_folder, disk_bytes)
+        self.jobs = jobs
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self._names: Dict[str, Path] = {}
+        self._scanned_at = 0.0
+        self._stats: Dict[Path, Tuple[float, os.stat_result]] = {}
+        # Chave das variantes muda junto com os codificadores (troca de preset invalida o cache)
+        self._encoders_key = hashlib.sha256(
+            json.dumps(encoders, sort_keys=True).encode()).hexdigest()[:12]
+
+        self.started = time.time()
+        self.counts = {outcome: 0 for outcome in OUTCOMES}
+        self.latency = {outcome: Histogram(LATENCY_BUCKETS) for outcome in OUTCOMES}
+        self.render_seconds = Histogram(LATENCY_BUCKETS)
+        self.bytes_sent = 0
+
+    # Fontes
+
+    def rescan(self):
+        """Varre base-images e mapeia nome da fonte e nome de saída para o arquivo"""
+        self.inventory.scan()
+        names = {}
+        for path in self.inventory.files(self.extensions):
+            names[path.name] = path
+            names.setdefault(self.output_name(path), path)
+        self._names = names
+        self._scanned_at = time.monotonic()
+
+    def resolve(self, name: str) -> Optional[Path]:
+        path = self._names.get(name)
+        if path is None and time.monotonic() - self._scanned_at >= RESCAN_INTERVAL:
+            self.rescan()
+            path = self._names.get(name)
+        return path
+
+    def source_stat(self, path: Path) -> Optional[os.stat_result]:
+        now = time.monotonic()
+        cached = self._stats.get(path)
+        if cached and now - cached[0] < STAT_TTL:
+            return cached[1]
+        try:
+            stat = path.stat()
+        except OSError:
+            self._stats.pop(path, None)
+            return None
+        self._stats[path] = (now, stat)
+        return stat
+
+    # Variantes
+
+    def parse_variant(self, query: str) -> Tuple[int, str, int]:
+        """(largura, formato, qualidade) da query string, com os padrões do servidor"""
+        params = {k: v[-1] for k, v in parse_qs(query).items()}
+        fmt = params.get('fmt', 'jpeg').lower()
+        fmt = 'jpeg' if fmt == 'jpg' else fmt
+        if fmt not in self.encoders:
+            raise BadRequest(f"fmt deve ser {', '.join(self.encoders)}")
+        try:
+            width = int(params.get('w', self.default_width))
+            quality = int(params.get('q', self.encoders[fmt]['quality']))
+        except ValueError:
+            raise BadRequest("w e q devem ser inteiros")
+        if not MIN_WIDTH <= width <= MAX_WIDTH:
+            raise BadRequest(f"w deve estar entre {MIN_WIDTH} e {MAX_WIDTH}")
+        if not 1 <= quality <= 100:
+            raise BadRequest("q deve estar entre 1 e 100")
+        return width, fmt, quality
+
+    def variant_key(self, source: Path, stat: os.stat_result, width: int, fmt: str,
+                    quality: int) -> str:
+        """Chave da variante: fonte (nome, tamanho, mtime), parâmetros e codificadores"""
+        text = (f"{source.name}|{stat.st_size}|{stat.st_mtime_ns}|{width}|{fmt}|{quality}|"
+                f"{self._encoders_key}")
+        return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+    async def variant(self, source: Path, key: str, width: int, fmt: str,
+                      quality: int) -> Tuple[bytes, str]:
+        """Bytes da variante e de onde vieram: memory, disk, miss ou coalesced"""
+        payload = self.memory.get(key)
+        if payload is not None:
+            return payload, 'memory'
+
+        pending = self.inflight.get(key)
+        if pending is not None:
+            # Mesma variante já em renderização: espera o resultado em vez de renderizar de novo
+            return await asyncio.shield(pending), 'coalesced'
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Sem ninguém esperando, a exceção não deve aparecer como "never retrieved"
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.inflight[key] = future
+        try:
+            name = key + EXTENSIONS[fmt]
+            payload = await loop.run_in_executor(None, self.disk.get, name)
+            outcome = 'disk'
+            if payload is None:
+                task = {'source': str(source), 'width': width,
+                        'encoder': dict(self.encoders[fmt], quality=quality)}
+                started = time.perf_counter()
+                result = await loop.run_in_executor(self.pool, render_variant, task)
+                self.render_seconds.observe(time.perf_counter() - started)
+                payload, outcome = result['payload'], 'miss'
+                await loop.run_in_executor(None, self.disk.put, name, payload)
+            self.memory.put(key, payload)
+            future.set_result(payload)
+            return payload, outcome
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self.inflight[key]
+
+    # HTTP
+
+    async def handle_image(self, name: str, query: str, headers: Dict[str, str]):
+        source = self.resolve(name)
+        stat = self.source_stat(source) if source else None
+        if stat is None:
+            return 404, {}, f"{name} não encontrada\n".encode(), 'not_found'
+        try:
+            width, fmt, quality = self.parse_variant(query)
+        except BadRequest as e:
+            return 400, {}, f"{e}\n".encode(), 'bad_request'
+
+        key = self.variant_key(source, stat, width, fmt, quality)
+        etag = f'"{key}"'
+        response_headers = {'Content-Type': CONTENT_TYPES[fmt], 'ETag': etag,
+                            'Cache-Control': 'public, max-age=86400'}
+        if headers.get('if-none-match') == etag:
+            return 304, response_headers, b'', 'not_modified'
+        try:
+            payload, outcome = await self.variant(source, key, width, fmt, quality)
+        except Exception as e:
+            return 500, {}, f"erro ao renderizar {name}: {e}\n".encode(), 'error'
+        response_headers['X-Cache'] = outcome
+        return 200, response_headers, payload, outcome
+
+    async def handle_static(self, relative: str):
+        path = (self.assets_folder / relative).resolve()
+        if self.assets_folder not in path.parents or not path.is_file():
+            return 404, {}, "não encontrado\n".encode(), 'not_found'
+        loop = asyncio.get_running_loop()
+        payload = await loop.run_in_executor(None, path.read_bytes)
+        content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        return 200, {'Content-Type': content_type,
+                     'Cache-Control': 'public, max-age=86400'}, payload, 'static'
+
+    async def dispatch(self, method: str, target: str, headers: Dict[str, str]):
+        if method not in ('GET', 'HEAD'):
+            return 405, {'Allow': 'GET, HEAD'}, b'', 'bad_request'
+        url = urlsplit(target)
+        path = unquote(url.path)
+        if path.startswith('/img/'):
+            name = path[len('/img/'):]
+            if not name or '/' in name or '\\' in name or name.startswith('.'):
+                return 404, {}, "não encontrado\n".encode(), 'not_found'
+            return await self.handle_image(name, url.query, headers)
+        if path.startswith('/assets/'):
+            return await self.handle_static(path[len('/assets/'):])
+        if path == '/metrics':
+            return 200, {'Content-Type': 'text/plain; version=0.0.4'}, \
+                self.prometheus().encode(), None
+        if path == '/metrics.json':
+            return 200, {'Content-Type': 'application/json'}, \
+                json.dumps(self.report(), indent=2).encode(), None
+        return 404, {}, "não encontrado\n".encode(), 'not_found'
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                started = time.perf_counter()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                status, response_headers, body, outcome = await self.dispatch(method, target, headers)
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1')
+                head = [f"HTTP/1.1 {status} {REASONS[status]}",
+                        f"Content-Length: {len(body)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                response_headers.setdefault('Content-Type', 'text/plain; charset=utf-8')
+                head += [f"{k}: {v}" for k, v in response_headers.items()]
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+                if method != 'HEAD':
+                    writer.write(body)
+                    self.bytes_sent += len(body)
+                await writer.drain()
+
+                if outcome:
+                    self.counts[outcome] += 1
+                    self.latency[outcome].observe(time.perf_counter() - started)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        """Atende até SIGINT/SIGTERM; encerra o pool junto (sem workers órfãos)"""
+        self.rescan()
+        loop = asyncio.get_running_loop()
+        stop = loop.create_future()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, lambda: stop.done() or stop.set_result(None))
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C chega como KeyboardInterrupt
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs)
+        try:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            async with server:
+                await stop
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+    # Métricas
+
+    def report(self) -> dict:
+        hits = self.counts['memory'] + self.counts['disk'] + self.counts['coalesced']
+        lookups = hits + self.counts['miss']
+        return {
+            'uptime_seconds': round(time.time() - self.started, 3),
+            'requests': dict(self.counts),
+            'hit_ratio': round(hits / lookups, 4) if lookups else None,
+            'latency_seconds': {k: h.to_dict() for k, h in self.latency.items() if h.count},
+            'render_seconds': self.render_seconds.to_dict(),
+            'bytes_sent': self.bytes_sent,
+            'inflight': len(self.inflight),
+            'memory_cache': {'items': len(self.memory), 'bytes': self.memory.bytes,
+                             'max_bytes': self.memory.max_bytes,
+                             'evictions': self.memory.evictions},
+            'disk_cache': {'items': len(self.disk), 'bytes': self.disk.bytes,
+                           'max_bytes': self.disk.max_bytes, 'evictions': self.disk.evictions},
+        }
+
+    def prometheus(self) -> str:
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP usatex_server_{name} {help_text}")
+            lines.append(f"# TYPE usatex_server_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"usatex_server_{name}{{{label_text}}} {value}" if label_text
+                             else f"usatex_server_{name} {value}")
+
+        def histogram(name, help_text, histograms):
+            lines.append(f"# HELP usatex_server_{name} {help_text}")
+            lines.append(f"# TYPE usatex_server_{name} histogram")
+            for labels, hist in histograms:
+                for limit, n in list(zip(hist.buckets, hist.counts)) + [('+Inf', hist.count)]:
+                    label_text = ','.join(f'{k}="{v}"' for k, v in dict(labels, le=limit).items())
+                    lines.append(f"usatex_server_{name}_bucket{{{label_text}}} {n}")
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                suffix = f"{{{label_text}}}" if label_text else ''
+                lines.append(f"usatex_server_{name}_sum{suffix} {hist.sum:.6f}")
+                lines.append(f"usatex_server_{name}_count{suffix} {hist.count}")
+
+        metric('requests_total', 'counter', 'Requisições por resultado',
+               [({'outcome': k}, v) for k, v in self.counts.items()])
+        histogram('request_seconds', 'Latência das respostas por resultado',
+                  [({'outcome': k}, h) for k, h in self.latency.items()])
+        histogram('render_seconds', 'Tempo de renderização das variantes (misses)',
+                  [({}, self.render_seconds)])
+        metric('bytes_sent_total', 'counter', 'Bytes de corpo enviados', [({}, self.bytes_sent)])
+        metric('inflight_renders', 'gauge', 'Variantes em renderização', [({}, len(self.inflight))])
+        for cache, label in ((self.memory, 'memory'), (self.disk, 'disk')):
+            metric(f'{label}_cache_bytes', 'gauge', f'Bytes no cache ({label})', [({}, cache.bytes)])
+            metric(f'{label}_cache_items', 'gauge', f'Variantes no cache ({label})', [({}, len(cache))])
+            metric(f'{label}_cache_evictions_total', 'counter', f'Despejos do cache ({label})',
+                   [({}, cache.evictions)])
+        return '\n'.join(lines) + '\n'
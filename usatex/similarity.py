@@ -0,0 +1,190 @@
+"""
+Índice de similaridade de cores das estampas
+Histograma HSV quantizado e paleta das k cores dominantes (em Lab) por
+imagem, em matrizes NumPy: estampas parecidas, estampas perto de uma cor e
+vizinhos pré-calculados para o site estático
+"""
+
+import base64
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from usatex.render import fit_size
+
+# Baldes do histograma: matiz x saturação x valor para pixels coloridos e
+# baldes só de valor para os quase cinzas (matiz instável sem saturação)
+DEFAULT_BINS = (12, 2, 3, 4)
+# Saturação (0-255) abaixo da qual o pixel conta como cinza
+GRAY_SATURATION = 40
+DEFAULT_COLORS = 5
+DEFAULT_SAMPLE = 64
+# Escala (ΔE) da proximidade de uma cor da paleta à cor pedida
+COLOR_SIGMA = 15.0
+# Linhas por bloco no cálculo de todos os vizinhos (memória: bloco x N floats)
+NEIGHBOUR_CHUNK = 1024
+
+# sRGB (0-255) -> linear, como tabela
+_SRGB_TO_LINEAR = np.where(np.arange(256) / 255 <= 0.04045, np.arange(256) / 255 / 12.92,
+                           ((np.arange(256) / 255 + 0.055) / 1.055) ** 2.4)
+_RGB_TO_XYZ = np.array([[0.4124, 0.3576, 0.1805],
+                        [0.2126, 0.7152, 0.0722],
+                        [0.0193, 0.1192, 0.9505]])
+_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """Cores sRGB (..., 3) uint8 para CIELAB (D65), onde distância euclidiana ≈ diferença percebida"""
+    xyz = _SRGB_TO_LINEAR[rgb] @ _RGB_TO_XYZ.T / _WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]),
+                     200 * (f[..., 1] - f[..., 2])], axis=-1).astype(np.float32)
+
+
+def parse_hex(color: str) -> Tuple[int, int, int]:
+    """'#c0392b', 'c0392b' ou '#c32' para (r, g, b)"""
+    text = color.strip().lstrip('#')
+    if len(text) == 3:
+        text = ''.join(ch * 2 for ch in text)
+    if len(text) != 6:
+        raise ValueError(f"cor inválida: {color!r} (use #rrggbb)")
+    return tuple(int(text[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def hsv_histogram(img: Image.Image, bins=DEFAULT_BINS) -> np.ndarray:
+    """Histograma HSV normalizado (soma 1) de uma imagem RGB pequena"""
+    hue_bins, sat_bins, val_bins, gray_bins = bins
+    hsv = np.asarray(img.convert('HSV')).reshape(-1, 3).astype(np.int32)
+    h, s, v = hsv[:, 0], hsv[:, 1], hsv[:, 2]
+    gray = s < GRAY_SATURATION
+    chroma_s = (s - GRAY_SATURATION) * sat_bins // (256 - GRAY_SATURATION)
+    colored = (h * hue_bins // 256) * sat_bins * val_bins + chroma_s * val_bins + v * val_bins // 256
+    index = np.where(gray, hue_bins * sat_bins * val_bins + v * gray_bins // 256, colored)
+    counts = np.bincount(index, minlength=hue_bins * sat_bins * val_bins + gray_bins)
+    return (counts / counts.sum()).astype(np.float32)
+
+
+def palette(img: Image.Image, colors: int = DEFAULT_COLORS) -> List[Tuple[str, float]]:
+    """As `colors` cores dominantes (median cut) com a fração da imagem de cada uma"""
+    quantized = img.quantize(colors, method=Image.Quantize.MEDIANCUT)
+    rgb = quantized.getpalette()
+    found = sorted(quantized.getcolors(), reverse=True)
+    total = sum(count for count, _ in found)
+    return [("#{:02x}{:02x}{:02x}".format(*rgb[index * 3:index * 3 + 3]), round(count / total, 4))
+            for count, index in found]
+
+
+def color_features(img: Image.Image, settings: dict) -> dict:
+    """
+    Características de cor de uma imagem já renderizada: histograma HSV
+    (float32 em base64) e paleta [[#rrggbb, fração], ...]
+    """
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    size = settings['amostra']
+    sample = img.resize(fit_size(img.size, (size, size)), Image.Resampling.BOX)
+    hist = hsv_histogram(sample, tuple(settings['baldes']))
+    return {'hist': base64.b64encode(hist.tobytes()).decode('ascii'),
+            'cores': [list(entry) for entry in palette(sample, settings['cores'])]}
+
+
+class SimilarityIndex:
+    """
+    Matrizes compactas do acervo: raiz do histograma (N x baldes, norma 1:
+    o produto escalar é o coeficiente de Bhattacharyya), paleta em Lab e
+    frações (N x k). Consultas são uma multiplicação matriz-vetor.
+    """
+
+    def __init__(self, names: List[str], roots: np.ndarray, lab: np.ndarray,
+                 weights: np.ndarray, hexes: np.ndarray):
+        self.names = list(names)
+        self.roots = roots
+        self.lab = lab
+        self.weights = weights
+        self.hexes = hexes
+        self.positions = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def build(cls, features: Dict[str, dict], colors: int = DEFAULT_COLORS) -> 'SimilarityIndex':
+        """Índice a partir das características por nome ({'hist', 'cores'})"""
+        names = sorted(features)
+        roots = [np.sqrt(np.frombuffer(base64.b64decode(features[n]['hist']), dtype=np.float32))
+                 for n in names]
+        roots = np.vstack(roots) if roots else np.zeros((0, 0), dtype=np.float32)
+        rgb = np.zeros((len(names), colors, 3), dtype=np.uint8)
+        weights = np.zeros((len(names), colors), dtype=np.float32)
+        hexes = np.full((len(names), colors), '', dtype='<U7')
+        for i, name in enumerate(names):
+            for j, (hex_color, weight) in enumerate(features[name]['cores'][:colors]):
+                rgb[i, j] = parse_hex(hex_color)
+                weights[i, j] = weight
+                hexes[i, j] = hex_color
+        return cls(names, roots, rgb_to_lab(rgb), weights, hexes)
+
+    @classmethod
+    def load(cls, path: Path) -> 'SimilarityIndex':
+        with np.load(path) as data:
+            return cls(data['names'].tolist(), data['roots'], data['lab'], data['weights'],
+                       data['hexes'])
+
+    def save(self, path: Path):
+        """Grava o índice (.npz) de forma atômica"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp.npz')
+        np.savez(tmp_path, names=np.array(self.names), roots=self.roots, lab=self.lab,
+                 weights=self.weights, hexes=self.hexes)
+        os.replace(tmp_path, path)
+
+    def palette_of(self, name: str) -> List[str]:
+        row = self.positions[name]
+        return [h for h, w in zip(self.hexes[row], self.weights[row]) if h and w > 0]
+
+    def _top(self, scores: np.ndarray, top: int, exclude: Optional[int] = None):
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        top = min(top, len(scores) - (exclude is not None))
+        if top <= 0:
+            return []
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(self.names[i], round(float(scores[i]), 4)) for i in best]
+
+    def similar(self, name: str, top: int = 12) -> List[Tuple[str, float]]:
+        """As `top` estampas de histograma mais parecido (1 = mesma distribuição de cores)"""
+        row = self.positions[name]
+        return self._top(self.roots @ self.roots[row], top, exclude=row)
+
+    def near_color(self, color: str, top: int = 12) -> List[Tuple[str, float]]:
+        """
+        Estampas com muito da cor pedida: soma, na paleta, da fração de
+        cada cor ponderada pela proximidade (ΔE) à cor pedida
+        """
+        target = rgb_to_lab(np.array(parse_hex(color), dtype=np.uint8))
+        distance = np.linalg.norm(self.lab - target, axis=2)
+        scores = (self.weights * np.exp(-(distance / COLOR_SIGMA) ** 2)).sum(axis=1)
+        return self._top(scores, top)
+
+    def neighbours(self, top: int = 12, chunk: int = NEIGHBOUR_CHUNK) -> Dict[str, List[list]]:
+        """Vizinhos de todas as estampas, em blocos de linhas (memória limitada a chunk x N)"""
+        result = {}
+        top = min(top, len(self) - 1)
+        if top <= 0:
+            return {name: [] for name in self.names}
+        for start in range(0, len(self), chunk):
+            scores = self.roots[start:start + chunk] @ self.roots.T
+            rows = np.arange(scores.shape[0])
+            scores[rows, start + rows] = -np.inf
+            best = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            order = np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1, kind='stable')
+            best = np.take_along_axis(best, order, axis=1)
+            for row, columns in enumerate(best):
+                result[self.names[start + row]] = [
+                    [self.names[col], round(float(scores[row, col]), 3)] for col in columns]
+        return result
@@ -0,0 +1,225 @@
+"""
+Gerações das saídas publicadas
+Um build completo é gerado em um diretório de preparo (staging) e só no fim
+substitui o que está publicado; a geração anterior fica guardada para
+rollback imediato
+"""
+
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+SWAP_MODES = ('rename', 'symlink')
+CURRENT = 'atual'  # Link, dentro de `generations`, para a geração publicada
+
+
+def symlinks_supported(folder: Path) -> bool:
+    """Se dá para criar links simbólicos em `folder` (no Windows exige permissão)"""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    probe = folder / '.teste-symlink'
+    try:
+        probe.unlink(missing_ok=True)
+        os.symlink('.', probe)
+        return True
+    except (OSError, NotImplementedError):
+        return False
+    finally:
+        try:
+            probe.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+class Generations:
+    """
+    Troca as entradas publicadas ({nome na geração: caminho publicado}, ex.:
+    'assets/thumb' -> static/assets/thumb, 'listaImages.json' -> listaImages.json)
+    pelas de uma geração nova. `state` são arquivos internos da geração
+    (manifesto, catálogo) que não são servidos: ficam como arquivos comuns,
+    copiados para dentro e para fora da geração a cada troca.
+
+    rename (padrão): cada entrada vai para `previous` e a nova entra no
+    lugar, uma por uma (dois renames no mesmo disco, sem cópia). Pastas e
+    JSONs publicados continuam arquivos comuns (versionáveis, servidos por
+    qualquer coisa); entre os dois renames o caminho não existe, e pastas e
+    JSONs ficam por um instante de gerações diferentes.
+
+    symlink: cada entrada publicada é um link fixo para
+    `generations/atual/<nome>`, e `atual` é um link para a geração. Publicar
+    é um único os.replace de `atual`: pastas e JSONs mudam juntos, atômico.
+    Os links só valem nesta máquina (não vão para o git nem para um clone).
+    """
+
+    def __init__(self, entries: Dict[str, Path], previous: Path, generations: Path,
+                 mode: str = 'rename', state: Optional[Dict[str, Path]] = None):
+        if mode not in SWAP_MODES:
+            raise ValueError(f"modo de troca desconhecido: {mode}")
+        self.entries = {name: Path(live) for name, live in entries.items()}
+        self.state = {name: Path(live) for name, live in (state or {}).items()}
+        self.previous = Path(previous)
+        self.generations = Path(generations)
+        self.mode = mode
+
+    def promote(self, staging: Path) -> Optional[Path]:
+        """Publica as entradas de `staging`; retorna onde ficou a geração anterior"""
+        staging = Path(staging)
+        if self.mode == 'rename':
+            self._swap(staging)
+            return self.previous
+
+        generation = self._new_generation()
+        os.rename(staging, generation)
+        old = self._adopt_live()
+        if old is not None:
+            # Etapas que não rodaram neste build (ex.: atlas): a geração nova herda as publicadas
+            for name in self.entries:
+                if not (generation / name).exists() and (old / name).exists():
+                    self._copy(old / name, generation / name)
+        self._flip(generation, old)
+        self._prune(keep={generation, old})
+        return old
+
+    def rollback(self) -> Optional[Path]:
+        """Volta para a geração anterior (que passa a ser a atual); None se não houver"""
+        if self.mode == 'rename':
+            if not self.previous.is_dir():
+                return None
+            self._swap(self.previous)
+            return self.previous
+        current = self.current()
+        others = [g for g in self._list() if g != current]
+        if not others:
+            return None
+        self._flip(others[-1], current)
+        return others[-1]
+
+    def current(self) -> Optional[Path]:
+        """Geração para a qual `atual` aponta (modo symlink)"""
+        link = self.generations / CURRENT
+        if not link.is_symlink():
+            return None
+        return self.generations / os.readlink(link)
+
+    def _swap(self, source: Path):
+        """Modo rename: publicado -> previous, source -> publicado"""
+        saved_root = self.previous.with_name(self.previous.name + '.tmp')
+        shutil.rmtree(saved_root, ignore_errors=True)
+        saved_root.mkdir(parents=True)
+        for name, live in {**self.entries, **self.state}.items():
+            new = source / name
+            if not new.exists():
+                continue  # Etapa que não rodou neste build (ex.: atlas): fica a publicada
+            saved = saved_root / name
+            saved.parent.mkdir(parents=True, exist_ok=True)
+            live.parent.mkdir(parents=True, exist_ok=True)
+            if live.is_symlink() and new.is_dir():
+                # Vindo do modo symlink: o link sai e a pasta da geração vira a anterior
+                target = live.resolve()
+                live.unlink()
+                if target.is_dir():
+                    os.rename(target, saved)
+            if new.is_dir():
+                if live.exists():
+                    os.rename(live, saved)
+                os.rename(new, live)
+            else:
+                if live.exists():
+                    shutil.copy2(live, saved)
+                os.replace(new, live)
+        # Sobras do staging (ou da geração anterior já trocada) saem; a salva vira a anterior
+        shutil.rmtree(source, ignore_errors=True)
+        shutil.rmtree(self.previous, ignore_errors=True)
+        os.rename(saved_root, self.previous)
+
+    def _adopt_live(self) -> Optional[Path]:
+        """
+        Modo symlink: entradas publicadas que ainda são pastas/arquivos comuns
+        (primeira troca, build sem --staging, --clean) entram na geração atual (ou numa
+        geração 'inicial') e viram links via `atual`. Retorna a geração atual.
+        """
+        current = self.current()
+        for name, live in self.entries.items():
+            if live.is_symlink() or not live.exists():
+                continue
+            current = current or self._new_generation('inicial')
+            target = current / name
+            if target.is_dir() and not target.is_symlink():
+                shutil.rmtree(target)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(live, target)
+            self._point_current(current)
+            self._link(live, name)
+        return current
+
+    def _flip(self, generation: Path, old: Optional[Path]):
+        """Modo symlink: estado interno para a geração nova e troca atômica de `atual`"""
+        for name, live in self.state.items():
+            if old is not None and live.exists():
+                self._copy(live, old / name)  # O publicado é o estado mais recente da antiga
+            if (generation / name).exists():
+                self._copy(generation / name, live)
+        for name, live in self.entries.items():
+            # Links fixos via `atual`: criados uma vez, antes da troca
+            if (generation / name).exists() and not (
+                    live.is_symlink() and os.readlink(live) == self._link_target(live, name)):
+                self._link(live, name)
+        self._point_current(generation)
+        for name, live in self.entries.items():
+            if live.is_symlink() and not (generation / name).exists():
+                live.unlink()  # A geração publicada não tem essa entrada (ex.: sem atlas)
+
+    def _point_current(self, generation: Path):
+        link = self.generations / CURRENT
+        tmp_link = link.with_name(f".{CURRENT}.tmp")
+        tmp_link.unlink(missing_ok=True)
+        os.symlink(generation.name, tmp_link)
+        os.replace(tmp_link, link)
+
+    def _link_target(self, live: Path, name: str) -> str:
+        return os.path.relpath(self.generations / CURRENT / name, live.parent)
+
+    def _link(self, live: Path, name: str):
+        live.parent.mkdir(parents=True, exist_ok=True)
+        tmp_link = live.with_name(f".{live.name}.tmp")
+        tmp_link.unlink(missing_ok=True)
+        os.symlink(self._link_target(live, name), tmp_link)
+        os.replace(tmp_link, live)
+
+    @staticmethod
+    def _copy(source: Path, target: Path):
+        """Cópia que só aparece no destino completa (arquivo) ou pasta copiada inteira"""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if source.is_dir():
+            shutil.rmtree(target, ignore_errors=True)
+            shutil.copytree(source, target)
+            return
+        tmp_file = target.with_name(f".{target.name}.tmp")
+        shutil.copy2(source, tmp_file)
+        os.replace(tmp_file, target)
+
+    def _list(self):
+        if not self.generations.is_dir():
+            return []
+        return sorted((p for p in self.generations.iterdir() if p.is_dir() and not p.is_symlink()),
+                      key=lambda p: p.stat().st_mtime)
+
+    def _new_generation(self, label: Optional[str] = None) -> Path:
+        self.generations.mkdir(parents=True, exist_ok=True)
+        name = label or time.strftime('%Y%m%d-%H%M%S')
+        path, n = self.generations / name, 1
+        while path.exists():
+            n += 1
+            path = self.generations / f"{name}-{n}"
+        if label:
+            path.mkdir()
+        return path
+
+    def _prune(self, keep):
+        """Só a geração atual e a anterior ficam guardadas"""
+        keep = {Path(p) for p in keep if p is not None}
+        for generation in self._list():
+            if generation not in keep:
+                shutil.rmtree(generation, ignore_errors=True)
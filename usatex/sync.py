@@ -0,0 +1,277 @@
+"""
+Sincronização incremental das saídas com um bucket S3 (AWS, MinIO, R2...)
+Só sobe o que mudou (ETag remoto x MD5 local), em paralelo sobre um pool de
+conexões, com limite de banda e remoção opcional dos órfãos
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from usatex.cachebust import logical_name
+
+# Partes do upload multipart; o ETag local é calculado com o mesmo tamanho
+DEFAULT_PART_SIZE = 8 * 1024 ** 2
+DEFAULT_SYNC_JOBS = 8
+# delete_objects aceita no máximo 1000 chaves por pedido
+DELETE_BATCH = 1000
+
+# Nomes com hash mudam a cada conteúdo: podem ficar em cache para sempre
+CACHE_IMMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_DEFAULT = 'public, max-age=3600'
+CACHE_JSON = 'no-cache'
+_CONTENT_TYPES = {'.avif': 'image/avif', '.webp': 'image/webp', '.json': 'application/json'}
+
+
+def parse_target(target: str) -> Tuple[str, str]:
+    """'s3://bucket/pasta/' ou 'bucket/pasta' para (bucket, prefixo com / no fim ou vazio)"""
+    bucket, _, prefix = target.removeprefix('s3://').partition('/')
+    if not bucket:
+        raise ValueError(f"destino inválido: {target!r} (use s3://bucket/prefixo)")
+    prefix = prefix.strip('/')
+    return bucket, f"{prefix}/" if prefix else ''
+
+
+def local_etag(path: Path, part_size: int = DEFAULT_PART_SIZE) -> str:
+    """
+    ETag que o S3 dá ao arquivo subido por upload_file com este part_size:
+    MD5 do conteúdo ou, em multipart, MD5 dos MD5 das partes + "-N"
+    """
+    parts = []
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(part_size), b''):
+            parts.append(hashlib.md5(chunk).digest())
+    if len(parts) <= 1:
+        return parts[0].hex() if parts else hashlib.md5(b'').hexdigest()
+    return f"{hashlib.md5(b''.join(parts)).hexdigest()}-{len(parts)}"
+
+
+def object_headers(key: str) -> dict:
+    """Content-Type e Cache-Control de cada objeto"""
+    name = key.rsplit('/', 1)[-1]
+    suffix = os.path.splitext(name)[1].lower()
+    content_type = (_CONTENT_TYPES.get(suffix) or mimetypes.guess_type(name)[0]
+                    or 'application/octet-stream')
+    if suffix == '.json':
+        cache = CACHE_JSON
+    elif logical_name(name) != name:
+        cache = CACHE_IMMUTABLE
+    else:
+        cache = CACHE_DEFAULT
+    return {'ContentType': content_type, 'CacheControl': cache}
+
+
+class RateLimiter:
+    """
+    Balde de fichas compartilhado pelos uploads: `consume(n)` dorme o
+    necessário para a taxa média ficar em `rate` bytes/s. Usado como
+    Callback do boto3, chamado a cada bloco enviado.
+    """
+
+    def __init__(self, rate: int, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def __call__(self, size: int):
+        self.consume(size)
+
+    def consume(self, size: int):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= size
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class SyncState:
+    """
+    ETags locais da última sincronização ({chave: tamanho, mtime, etag}),
+    em .usatex/sync.json: só arquivos novos ou com tamanho/mtime diferentes
+    são relidos para o MD5
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.entries: Dict[str, dict] = {}
+        self.hashed = 0
+
+    def load(self) -> 'SyncState':
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+        return self
+
+    def etag(self, key: str, path: Path, part_size: int) -> str:
+        stat = path.stat()
+        entry = self.entries.get(key)
+        if (entry and (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns)
+                and entry.get('part_size') == part_size):
+            return entry['etag']
+        etag = local_etag(path, part_size)
+        self.hashed += 1
+        self.entries[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                             'part_size': part_size, 'etag': etag}
+        return etag
+
+    def save(self, keys: Iterable[str]):
+        """Grava só as chaves ainda presentes"""
+        keys = set(keys)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({key: entry for key, entry in self.entries.items() if key in keys}, f,
+                      separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+
+def collect_files(folders: Iterable[Path], root: Path, files: Iterable[Path],
+                  prefix: str = '') -> Dict[str, Path]:
+    """
+    Chaves do bucket dos arquivos locais: pastas de saída relativas a `root`
+    (static/assets/thumb/x.jpg -> assets/thumb/x.jpg) e arquivos soltos pelo nome
+    """
+    found = {}
+    for folder in folders:
+        for dirpath, _, filenames in os.walk(folder):
+            for filename in filenames:
+                if filename.startswith('.'):
+                    continue  # temporários de escrita atômica
+                path = Path(dirpath) / filename
+                found[prefix + path.relative_to(root).as_posix()] = path
+    for path in files:
+        if Path(path).is_file():
+            found[prefix + Path(path).name] = Path(path)
+    return found
+
+
+class S3Sync:
+    """
+    Sincroniza um conjunto {chave: arquivo} com um bucket. Sobe em paralelo
+    (`jobs` threads sobre um pool de `jobs` conexões do botocore), primeiro as
+    imagens e por último os JSONs, para o site nunca apontar para um objeto
+    que ainda não chegou; os órfãos são removidos só no fim.
+    """
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, jobs: int = DEFAULT_SYNC_JOBS,
+                 rate: Optional[int] = None, part_size: int = DEFAULT_PART_SIZE,
+                 client=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.jobs = max(1, jobs)
+        self.part_size = part_size
+        self.limiter = RateLimiter(rate) if rate else None
+        self.client = client or self._client(endpoint_url, region)
+
+    def _client(self, endpoint_url: Optional[str], region: Optional[str]):
+        # Import tardio: boto3 só é exigido por quem sincroniza
+        import boto3
+        from botocore.config import Config
+
+        config = Config(max_pool_connections=self.jobs, retries={'mode': 'standard'})
+        return boto3.session.Session().client('s3', endpoint_url=endpoint_url,
+                                              region_name=region, config=config)
+
+    def remote(self, scopes: Iterable[str]) -> Dict[str, str]:
+        """ETags dos objetos sob cada escopo (prefixo de chave), sem aspas"""
+        found = {}
+        paginator = self.client.get_paginator('list_objects_v2')
+        for scope in scopes:
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=scope):
+                for item in page.get('Contents', []):
+                    found[item['Key']] = item['ETag'].strip('"')
+        return found
+
+    def plan(self, local: Dict[str, Path], state: SyncState,
+             remote: Dict[str, str]) -> Tuple[List[str], List[str], int]:
+        """(chaves a subir, órfãs no bucket, inalteradas)"""
+        uploads = [key for key in sorted(local)
+                   if remote.get(key) != state.etag(key, local[key], self.part_size)]
+        orphans = sorted(remote.keys() - local.keys())
+        return uploads, orphans, len(local) - len(uploads)
+
+    def upload(self, key: str, path: Path) -> int:
+        from boto3.s3.transfer import TransferConfig
+
+        # Uma thread por arquivo: o paralelismo é entre arquivos, não entre partes
+        config = TransferConfig(multipart_threshold=self.part_size,
+                                multipart_chunksize=self.part_size, use_threads=False)
+        self.client.upload_file(str(path), self.bucket, key, ExtraArgs=object_headers(key),
+                                Config=config, Callback=self.limiter)
+        return path.stat().st_size
+
+    def delete(self, keys: List[str]) -> List[Tuple[str, str]]:
+        """Remove as chaves em lotes; retorna [(chave, erro)]"""
+        failed = []
+        for start in range(0, len(keys), DELETE_BATCH):
+            batch = keys[start:start + DELETE_BATCH]
+            response = self.client.delete_objects(
+                Bucket=self.bucket, Delete={'Objects': [{'Key': k} for k in batch], 'Quiet': True})
+            failed += [(error['Key'], error.get('Message', error.get('Code', '')))
+                       for error in response.get('Errors', [])]
+        return failed
+
+    def run(self, local: Dict[str, Path], state: SyncState, scopes: Iterable[str],
+            delete: bool = False, dry_run: bool = False) -> dict:
+        """
+        Compara, sobe o que mudou e (com `delete`) remove os órfãos dentro
+        dos escopos. Retorna um relatório com contagens, bytes, erros e tempos.
+        """
+        started = time.perf_counter()
+        remote = self.remote(scopes)
+        uploads, orphans, unchanged = self.plan(local, state, remote)
+        report = {'local': len(local), 'remote': len(remote), 'unchanged': unchanged,
+                  'uploads': len(uploads), 'orphans': len(orphans), 'hashed': state.hashed,
+                  'uploaded': 0, 'bytes': 0, 'deleted': 0, 'failed': [], 'skipped': [],
+                  'plan_seconds': round(time.perf_counter() - started, 3)}
+        if dry_run:
+            report['pending'] = uploads
+            report['orphan_keys'] = orphans
+            return report
+
+        transfer_started = time.perf_counter()
+        # JSONs por último: referenciam as imagens
+        assets = [key for key in uploads if not key.endswith('.json')]
+        manifests = [key for key in uploads if key.endswith('.json')]
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            for batch in (assets, manifests):
+                if batch is manifests and report['failed']:
+                    # Imagem faltando no bucket: os JSONs publicados continuam os antigos
+                    report['skipped'] = manifests
+                    for key in manifests:
+                        state.entries.pop(key, None)
+                    break
+                futures = {pool.submit(self.upload, key, local[key]): key for key in batch}
+                for future in as_completed(futures):
+                    try:
+                        report['bytes'] += future.result()
+                        report['uploaded'] += 1
+                    except Exception as e:
+                        report['failed'].append((futures[future], f"{type(e).__name__}: {e}"))
+                        # Sem o ETag em cache, a próxima execução compara de novo
+                        state.entries.pop(futures[future], None)
+        transfer = time.perf_counter() - transfer_started
+
+        if delete and orphans and not report['failed']:
+            errors = self.delete(orphans)
+            report['deleted'] = len(orphans) - len(errors)
+            report['failed'] += errors
+        state.save(local)
+        report['transfer_seconds'] = round(transfer, 3)
+        report['throughput'] = report['bytes'] / transfer if transfer > 0 else 0.0
+        report['seconds'] = round(time.perf_counter() - started, 3)
+        return report
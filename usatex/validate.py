@@ -0,0 +1,158 @@
+"""
+Validação de imagens em níveis
+header (cabeçalho + fim do arquivo), verify (estrutura) e decode (decodificação completa)
+"""
+
+import os
+import struct
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+from usatex.manifest import hash_file
+from usatex.parallel import run_tasks
+
+# Níveis em ordem crescente de custo; um nível aprovado implica os anteriores
+LEVELS = ('header', 'verify', 'decode')
+TAIL_BYTES = 64
+
+
+def _jpeg_has_eoi(data: bytes) -> bool:
+    """Percorre os segmentos do JPEG até o EOI (dados depois dele, como trailers de câmera, são aceitos)"""
+    pos, size = 2, len(data)
+    while pos + 2 <= size:
+        if data[pos] != 0xFF:
+            return False
+        marker = data[pos + 1]
+        if marker == 0xFF:  # Preenchimento
+            pos += 1
+            continue
+        if marker == 0xD9:
+            return True
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:  # Marcadores sem tamanho
+            pos += 2
+            continue
+        if pos + 4 > size:
+            return False
+        pos += 2 + int.from_bytes(data[pos + 2:pos + 4], 'big')
+        if marker == 0xDA:
+            # Dados de entropia: o próximo FF que não seja FF00, RSTn ou preenchimento é um marcador
+            while True:
+                pos = data.find(b'\xff', pos)
+                if pos < 0 or pos + 1 >= size:
+                    return False
+                following = data[pos + 1]
+                if following == 0xFF:
+                    pos += 1
+                elif following == 0x00 or 0xD0 <= following <= 0xD7:
+                    pos += 2
+                else:
+                    break
+    return False
+
+
+def _png_has_iend(f, size: int) -> bool:
+    """Pula de bloco em bloco pelos tamanhos declarados até o IEND"""
+    pos = 8
+    while pos + 8 <= size:
+        f.seek(pos)
+        length, kind = struct.unpack('>I4s', f.read(8))
+        if kind == b'IEND':
+            return True
+        pos += 12 + length
+    return False
+
+
+def check_tail(path: Path, fmt: Optional[str]) -> Optional[str]:
+    """
+    Confere se o arquivo termina onde o formato diz que termina (pega cópias
+    e uploads interrompidos). Retorna a mensagem de erro ou None. Só os
+    últimos bytes são lidos; se o final não bater (dados anexados depois do
+    fim, ou truncado), JPEG e PNG são percorridos pela estrutura para decidir.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        if fmt == 'WEBP':
+            riff = f.read(8)
+            declared = struct.unpack('<I', riff[4:8])[0] + 8 if len(riff) == 8 else 0
+            if declared > size:
+                return f"arquivo truncado: RIFF declara {declared} bytes, há {size}"
+            return None
+        f.seek(max(0, size - TAIL_BYTES))
+        tail = f.read().rstrip(b'\0\r\n ')
+        if fmt == 'JPEG' and not tail.endswith(b'\xff\xd9'):
+            f.seek(0)
+            if not _jpeg_has_eoi(f.read()):
+                return "arquivo truncado: JPEG sem o marcador final (EOI)"
+        if fmt == 'PNG' and b'IEND' not in tail and not _png_has_iend(f, size):
+            return "arquivo truncado: PNG sem o bloco IEND"
+
+    if fmt == 'GIF' and not tail.endswith(b';'):
+        return "arquivo truncado: GIF sem o terminador"
+    return None
+
+
+def validate_image(task: dict) -> dict:
+    """
+    Valida uma fonte até o nível pedido (roda em processo de trabalho).
+    Retorna fatos do cabeçalho, hash, nível atingido e o erro (None se válida).
+    O nível header não lê o arquivo inteiro: o hash (sha256 None) fica para os outros.
+    """
+    path = Path(task['source'])
+    level = LEVELS.index(task['level'])
+    sha256 = hash_file(path) if level >= LEVELS.index('verify') else None
+    result = {'sha256': sha256, 'facts': {}, 'level': level, 'error': None}
+    try:
+        with Image.open(path) as img:
+            result['facts'] = {'width': img.width, 'height': img.height,
+                               'mode': img.mode, 'format': img.format}
+            error = check_tail(path, img.format)
+            if error:
+                raise ValueError(error)
+            if level >= LEVELS.index('verify'):
+                img.verify()
+        if level >= LEVELS.index('decode'):
+            # verify() inutiliza a imagem: decodificar de novo, por completo
+            with Image.open(path) as img:
+                img.load()
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def validate_files(catalog, files: List[Path], level: str = 'verify',
+                   jobs: int = 1, stat_of: Optional[Callable[[Path], os.stat_result]] = None
+                   ) -> Iterator[Tuple[Path, Optional[str], bool]]:
+    """
+    Valida os arquivos, reaproveitando o índice do catálogo: fontes inalteradas
+    (tamanho/mtime, ou mesmo conteúdo) já validadas neste nível ou acima não são
+    reabertas. `stat_of` fornece o stat já conhecido (inventário); sem ele,
+    cada arquivo é consultado no disco. Gera (arquivo, erro ou None, veio do cache).
+    """
+    stat_of = stat_of or Path.stat
+    wanted = LEVELS.index(level)
+    pending = []
+    for file_path in files:
+        stat = stat_of(file_path)
+        row = catalog.lookup_content(file_path, stat)
+        # Uma falha vale para qualquer nível; um sucesso só para níveis até o validado
+        if row and row['valid'] is not None and (row['valid'] == 0 or
+                                                 (row['validated_level'] or 0) >= wanted):
+            yield file_path, row['error'] if row['valid'] == 0 else None, True
+            continue
+        pending.append({'source': str(file_path), 'level': level})
+
+    for task, result, error in run_tasks(validate_image, pending, jobs):
+        file_path = Path(task['source'])
+        stat = stat_of(file_path)
+        if error:
+            catalog.update(file_path, stat, valid=0, error=error)
+            yield file_path, error, False
+            continue
+        valid = result['error'] is None
+        hashed = {'sha256': result['sha256']} if result['sha256'] else {}
+        catalog.update(file_path, stat, valid=int(valid), error=result['error'],
+                       validated_level=result['level'], **hashed, **result['facts'])
+        yield file_path, result['error'], False
+    catalog.commit()
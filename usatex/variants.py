@@ -0,0 +1,47 @@
+"""
+Variantes de thumbs e modelos: formatos modernos (WebP/AVIF) e escada de resoluções
+Cada variante fica em uma subpasta: thumb/webp/<nome>.webp, modelos/512/<nome>
+"""
+
+from pathlib import Path
+from typing import Dict, List
+
+# Extensão -> formato do Pillow, na ordem de preferência do front-end
+VARIANT_FORMATS = {'avif': 'AVIF', 'webp': 'WEBP'}
+
+# AVIF comprime mais, mas codifica ~100x mais devagar que JPEG: só quando pedido
+DEFAULT_VARIANTS = ['webp']
+
+# Degraus menores que o modelo (lado máximo em px) para carregamento responsivo
+DEFAULT_LADDER = [256, 512, 768]
+
+
+def variant_path(output: Path, ext: str) -> Path:
+    """Caminho da variante `ext` de uma saída JPEG (mesmo nome, sem colidir com .webp de origem)"""
+    output = Path(output)
+    return output.parent / ext / f"{output.name}.{ext}"
+
+
+def ladder_path(modelo: Path, step: int) -> Path:
+    """Caminho do degrau `step` da escada de um modelo"""
+    modelo = Path(modelo)
+    return modelo.parent / str(step) / modelo.name
+
+
+def variant_url_patterns(formats: List[str]) -> Dict[str, str]:
+    """Modelo de caminho relativo à pasta da saída, por formato ({nome} = item de `imagens`)"""
+    patterns = {'jpeg': '{nome}'}
+    for ext in formats:
+        patterns[ext] = f"{ext}/{{nome}}.{ext}"
+    return patterns
+
+
+def available_variants() -> List[str]:
+    """Formatos de VARIANT_FORMATS que o Pillow instalado consegue gravar"""
+    from PIL import Image
+    try:
+        import pillow_avif  # noqa: F401  (plugin para Pillow < 11.2)
+    except ImportError:
+        pass
+    Image.init()
+    return [ext for ext, fmt in VARIANT_FORMATS.items() if fmt in Image.SAVE]
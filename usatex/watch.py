@@ -0,0 +1,142 @@
+"""
+Observação das pastas de fontes
+inotify (Linux, via ctypes) com varredura periódica como alternativa, e
+agrupamento de rajadas de eventos em lotes (debounce)
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# Máscaras do inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Arquivos criados vazios são escritos depois: o fim da escrita (CLOSE_WRITE) é que conta
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Eventos de arquivo via inotify (sem dependências externas)"""
+
+    name = 'inotify'
+
+    def __init__(self, folders: List[Path]):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        self.folders: Dict[int, Path] = {}
+        for folder in folders:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(str(folder)), WATCH_MASK)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch falhou em {folder}")
+            self.folders[wd] = Path(folder)
+
+    def poll(self, timeout: Optional[float]) -> Set[Path]:
+        """Caminhos alterados; espera até `timeout` segundos pelo primeiro evento"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & (IN_ISDIR | IN_IGNORED) or not name or wd not in self.folders:
+                    continue
+                changed.add(self.folders[wd] / os.fsdecode(name))
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Alternativa portátil: compara tamanho/mtime das pastas a cada intervalo"""
+
+    name = 'varredura'
+
+    def __init__(self, folders: List[Path], interval: float = 0.5):
+        self.folders = [Path(f) for f in folders]
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        for folder in self.folders:
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            snapshot[folder / entry.name] = (stat.st_size, stat.st_mtime_ns)
+            except FileNotFoundError:
+                continue
+        return snapshot
+
+    def poll(self, timeout: Optional[float]) -> Set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {path for path in current.keys() | self.snapshot.keys()
+                       if current.get(path) != self.snapshot.get(path)}
+            self.snapshot = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            wait = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            time.sleep(max(wait, 0))
+
+    def close(self):
+        pass
+
+
+def open_watcher(folders: List[Path], polling: bool = False):
+    """inotify quando disponível; senão varredura periódica"""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(folders)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(folders)
+
+
+def debounced_batches(watcher, window: float = 0.25) -> Iterator[Set[Path]]:
+    """
+    Agrupa rajadas de eventos: um lote sai quando passam `window` segundos sem
+    novos eventos (copiar 50 arquivos gera um lote, não 50).
+    """
+    while True:
+        batch = watcher.poll(None)
+        while True:
+            more = watcher.poll(window)
+            if not more:
+                break
+            batch |= more
+        yield batch
@@ -1,41 +1,27 @@
-import os
-from PIL import Image
+import sys
+from pathlib import Path
 
-def process_images(input_folder):
-    # Pastas de saída
-    thumb_folder = os.path.join(input_folder, "../static/assets/thumb")
-    modelos_folder = os.path.join(input_folder, "../static/assets/modelos")
-
-    # Criar as pastas de saída, se não existirem
-    os.makedirs(thumb_folder, exist_ok=True)
-    os.makedirs(modelos_folder, exist_ok=True)
+# Permite importar o núcleo (usatex/) ao rodar a partir de utils/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-    # Configurações de tamanho
-    thumb_size = (128, 128)  # Tamanho fixo para miniaturas
-    modelos_size = (1182, 1182)  # Tamanho máximo para manter a proporção
+from update import UsaTexUpdater
 
-    # Iterar por todos os arquivos na pasta de entrada
-    for file_name in os.listdir(input_folder):
-        if file_name.lower().endswith((".jpg", ".jpeg", ".png")):
-            file_path = os.path.join(input_folder, file_name)
+def process_images(input_folder):
+    """Gera thumbs e modelos das imagens de input_folder com o núcleo do update.py"""
+    updater = UsaTexUpdater()
+    input_folder = Path(input_folder)
+    assets = input_folder / "../static/assets"
 
-            # Abrir a imagem
-            with Image.open(file_path) as img:
-                # Obter o nome base sem a extensão
-                base_name = file_name.split("_")[1]
+    # Pastas de entrada e de saída
+    updater.base_folder = input_folder
+    updater.thumb_folder = assets / "thumb"
+    updater.modelos_folder = assets / "modelos"
 
-                # Criar a miniatura (exatamente 128x128)
-                thumb_image = img.resize(thumb_size)  # Redimensionar para tamanho fixo
-                thumb_path = os.path.join(thumb_folder, f"{base_name}")
-                thumb_image.save(thumb_path, "JPEG", quality=85)
-                print(f"Miniatura salva: {thumb_path}")
+    # Criar as pastas de saída, se não existirem
+    updater.thumb_folder.mkdir(parents=True, exist_ok=True)
+    updater.modelos_folder.mkdir(parents=True, exist_ok=True)
 
-                # Criar o modelo redimensionado (mantendo proporção)
-                modelos_image = img.copy()
-                modelos_image.thumbnail(modelos_size)
-                modelos_path = os.path.join(modelos_folder, f"{base_name}")
-                modelos_image.save(modelos_path, "JPEG", quality=85)
-                print(f"Imagem redimensionada salva: {modelos_path}")
+    updater.process_images()
 
 if __name__ == "__main__":
     # Pasta de entrada onde as imagens estão localizadas